@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, redirect, url_for, session
+from flask import Flask, Response, render_template, request, redirect, url_for, session, stream_with_context
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 import os
@@ -14,10 +14,18 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 
 from stock_engine import StockEngine
+import market_data
+import market_calendar
+import resampler
+import indicators
+import scoring
+import scanner
+import signal_table
+import screener
+from market_cache import get_or_fetch, memory_cache, hot_keys
 from ai_analyzer import AIAnalyzer
 import auto_trader
 import json
-import yfinance as yf
 import plotly
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -46,28 +54,43 @@ logger = logging.getLogger(__name__)
 _rate_limits = {}
 _RATE_LIMIT_MAX = 20  # max requests per minute
 _RATE_LIMIT_WINDOW = 60  # seconds
-
-# Smart Market Data Cache (5-minute TTL)
-_market_cache = {}
-_CACHE_TTL = 300  # 5 minutes
+_RATE_LIMIT_MESSAGE = "<div style='color:#e74c3c;padding:10px;'>⚠️ لقد تجاوزت الحد الأقصى للطلبات (20/دقيقة). انتظر قليلاً وحاول مرة أخرى.</div>"
+
+# Technical half of the report's Smart Score (0-100), see scoring.py
+TECH_SCORE_RULES = {
+    'base': 50,
+    'clip': [0, 100],
+    'defaults': {'RSI': 50, 'MACD': 0, 'Signal_Line': 0, 'EMA20': 'Close', 'ADX': 0, 'VWAP': 'Close', 'Stoch_K': 50},
+    'rules': [
+        {'group': 'rsi', 'when': 'RSI < 30', 'points': 15},
+        {'group': 'rsi', 'when': 'RSI < 45', 'points': 8},
+        {'group': 'rsi', 'when': 'RSI > 70', 'points': -15},
+        {'group': 'rsi', 'when': 'RSI > 55', 'points': -5},
+        {'group': 'macd', 'when': 'MACD > Signal_Line', 'points': 12},
+        {'group': 'macd', 'when': 'True', 'points': -8},
+        {'group': 'ema', 'when': 'Close > EMA20', 'points': 8},
+        {'group': 'ema', 'when': 'True', 'points': -5},
+        {'when': 'ADX > 25', 'points': 5},
+        {'group': 'vwap', 'when': 'Close > VWAP', 'points': 5},
+        {'group': 'vwap', 'when': 'True', 'points': -3},
+        {'group': 'stochastic', 'when': 'Stoch_K < 20', 'points': 5},
+        {'group': 'stochastic', 'when': 'Stoch_K > 80', 'points': -5},
+    ],
+}
+TECH_SCORE = scoring.table('tech_score', TECH_SCORE_RULES)
+
+# Smart Market Data Cache — shared LRU cache (market_cache.py), expiring with the trading calendar
+_CACHE_TTL = 300  # 5 minutes at most during the session
 
 def get_cached_market_data(symbol, period="2d"):
     """Fetches market data with caching to avoid redundant API calls."""
-    cache_key = f"{symbol}_{period}"
-    now = _time.time()
-    if cache_key in _market_cache:
-        data, timestamp = _market_cache[cache_key]
-        if now - timestamp < _CACHE_TTL:
-            return data
-    try:
-        t = yf.Ticker(symbol)
-        data = t.history(period=period)
-        if data is not None and not data.empty:
-            _market_cache[cache_key] = (data, now)
-            return data
-    except:
-        pass
-    return _market_cache.get(cache_key, (None, 0))[0]
+    def fetch():
+        return market_data.get_provider().history(symbol, period=period)
+    return get_or_fetch("market", f"{symbol}_{period}", fetch, market_calendar.ttl_for('1d', _CACHE_TTL))
+
+# Precomputed universe signals (signal_table.py); the refresh thread is opt-in
+if signal_table.SIGNAL_TABLE_JOB:
+    signal_table.start_background()
 
 def check_rate_limit(username):
     now = _time.time()
@@ -79,6 +102,24 @@ def check_rate_limit(username):
     _rate_limits[username].append(now)
     return True
 
+# One-time tokens for scanner streams opened from a chat message, which already counted
+_stream_tokens = {}  # token -> (username, expires)
+_STREAM_TOKEN_TTL = 60  # seconds
+
+def issue_stream_token(username):
+    now = _time.time()
+    for token, (_, expires) in list(_stream_tokens.items()):
+        if expires <= now:
+            _stream_tokens.pop(token, None)
+    token = secrets.token_urlsafe(16)
+    _stream_tokens[token] = (username, now + _STREAM_TOKEN_TTL)
+    return token
+
+def redeem_stream_token(token, username):
+    """True once for a live token issued to username."""
+    entry = _stream_tokens.pop(token, None) if token else None
+    return entry is not None and entry[0] == username and entry[1] > _time.time()
+
 # SQLite Portfolio
 PORTFOLIO_DB = 'portfolio.db'
 
@@ -491,20 +532,12 @@ def set_key():
 def get_market_status():
     """Checks if US market is open and returns (is_open, message)"""
     try:
-        now = pd.Timestamp.now(tz='America/New_York')
-        open_time = now.replace(hour=9, minute=30, second=0, microsecond=0)
-        close_time = now.replace(hour=16, minute=0, second=0, microsecond=0)
-        is_weekday = now.dayofweek < 5
-        
-        if is_weekday and open_time <= now <= close_time:
+        now = pd.Timestamp.now(tz=market_calendar.TZ)
+        if market_calendar.is_open(now):
             return True, ""
             
-        next_open = open_time
-        if now > close_time or not is_weekday:
-            next_open += pd.Timedelta(days=1)
-            
-        while next_open.dayofweek >= 5: # Skip weekends
-            next_open += pd.Timedelta(days=1)
+        # Skips weekends, exchange holidays and early closes
+        next_open = market_calendar.next_open(now)
             
         days_ar = {0: "الاثنين", 1: "الثلاثاء", 2: "الأربعاء", 3: "الخميس", 4: "الجمعة"}
         day_name = days_ar[next_open.dayofweek]
@@ -526,7 +559,7 @@ def chat():
     
     # Rate limiting check
     if not check_rate_limit(session['username']):
-        return {"response": "<div style='color:#e74c3c;padding:10px;'>⚠️ لقد تجاوزت الحد الأقصى للطلبات (20/دقيقة). انتظر قليلاً وحاول مرة أخرى.</div>"}
+        return {"response": _RATE_LIMIT_MESSAGE}
     
     lang = session.get('lang', 'ar')
     t = get_translations(lang)
@@ -712,9 +745,10 @@ def chat():
             }
             sector_html = ""
             sector_items = []
+            sector_data = StockEngine.fetch_many(list(sector_etfs), period="5d")
             for etf, name in sector_etfs.items():
                 try:
-                    d = get_cached_market_data(etf, "5d")
+                    d = sector_data.get(etf)
                     if d is not None and len(d) >= 2:
                         chg = ((d['Close'].iloc[-1] - d['Close'].iloc[-2]) / d['Close'].iloc[-2]) * 100
                         sector_items.append((name, chg, etf))
@@ -760,10 +794,11 @@ def chat():
             t1, t2 = all_tickers[0], all_tickers[1]
             try:
                 e1, e2 = StockEngine(t1), StockEngine(t2)
-                h1 = e1.get_market_data(period="1mo")
-                h2 = e2.get_market_data(period="1mo")
-                h1 = e1.calculate_technical_indicators(h1) if h1 is not None and not h1.empty else h1
-                h2 = e2.calculate_technical_indicators(h2) if h2 is not None and not h2.empty else h2
+                both = StockEngine.fetch_many([t1, t2], period="1mo")
+                h1, h2 = both.get(t1), both.get(t2)
+                # The comparison table only shows RSI and the MACD cross
+                h1 = e1.calculate_technical_indicators(h1, ['RSI', 'Signal_Line']) if h1 is not None and not h1.empty else h1
+                h2 = e2.calculate_technical_indicators(h2, ['RSI', 'Signal_Line']) if h2 is not None and not h2.empty else h2
                 
                 def get_val(info, key, default="N/A"):
                     v = info.get(key, default)
@@ -1202,29 +1237,10 @@ def chat():
             """
 
             # Smart Score — combines technical + fundamental into a visual gauge
-            tech_score = 50
             try:
-                r = latest.get('RSI', 50)
-                if r < 30: tech_score += 15
-                elif r < 45: tech_score += 8
-                elif r > 70: tech_score -= 15
-                elif r > 55: tech_score -= 5
-                
-                if latest.get('MACD', 0) > latest.get('Signal_Line', 0): tech_score += 12
-                else: tech_score -= 8
-                
-                if latest['Close'] > latest.get('EMA20', latest['Close']): tech_score += 8
-                else: tech_score -= 5
-                
-                if latest.get('ADX', 0) > 25: tech_score += 5
-                
-                if latest['Close'] > latest.get('VWAP', latest['Close']): tech_score += 5
-                else: tech_score -= 3
-                
-                if latest.get('Stoch_K', 50) < 20: tech_score += 5
-                elif latest.get('Stoch_K', 50) > 80: tech_score -= 5
-            except: pass
-            tech_score = max(0, min(100, tech_score))
+                tech_score = TECH_SCORE.latest(hist).score()
+            except Exception:
+                tech_score = 50
             
             smart_score = int((tech_score * 0.6) + (fund_score * 0.4))
             ss_color = '#26a69a' if smart_score >= 70 else '#f0c040' if smart_score >= 45 else '#ef5350'
@@ -1339,29 +1355,15 @@ def chat():
             )
             
         elif is_scanner_request:
+            # The dashboard asks for a stream and renders each opportunity as it is found
+            if data.get('stream'):
+                return {"stream": url_for('scanner_stream', interval=timeframe, period=period, title=tf_title,
+                                          token=issue_stream_token(session['username']))}
             # If no ticker was in session, engine might not exist
             scan_engine = StockEngine("SPY") if not ticker else engine 
-            opportunities = scan_engine.scan_market(period=period, interval=timeframe)
-            
-            if not opportunities:
-                response = f"🔍 قمت بفحص أهم الأسهم على فريم ({tf_title}) ولم أجد فرص **شراء** واضحة حالياً بناءً على المؤشرات الفنية."
-            else:
-                api_key = session.get('groq_api_key') or DEFAULT_API_KEY
-                analyzer = AIAnalyzer(api_key=api_key) 
-                # Note: get_opportunities_insight still needs lang update if used, but focusing on main insight
-                ai_opportunities_insight = analyzer.get_opportunities_insight(opportunities, tf_title=tf_title, timeframe_val=timeframe)
-                
-                if ai_opportunities_insight:
-                    response = f"🚀 **تحليل الذكاء الاصطناعي للفرص المتاحة ({tf_title}):**\n\n{ai_opportunities_insight}"
-                else:
-                    response = "🚀 **الفرص المتاحة حالياً (إشارة شراء فنية):**\n\n"
-                    for opp in opportunities:
-                        response += f"🔹 **{opp['ticker']}** بسعر ${opp['price']:.2f}\n"
-                        response += f"   🎯 هدف: ${opp['tp']:.2f} | 🛑 وقف: ${opp['sl']:.2f}\n"
-                        response += f"-----------------------------------\n"
-                    
-                    response += "\n⚠️ *هذه ليست نصيحة مالية، بل تحليل فني آلي.*"
-                    
+            opportunities = scanner.drain(scan_opportunities(timeframe, period, scan_engine))
+            api_key = session.get('groq_api_key') or DEFAULT_API_KEY
+            response = scanner_reply(opportunities, tf_title, timeframe, api_key)
                     
         elif any(kw in user_message for kw in options_keywords):
             if not ticker:
@@ -1501,16 +1503,24 @@ def chat():
             
             # 1b. Candlestick Patterns & Fibonacci
             candle_patterns = engine.detect_candlestick_patterns(hist)
-            fib_levels = engine.calculate_fibonacci_levels(hist)
+            # Fibonacci, pivots and swings come from one engine; the chart overlays read them from levels
+            levels.update(engine.key_levels(hist))
+            fib_levels = levels['Fibonacci']
             
             # 1d. Multi-Timeframe Analysis (MTF)
             mtf_results = []
             mtf_timeframes = [('1h', '1mo', '⏱️ ساعة'), ('1d', '6mo', '📅 يومي'), ('1wk', '2y', '📆 أسبوعي')]
+            # One hourly download; daily and weekly bars are rebuilt from it locally
+            try:
+                mtf_base = engine.get_market_data(period='2y', interval='1h')
+                mtf_frames = resampler.build_timeframes(mtf_base, '1h', [(tf, p) for tf, p, _ in mtf_timeframes])
+            except Exception:
+                mtf_frames = {}
             for mtf_tf, mtf_period, mtf_label in mtf_timeframes:
                 try:
-                    mtf_hist = engine.get_market_data(period=mtf_period, interval=mtf_tf)
+                    mtf_hist = mtf_frames.get((mtf_tf, mtf_period))
                     if mtf_hist is not None and len(mtf_hist) >= 20:
-                        mtf_hist = engine.calculate_technical_indicators(mtf_hist)
+                        mtf_hist = engine.calculate_technical_indicators(mtf_hist, indicators.RECOMMENDATION_INPUTS)
                         mtf_sig, _ = engine.get_recommendation(mtf_hist)
                         mtf_rsi = mtf_hist['RSI'].iloc[-1]
                         mtf_macd = 'صعودي' if mtf_hist['MACD'].iloc[-1] > mtf_hist['Signal_Line'].iloc[-1] else 'هبوطي'
@@ -1615,6 +1625,12 @@ def chat():
                 if 'Support' in levels and not pd.isna(levels['Support']):
                     fig.add_hline(y=levels['Support'], line_dash="solid", line_color="rgba(0,255,0,0.3)", line_width=2, annotation_text="دعم", annotation_position="left", row=1, col=1)
 
+                # Latest confirmed swing high / low
+                if not pd.isna(levels.get('Swing_High', float('nan'))):
+                    fig.add_hline(y=levels['Swing_High'], line_dash="longdash", line_color="rgba(255,0,0,0.2)", line_width=1, annotation_text="قمة", annotation_position="right", row=1, col=1)
+                if not pd.isna(levels.get('Swing_Low', float('nan'))):
+                    fig.add_hline(y=levels['Swing_Low'], line_dash="longdash", line_color="rgba(0,255,0,0.2)", line_width=1, annotation_text="قاع", annotation_position="right", row=1, col=1)
+
             # Row 2: RSI
             fig.add_trace(go.Scatter(x=hist.index, y=hist['RSI'], name='RSI', line=dict(color='#9775fa', width=1.5)), row=2, col=1)
             fig.add_hline(y=70, line_dash="dash", line_color="red", line_width=1, row=2, col=1)
@@ -1644,22 +1660,14 @@ def chat():
 
             # Pivot Points (Classic Floor Trader Method)
             try:
-                if len(hist) >= 2:
-                    pp_high = hist['High'].iloc[-2]
-                    pp_low = hist['Low'].iloc[-2]
-                    pp_close = hist['Close'].iloc[-2]
-                    pp = (pp_high + pp_low + pp_close) / 3
-                    r1 = (2 * pp) - pp_low
-                    s1 = (2 * pp) - pp_high
-                    r2 = pp + (pp_high - pp_low)
-                    s2 = pp - (pp_high - pp_low)
-                    
+                pivots = levels.get('Pivots') or {}
+                if pivots:
                     pivot_levels = [
-                        ('R2', r2, 'rgba(239,83,80,0.6)', 'dashdot'),
-                        ('R1', r1, 'rgba(239,83,80,0.4)', 'dash'),
-                        ('PP', pp, 'rgba(255,255,255,0.5)', 'solid'),
-                        ('S1', s1, 'rgba(46,204,113,0.4)', 'dash'),
-                        ('S2', s2, 'rgba(46,204,113,0.6)', 'dashdot'),
+                        ('R2', pivots['R2'], 'rgba(239,83,80,0.6)', 'dashdot'),
+                        ('R1', pivots['R1'], 'rgba(239,83,80,0.4)', 'dash'),
+                        ('PP', pivots['PP'], 'rgba(255,255,255,0.5)', 'solid'),
+                        ('S1', pivots['S1'], 'rgba(46,204,113,0.4)', 'dash'),
+                        ('S2', pivots['S2'], 'rgba(46,204,113,0.6)', 'dashdot'),
                     ]
                     for pname, pval, pcolor, pdash in pivot_levels:
                         fig.add_hline(y=pval, line_dash=pdash, line_color=pcolor, line_width=1,
@@ -2028,16 +2036,98 @@ def chat():
 
     return {"response": response}
 
+# --- Market Scanner (chat intent) ---
+def scan_opportunities(timeframe, period, engine=None):
+    """Buy opportunities for the scanner intent, as a StockEngine.iter_scan_market-style generator.
+
+    Precomputed signals when the job keeps this timeframe current, else a live scan.
+    """
+    rows = signal_table.top('buy', interval=timeframe, limit=10)
+    if rows or signal_table.is_current(timeframe):
+        if rows:
+            yield rows
+        return scanner.ScanResult(rows)
+    return (yield from (engine or StockEngine("SPY")).iter_scan_market(period=period, interval=timeframe))
+
+def scanner_reply(opportunities, tf_title, timeframe, api_key, listed=False):
+    """Chat text for a finished scan: the AI's take on the opportunities, else a plain list
+    (left out when the opportunities were already shown, listed=True)."""
+    # The scan has a time budget; say so when some tickers didn't make it
+    partial_note = ""
+    if opportunities.partial:
+        partial_note = f"\n\n⏱️ *فحص جزئي: لم يكتمل فحص {len(opportunities.pending)} سهم ضمن المهلة ({', '.join(opportunities.pending[:10])}).*"
+
+    if not opportunities:
+        return f"🔍 قمت بفحص أهم الأسهم على فريم ({tf_title}) ولم أجد فرص **شراء** واضحة حالياً بناءً على المؤشرات الفنية." + partial_note
+
+    analyzer = AIAnalyzer(api_key=api_key)
+    ai_opportunities_insight = analyzer.get_opportunities_insight(opportunities, tf_title=tf_title, timeframe_val=timeframe)
+    if ai_opportunities_insight:
+        response = f"🚀 **تحليل الذكاء الاصطناعي للفرص المتاحة ({tf_title}):**\n\n{ai_opportunities_insight}"
+    else:
+        response = "" if listed else "🚀 **الفرص المتاحة حالياً (إشارة شراء فنية):**\n\n"
+        for opp in ([] if listed else opportunities):
+            response += f"🔹 **{opp['ticker']}** بسعر ${opp['price']:.2f}\n"
+            response += f"   🎯 هدف: ${opp['tp']:.2f} | 🛑 وقف: ${opp['sl']:.2f}\n"
+            response += f"-----------------------------------\n"
+        
+        response += "\n⚠️ *هذه ليست نصيحة مالية، بل تحليل فني آلي.*"
+    return response + partial_note
+
+def sse(event, data):
+    """One Server-Sent Events message (NaN sent as null, which JSON can carry)."""
+    if isinstance(data, dict):
+        data = {k: (None if isinstance(v, float) and v != v else v) for k, v in data.items()}
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@app.route('/api/scanner/stream')
+def scanner_stream():
+    """Streams the scanner intent as Server-Sent Events: 'opportunity' for each hit as soon
+    as its batch is scored, then 'summary' (the AI's take, sent last) and 'done'."""
+    if 'username' not in session:
+        return {"error": "Unauthorized"}, 401
+    timeframe = request.args.get('interval', '1d')
+    period = request.args.get('period', '1y')
+    tf_title = request.args.get('title', timeframe)
+    api_key = session.get('groq_api_key') or DEFAULT_API_KEY
+    # Every stream is a scan and an LLM call, so it counts against the limit like a chat message;
+    # one opened from a chat message carries that message's token and isn't counted twice
+    allowed = redeem_stream_token(request.args.get('token'), session['username']) or check_rate_limit(session['username'])
+
+    def events():
+        start = _time.monotonic()
+        yield sse('start', {"interval": timeframe, "title": tf_title})
+        if not allowed:
+            yield sse('summary', {"response": _RATE_LIMIT_MESSAGE, "count": 0, "pending": []})
+            yield sse('done', {"elapsed": 0})
+            return
+        try:
+            scan = scan_opportunities(timeframe, period)
+            while True:
+                try:
+                    found = next(scan)
+                except StopIteration as stop:
+                    opportunities = stop.value
+                    break
+                for opp in found:
+                    yield sse('opportunity', {k: opp.get(k) for k in ('ticker', 'signal', 'price', 'sl', 'tp')})
+            yield sse('summary', {"response": scanner_reply(opportunities, tf_title, timeframe, api_key, listed=True),
+                                  "count": len(opportunities), "pending": opportunities.pending})
+        except Exception as e:
+            logger.error(f"Scanner stream error: {str(e)}")
+            yield sse('summary', {"response": f"<div style='color:#e74c3c;padding:10px;'>❌ حدث خطأ أثناء فحص السوق: {str(e)[:150]}</div>", "count": 0, "pending": []})
+        yield sse('done', {"elapsed": round(_time.monotonic() - start, 2)})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/morning_briefing')
 def api_morning_briefing():
     """Generates and returns the daily market briefing."""
     try:
         # Get index data
-        indices = {"SPX": "^GSPC", "NDX": "^NDX", "DJI": "^DJI"}
         market_results = {}
-        for name, sym in indices.items():
-            t = yf.Ticker(sym)
-            d = t.history(period="2d")
+        for name, d in StockEngine.fetch_many(["SPX", "NDX", "DJI"], period="2d").items():
             if len(d) >= 2:
                 change = ((d['Close'].iloc[-1] - d['Close'].iloc[-2]) / d['Close'].iloc[-2]) * 100
                 market_results[f"{name.lower()}_change"] = change
@@ -2073,6 +2163,13 @@ def api_market_status():
         "movers": {"gainers": gainers, "losers": losers}
     }
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Returns market data cache size and per-namespace hit rates (for sizing instances)."""
+    if session.get('role') != 'admin':
+        return {"error": "Admin only"}, 403
+    return dict(memory_cache.stats(), hot_keys=hot_keys.top(20))
+
 @app.route('/api/broadcast', methods=['GET', 'POST'])
 def broadcast():
     if 'username' not in session:
@@ -2229,12 +2326,13 @@ def get_portfolio():
     conn.close()
     
     trades = [dict(r) for r in rows]
+    open_tickers = {trade['ticker'] for trade in trades if trade['status'] == 'open'}
+    prices = StockEngine.fetch_many(sorted(open_tickers), period="5d") if open_tickers else {}
     
     for trade in trades:
         if trade['status'] == 'open':
             try:
-                ticker = yf.Ticker(trade['ticker'])
-                current = ticker.fast_info['lastPrice']
+                current = float(prices[trade['ticker']]['Close'].iloc[-1])
                 trade['current_price'] = round(current, 2)
                 trade['pnl'] = round((current - trade['entry_price']) * trade['shares'], 2)
                 trade['pnl_pct'] = round(((current - trade['entry_price']) / trade['entry_price']) * 100, 2)
@@ -2260,8 +2358,8 @@ def close_trade():
     
     if row:
         try:
-            ticker = yf.Ticker(row[2])  # ticker column
-            current = ticker.fast_info['lastPrice']
+            ticker = row[2]  # ticker column
+            current = float(StockEngine.fetch_many([ticker], period="5d")[ticker]['Close'].iloc[-1])
             pnl = round((current - row[3]) * row[6], 2)  # entry_price * shares
             c.execute('UPDATE trades SET status = ?, close_price = ?, pnl = ? WHERE id = ?',
                       ('closed', current, pnl, trade_id))
@@ -2279,12 +2377,12 @@ def earnings_calendar():
     earnings = []
     for sym in tickers:
         try:
-            t = yf.Ticker(sym)
+            provider = market_data.get_provider()
             earnings_date = None
             
             # Method 1: t.calendar (can be dict or DataFrame)
             try:
-                cal = t.calendar
+                cal = provider.calendar(sym)
                 if isinstance(cal, dict):
                     ed = cal.get('Earnings Date', cal.get('earningsDate', None))
                     if ed:
@@ -2301,7 +2399,7 @@ def earnings_calendar():
             # Method 2: Fallback to info
             if not earnings_date:
                 try:
-                    info = t.info
+                    info = provider.info(sym)
                     ed_ts = info.get('earningsTimestamp', None)
                     if ed_ts:
                         from datetime import datetime as dt
@@ -2344,6 +2442,21 @@ def backtest():
     except Exception as e:
         return {"success": False, "message": str(e)}
 
+# --- Screener API ---
+@app.route('/api/screener', methods=['GET', 'POST'])
+def api_screener():
+    """Custom screen over the signal table, e.g. q=RSI < 30 and Close > EMA50 order by score desc limit 20."""
+    if 'username' not in session:
+        return {"success": False, "message": "Login required"}, 401
+    data = request.get_json(silent=True) or {}
+    query = data.get('q') or data.get('query') or request.args.get('q') or request.args.get('query') or ''
+    interval = data.get('interval') or request.args.get('interval') or '1d'
+    try:
+        results, took = screener.screen(query, interval=interval)
+    except screener.ScreenError as e:
+        return {"success": False, "message": str(e)}, 400
+    return {"success": True, "interval": interval, "results": results, "count": len(results), "took_ms": round(took, 2)}
+
 # --- Portfolio Analytics API ---
 @app.route('/api/portfolio/analytics')
 def portfolio_analytics():
@@ -2391,10 +2504,10 @@ def autotrade_status():
     stats = auto_trader.get_stats()
     open_trades = auto_trader.get_open_trades()
     # Update current prices for open trades
+    prices = StockEngine.fetch_many({t['ticker'] for t in open_trades}, period="5d") if open_trades else {}
     for t in open_trades:
         try:
-            eng = StockEngine(t['ticker'])
-            h = eng.get_market_data(period="5d")
+            h = prices.get(t['ticker'])
             if h is not None and not h.empty:
                 t['current_price'] = round(h['Close'].iloc[-1], 2)
                 t['pnl'] = round((t['current_price'] - t['entry_price']) * t['shares'], 2)
@@ -8,6 +8,8 @@ import json
 import time
 import secrets
 from datetime import datetime
+import scanner
+import scoring
 from stock_engine import StockEngine
 
 DB_PATH = 'portfolio.db'
@@ -19,6 +21,27 @@ SCAN_TICKERS = [
     "NFLX", "JPM", "V", "UNH", "HD", "PG", "COST"
 ]
 
+# Smart Score (0-100) rule table, see scoring.py
+SMART_SCORE_RULES = {
+    'base': 50,
+    'clip': [0, 100],
+    'defaults': {'RSI': 50, 'MACD': 0, 'Signal_Line': 0, 'EMA20': 'Close', 'ADX': 0, 'VWAP': 'Close', 'Stoch_K': 50},
+    'rules': [
+        {'group': 'rsi', 'when': 'RSI < 30', 'points': 15, 'reason': "RSI منخفض ({RSI:.0f})"},
+        {'group': 'rsi', 'when': 'RSI < 45', 'points': 8, 'reason': "RSI جيد ({RSI:.0f})"},
+        {'group': 'rsi', 'when': 'RSI > 70', 'points': -15, 'reason': "RSI مرتفع ({RSI:.0f})"},
+        {'group': 'macd', 'when': 'MACD > Signal_Line', 'points': 12, 'reason': "MACD صعودي"},
+        {'group': 'macd', 'when': 'True', 'points': -8},
+        {'group': 'ema', 'when': 'Close > EMA20', 'points': 8, 'reason': "فوق EMA20"},
+        {'group': 'ema', 'when': 'True', 'points': -5},
+        {'when': 'ADX > 25', 'points': 5, 'reason': "ADX قوي ({ADX:.0f})"},
+        {'when': 'Close > VWAP', 'points': 5, 'reason': "فوق VWAP"},
+        {'group': 'stochastic', 'when': 'Stoch_K < 20', 'points': 5, 'reason': "Stochastic منخفض"},
+        {'group': 'stochastic', 'when': 'Stoch_K > 80', 'points': -5},
+    ],
+}
+SMART_SCORE = scoring.table('smart_score', SMART_SCORE_RULES)
+
 
 def init_autotrade_db():
     """Creates the auto_trades table if it doesn't exist."""
@@ -149,69 +172,29 @@ def get_stats():
     }
 
 
-def _analyze_stock(ticker):
-    """Analyzes a stock and returns a score + trade setup."""
+def _analyze_stock(ticker, hist=None):
+    """Analyzes a stock and returns a score + trade setup.
+
+    hist: the 1mo/1d price history (fetched when not given).
+    """
     try:
         engine = StockEngine(ticker)
-        hist = engine.get_market_data(period="1mo", interval="1d")
+        if hist is None:
+            hist = engine.get_market_data(period="1mo", interval="1d")
         if hist is None or hist.empty or len(hist) < 10:
             return None
         
-        hist = engine.calculate_technical_indicators(hist)
+        # Only the bars added (or revised) since the last scan are applied to the cached state
+        hist = engine.indicator_state(hist, "1mo", "1d").frame()
         latest = hist.iloc[-1]
         
         # Calculate Smart Score
-        score = 50
-        reasons = []
-        
-        # RSI
+        smart = SMART_SCORE.latest(hist)
+        score = smart.score()
+        reasons = smart.reasons()
         rsi = latest.get('RSI', 50)
-        if rsi < 30:
-            score += 15
-            reasons.append(f"RSI منخفض ({rsi:.0f})")
-        elif rsi < 45:
-            score += 8
-            reasons.append(f"RSI جيد ({rsi:.0f})")
-        elif rsi > 70:
-            score -= 15
-            reasons.append(f"RSI مرتفع ({rsi:.0f})")
-        
-        # MACD
         macd = latest.get('MACD', 0)
         signal = latest.get('Signal_Line', 0)
-        if macd > signal:
-            score += 12
-            reasons.append("MACD صعودي")
-        else:
-            score -= 8
-        
-        # EMA
-        if latest['Close'] > latest.get('EMA20', latest['Close']):
-            score += 8
-            reasons.append("فوق EMA20")
-        else:
-            score -= 5
-        
-        # ADX
-        adx = latest.get('ADX', 0)
-        if adx > 25:
-            score += 5
-            reasons.append(f"ADX قوي ({adx:.0f})")
-        
-        # VWAP
-        if latest['Close'] > latest.get('VWAP', latest['Close']):
-            score += 5
-            reasons.append("فوق VWAP")
-        
-        # Stochastic
-        stoch = latest.get('Stoch_K', 50)
-        if stoch < 20:
-            score += 5
-            reasons.append("Stochastic منخفض")
-        elif stoch > 80:
-            score -= 5
-        
-        score = max(0, min(100, score))
         
         # Calculate levels
         rec, levels = engine.get_recommendation(hist)
@@ -225,7 +208,6 @@ def _analyze_stock(ticker):
             'levels': levels,
             'rec': rec,
             'reasons': reasons,
-            'name': engine.info.get('shortName', ticker),
         }
     except Exception as e:
         return None
@@ -241,10 +223,10 @@ def scan_and_trade():
     
     # First: Check existing trades for SL/TP hits
     actions = []
+    prices = StockEngine.fetch_many(set(open_tickers), period="5d", interval="1d") if open_tickers else {}
     for trade in open_trades:
         try:
-            engine = StockEngine(trade['ticker'])
-            hist = engine.get_market_data(period="5d", interval="1d")
+            hist = prices.get(trade['ticker'])
             if hist is None or hist.empty:
                 continue
             current_price = hist['Close'].iloc[-1]
@@ -275,12 +257,23 @@ def scan_and_trade():
     
     # Scan stocks
     results = []
-    for ticker in SCAN_TICKERS:
-        if ticker in open_tickers:
-            continue
-        analysis = _analyze_stock(ticker)
+    candidates = [t for t in SCAN_TICKERS if t not in open_tickers]
+    frames = StockEngine.fetch_many(candidates, period="1mo", interval="1d")
+    frames = {t: df for t, df in frames.items() if df is not None and len(df) >= 10}
+    # Only candidates with a new bar since the last scan are analyzed again
+    tracker = scanner.Tracker("auto_trader|1mo|1d")
+    fresh = {}
+    for ticker, hist in tracker.changed(frames).items():
+        analysis = _analyze_stock(ticker, hist)
+        if analysis:
+            fresh[ticker] = dict(analysis, signal=analysis['rec'])
+    tracker.update(frames, fresh)
+    analyses = tracker.records(frames)
+    for ticker in candidates:
+        analysis = analyses.get(ticker)
         if analysis and analysis['score'] >= 65:
             results.append(analysis)
+    events = tracker.save()
     
     results.sort(key=lambda x: x['score'], reverse=True)
     
@@ -329,7 +322,7 @@ def scan_and_trade():
         new_trades.append({
             'id': trade_id,
             'ticker': stock['ticker'],
-            'name': stock['name'],
+            'name': StockEngine(stock['ticker']).info.get('shortName', stock['ticker']),
             'entry': entry,
             'sl': sl,
             'tp': tp,
@@ -343,6 +336,7 @@ def scan_and_trade():
         'new_trades': new_trades,
         'closed_actions': actions,
         'open_count': len(get_open_trades()),
+        'events': events,
     }
 
 
@@ -0,0 +1,361 @@
+"""
+Local OHLCV Bar Store
+Keeps downloaded price history on disk (SQLite), one series per ticker and interval.
+Repeat requests only download the bars after the last stored timestamp and merge them in.
+"""
+import os
+import sqlite3
+import time
+import pandas as pd
+import numpy as np
+
+import market_calendar
+
+BAR_STORE_DB = os.environ.get('BAR_STORE_DB', 'market_data.db')
+
+# Batched downloads come back in UTC; new series default to the US exchange clock
+DEFAULT_TZ = 'America/New_York'
+
+# Don't hit the network again if the series was topped up this recently (seconds);
+# outside market hours a series stays fresh until the next session opens
+MIN_REFRESH_SECONDS = 60
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# Yahoo only serves intraday bars this far back (days)
+INTRADAY_LIMITS = {
+    '1m': 7, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '90m': 60,
+    '60m': 730, '1h': 730,
+}
+
+_PERIOD_OFFSETS = {
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+
+def _connect():
+    conn = sqlite3.connect(BAR_STORE_DB, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+
+def init_bar_store():
+    """Creates the bar tables if they don't exist."""
+    conn = _connect()
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS bars (
+        symbol TEXT,
+        interval TEXT,
+        ts INTEGER,
+        open REAL,
+        high REAL,
+        low REAL,
+        close REAL,
+        volume REAL,
+        dividends REAL,
+        splits REAL,
+        PRIMARY KEY (symbol, interval, ts)
+    ) WITHOUT ROWID''')
+    c.execute('''CREATE TABLE IF NOT EXISTS bar_meta (
+        symbol TEXT,
+        interval TEXT,
+        tz TEXT,
+        covered_from INTEGER,
+        last_fetch REAL,
+        PRIMARY KEY (symbol, interval)
+    )''')
+    conn.commit()
+    conn.close()
+
+
+try:
+    init_bar_store()
+    _STORE_OK = True
+except Exception as e:
+    # Read-only filesystems (e.g. serverless) fall back to plain downloads
+    print(f"Bar store disabled: {e}")
+    _STORE_OK = False
+
+
+def _session_days(period):
+    """Returns N for 'Nd' periods, else None."""
+    if period.endswith('d') and period[:-1].isdigit():
+        return int(period[:-1])
+    return None
+
+
+def window_start(period, interval, now=None):
+    """Calendar start (UTC Timestamp) that a period needs, or None for 'max'."""
+    now = now or pd.Timestamp.now(tz='UTC')
+    days = _session_days(period)
+    if days is not None:
+        # Enough calendar days to hold N sessions across weekends/holidays
+        start = now.normalize() - pd.Timedelta(days=days * 7 // 5 + 4)
+    elif period == 'ytd':
+        start = pd.Timestamp(year=now.year, month=1, day=1, tz='UTC')
+    elif period in _PERIOD_OFFSETS:
+        start = now.normalize() - _PERIOD_OFFSETS[period]
+    else:
+        return None
+
+    limit = INTRADAY_LIMITS.get(interval)
+    if limit:
+        start = max(start, now.normalize() - pd.Timedelta(days=limit - 1))
+    return start
+
+
+def _to_frame(rows, tz, interval):
+    if not rows:
+        return pd.DataFrame(columns=COLUMNS)
+    arr = np.array(rows, dtype='float64')
+    index = pd.to_datetime(arr[:, 0].astype('int64'), unit='s', utc=True).tz_convert(tz)
+    index.name = 'Datetime' if interval in INTRADAY_LIMITS else 'Date'
+    df = pd.DataFrame(arr[:, 1:], index=index, columns=COLUMNS)
+    if not df['Volume'].isna().any():
+        df['Volume'] = df['Volume'].astype('int64')
+    return df
+
+
+def _to_rows(symbol, interval, df):
+    ts = (df.index.tz_convert('UTC').asi8 // 10**9) if df.index.tz is not None else (df.index.asi8 // 10**9)
+    cols = [df[c].to_numpy(dtype='float64') if c in df.columns else np.zeros(len(df)) for c in COLUMNS]
+    return [(symbol, interval, int(t), *[None if np.isnan(v[i]) else float(v[i]) for v in cols])
+            for i, t in enumerate(ts)]
+
+
+def _read_meta(conn, symbol, interval):
+    c = conn.cursor()
+    c.execute("SELECT tz, covered_from, last_fetch FROM bar_meta WHERE symbol=? AND interval=?", (symbol, interval))
+    return c.fetchone()
+
+
+def read(symbol, interval, period):
+    """Returns the stored bars for a period (empty frame if nothing is stored)."""
+    conn = _connect()
+    try:
+        meta = _read_meta(conn, symbol, interval)
+        if not meta:
+            return pd.DataFrame(columns=COLUMNS)
+        tz = meta[0]
+        start = window_start(period, interval)
+        start_ts = int(start.timestamp()) if start is not None else -2**62
+        c = conn.cursor()
+        c.execute("""SELECT ts, open, high, low, close, volume, dividends, splits FROM bars
+                     WHERE symbol=? AND interval=? AND ts>=? ORDER BY ts""", (symbol, interval, start_ts))
+        df = _to_frame(c.fetchall(), tz, interval)
+    finally:
+        conn.close()
+
+    days = _session_days(period)
+    if days is not None and not df.empty:
+        sessions = df.index.normalize().unique()
+        df = df[df.index >= sessions[-days:][0]]
+    return df
+
+
+def write(symbol, interval, df, replace_from=None, covered_from=None):
+    """Merges freshly downloaded bars into the store.
+
+    replace_from: epoch seconds; stored bars at/after it are replaced by df.
+                  None replaces the whole series (full download).
+    """
+    if df is None or df.empty:
+        return
+    rows = _to_rows(symbol, interval, df)
+    tz = str(df.index.tz) if df.index.tz is not None else 'UTC'
+    conn = _connect()
+    try:
+        meta = _read_meta(conn, symbol, interval)
+        if tz == 'UTC':
+            tz = meta[0] if meta else DEFAULT_TZ
+        c = conn.cursor()
+        if replace_from is None:
+            c.execute("DELETE FROM bars WHERE symbol=? AND interval=?", (symbol, interval))
+        else:
+            c.execute("DELETE FROM bars WHERE symbol=? AND interval=? AND ts>=?", (symbol, interval, replace_from))
+        c.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        if covered_from is None and meta:
+            covered_from = meta[1]
+        c.execute("INSERT OR REPLACE INTO bar_meta (symbol, interval, tz, covered_from, last_fetch) VALUES (?, ?, ?, ?, ?)",
+                  (symbol, interval, tz, covered_from, time.time()))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def fetch_plan(symbol, interval, period):
+    """Decides how much needs downloading.
+
+    Returns (mode, start):
+      ('fresh', None)  — stored bars are recent enough, no download
+      ('tail', ts)     — download from epoch ts (last stored bar) onwards
+      ('full', start)  — download the whole window from start (None = period 'max')
+    """
+    start = window_start(period, interval)
+    conn = _connect()
+    try:
+        meta = _read_meta(conn, symbol, interval)
+        if not meta:
+            return 'full', start
+        _, covered_from, last_fetch = meta
+        needed = int(start.timestamp()) if start is not None else -2**62
+        if covered_from is None or covered_from > needed:
+            return 'full', start
+
+        c = conn.cursor()
+        c.execute("SELECT MAX(ts) FROM bars WHERE symbol=? AND interval=?", (symbol, interval))
+        last_ts = c.fetchone()[0]
+    finally:
+        conn.close()
+
+    if last_ts is None:
+        return 'full', start
+    limit = INTRADAY_LIMITS.get(interval)
+    if limit and time.time() - last_ts > (limit - 1) * 86400:
+        # Gap is older than Yahoo keeps intraday bars for
+        return 'full', start
+    if last_fetch and time.time() < market_calendar.expires_at(interval, MIN_REFRESH_SECONDS, now=last_fetch):
+        return 'fresh', None
+    return 'tail', last_ts
+
+
+def _has_new_corporate_action(df, after_ts):
+    """True if the tail contains a dividend/split (history gets re-adjusted)."""
+    ts = df.index.tz_convert('UTC').asi8 // 10**9 if df.index.tz is not None else df.index.asi8 // 10**9
+    newer = ts > after_ts
+    for col in ('Dividends', 'Stock Splits'):
+        if col in df.columns and (df[col].to_numpy()[newer] != 0).any():
+            return True
+    return False
+
+
+def get_history(symbol, period, interval, fetch):
+    """Returns history for a period, downloading only what the store is missing.
+
+    fetch(period=None, start=None) must return a yfinance-style history frame. If it
+    raises, the stored bars are returned (empty if there are none).
+    """
+    if not _STORE_OK:
+        return fetch(period=period)
+
+    try:
+        mode, start = fetch_plan(symbol, interval, period)
+    except sqlite3.Error as e:
+        print(f"Bar store read failed for {symbol}: {e}")
+        return fetch(period=period)
+
+    if mode == 'tail':
+        try:
+            tail = fetch(start=pd.Timestamp(start, unit='s', tz='UTC').to_pydatetime())
+        except Exception as e:
+            # A failed top-up leaves the stored bars usable; try again after the refresh interval
+            print(f"History download failed for {symbol}: {e}")
+            write_fetch_time(symbol, interval)
+            return read(symbol, interval, period)
+        if tail is not None and not tail.empty and _has_new_corporate_action(tail, start):
+            mode, start = 'full', window_start(period, interval)
+        elif tail is not None and not tail.empty:
+            write(symbol, interval, tail, replace_from=start)
+        else:
+            # Nothing new (or the call failed) — still counts as a check
+            write_fetch_time(symbol, interval)
+
+    if mode == 'full':
+        try:
+            if start is None:
+                df = fetch(period='max')
+                covered = -2**62
+            else:
+                df = fetch(start=start.to_pydatetime())
+                covered = int(start.timestamp())
+        except Exception as e:
+            print(f"History download failed for {symbol}: {e}")
+            write_fetch_time(symbol, interval)
+            return read(symbol, interval, period)
+        if df is None or df.empty:
+            return read(symbol, interval, period)
+        write(symbol, interval, df, covered_from=covered)
+
+    return read(symbol, interval, period)
+
+
+def write_fetch_time(symbol, interval):
+    conn = _connect()
+    try:
+        conn.execute("UPDATE bar_meta SET last_fetch=? WHERE symbol=? AND interval=?", (time.time(), symbol, interval))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_many(symbols, period, interval, download):
+    """Batched get_history for many symbols.
+
+    download(symbols, period=None, start=None) must return {symbol: frame}. Symbols that
+    only need their tail share one download from the oldest of their last bars; symbols
+    that need a full window share another.
+    """
+    if not _STORE_OK:
+        return download(symbols, period=period)
+
+    frames = {}
+    tails = {}
+    fulls = []
+    for sym in symbols:
+        try:
+            mode, start = fetch_plan(sym, interval, period)
+        except sqlite3.Error:
+            mode, start = 'full', None
+        if mode == 'fresh':
+            frames[sym] = read(sym, interval, period)
+        elif mode == 'tail':
+            tails[sym] = start
+        else:
+            fulls.append(sym)
+
+    if tails:
+        since = pd.Timestamp(min(tails.values()), unit='s', tz='UTC')
+        try:
+            got = download(list(tails), start=since.to_pydatetime())
+        except Exception as e:
+            print(f"History download failed for {', '.join(tails)}: {e}")
+            got = {}
+        for sym, last_ts in tails.items():
+            df = got.get(sym)
+            if df is None or df.empty:
+                write_fetch_time(sym, interval)
+                continue
+            df = df[df.index >= pd.Timestamp(last_ts, unit='s', tz='UTC')]
+            if _has_new_corporate_action(df, last_ts):
+                fulls.append(sym)
+            elif not df.empty:
+                write(sym, interval, df, replace_from=last_ts)
+
+    if fulls:
+        start = window_start(period, interval)
+        try:
+            if start is None:
+                got = download(fulls, period='max')
+                covered = -2**62
+            else:
+                got = download(fulls, start=start.to_pydatetime())
+                covered = int(start.timestamp())
+        except Exception as e:
+            print(f"History download failed for {', '.join(fulls)}: {e}")
+            got = {}
+        for sym in fulls:
+            df = got.get(sym)
+            if df is not None and not df.empty:
+                write(sym, interval, df, covered_from=covered)
+
+    for sym in symbols:
+        if sym not in frames:
+            frames[sym] = read(sym, interval, period)
+    return frames
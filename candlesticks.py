@@ -0,0 +1,93 @@
+"""
+Candlestick Pattern Detection
+Vectorized versions of the nine patterns StockEngine.detect_candlestick_patterns reports.
+detect() evaluates every bar in one pass (along axis 0, so a bars × tickers array works
+too), which is what backtests and historical chart markers need; the last-candle report
+is read off the final row.
+"""
+import numpy as np
+import pandas as pd
+
+# (column, label, direction, description) in the order they are reported
+PATTERNS = [
+    ('Hammer', "🔨 مطرقة (Hammer)", "صعودي", "نمط انعكاسي صعودي قوي"),
+    ('Inverted_Hammer', "🔨 مطرقة مقلوبة (Inverted Hammer)", "صعودي", "إشارة انعكاس صعودي محتمل"),
+    ('Bullish_Engulfing', "🟢 ابتلاع صعودي (Bullish Engulfing)", "صعودي", "إشارة انعكاس صعودي قوية جداً"),
+    ('Bearish_Engulfing', "🔴 ابتلاع هبوطي (Bearish Engulfing)", "هبوطي", "إشارة انعكاس هبوطي قوية جداً"),
+    ('Doji', "✳️ دوجي (Doji)", "محايد", "تردد في السوق — انتظر تأكيد الاتجاه"),
+    ('Morning_Star', "⭐ نجمة الصباح (Morning Star)", "صعودي", "نمط انعكاسي صعودي ثلاثي قوي"),
+    ('Evening_Star', "⭐ نجمة المساء (Evening Star)", "هبوطي", "نمط انعكاسي هبوطي ثلاثي قوي"),
+    ('Three_White_Soldiers', "🟢🟢🟢 ثلاث جنود بيض (Three White Soldiers)", "صعودي", "زخم صعودي قوي جداً"),
+    ('Three_Black_Crows', "🔴🔴🔴 ثلاث غربان سود (Three Black Crows)", "هبوطي", "زخم هبوطي قوي جداً"),
+]
+
+COLUMNS = [p[0] for p in PATTERNS]
+
+
+def _prev(x, periods):
+    out = np.full_like(x, np.nan)
+    out[periods:] = x[:-periods]
+    return out
+
+
+def detect(open_, high, low, close):
+    """{pattern: bool array} for equally long OHLC arrays (1-D, or 2-D bars × tickers).
+
+    Bars whose pattern needs candles before the start of the data are False.
+    """
+    o = np.asarray(open_, dtype='float64')
+    h = np.asarray(high, dtype='float64')
+    l = np.asarray(low, dtype='float64')
+    c = np.asarray(close, dtype='float64')
+    if len(c) == 0:
+        return {name: np.zeros(c.shape, dtype=bool) for name in COLUMNS}
+    po, pc = _prev(o, 1), _prev(c, 1)
+    p2o, p2c = _prev(o, 2), _prev(c, 2)
+
+    body = np.abs(c - o)
+    upper_shadow = h - np.maximum(c, o)
+    lower_shadow = np.minimum(c, o) - l
+    total_range = h - l
+    prev_body = np.abs(pc - po)
+    prev2_body = np.abs(p2c - p2o)
+
+    green, red = c > o, c < o
+    prev_green, prev_red = pc > po, pc < po
+    prev2_green, prev2_red = p2c > p2o, p2c < p2o
+    small_middle = prev_body < prev2_body * 0.3
+    midpoint = (p2o + p2c) / 2
+
+    # A zero-range bar reports nothing at all
+    valid = total_range != 0
+    found = {
+        'Hammer': (lower_shadow > body * 2) & (upper_shadow < body * 0.5) & green & prev_red,
+        'Inverted_Hammer': (upper_shadow > body * 2) & (lower_shadow < body * 0.5) & prev_red,
+        'Bullish_Engulfing': prev_red & green & (o <= pc) & (c >= po) & (body > prev_body),
+        'Bearish_Engulfing': prev_green & red & (o >= pc) & (c <= po) & (body > prev_body),
+        'Doji': (body < total_range * 0.1) & (total_range > 0),
+        'Morning_Star': prev2_red & small_middle & green & (c > midpoint),
+        'Evening_Star': prev2_green & small_middle & red & (c < midpoint),
+        'Three_White_Soldiers': green & prev_green & prev2_green & (c > pc) & (pc > p2c),
+        'Three_Black_Crows': red & prev_red & prev2_red & (c < pc) & (pc < p2c),
+    }
+    return {name: found[name] & valid for name in COLUMNS}
+
+
+def calculate(df):
+    """Boolean pattern columns for every bar of an OHLC frame (a new DataFrame, same index)."""
+    found = detect(df['Open'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy())
+    return pd.DataFrame(found, index=df.index)
+
+
+def describe(flags):
+    """[(label, direction, description)] for the patterns set in a {pattern: bool} row."""
+    return [(label, direction, text) for name, label, direction, text in PATTERNS if flags[name]]
+
+
+def latest(df):
+    """Patterns on the last candle, as StockEngine.detect_candlestick_patterns reports them."""
+    if len(df) < 3:
+        return []
+    tail = df.iloc[-3:]
+    found = detect(tail['Open'].to_numpy(), tail['High'].to_numpy(), tail['Low'].to_numpy(), tail['Close'].to_numpy())
+    return describe({name: bool(flags[-1]) for name, flags in found.items()})
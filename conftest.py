@@ -0,0 +1,44 @@
+import os
+import tempfile
+import time
+
+# Importing the stores creates their tables; keep that out of the working directory too
+_tmp = tempfile.mkdtemp()
+for _var, _name in [('SHARED_CACHE_DB', 'shared_cache.db'), ('BAR_STORE_DB', 'market_data.db'),
+                    ('SIGNAL_TABLE_DB', 'signals.db')]:
+    os.environ.setdefault(_var, os.path.join(_tmp, _name))
+
+import pytest
+
+import bar_store
+import market_cache
+import market_data
+import screener
+import signal_table
+
+
+def _wait_for_refreshes():
+    # A background refresh from the previous test must not land in this test's cache
+    deadline = time.monotonic() + 5
+    while market_cache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch):
+    """Gives every test its own bar store, shared cache and signal table, and empty in-process caches."""
+    _wait_for_refreshes()
+    monkeypatch.setattr(bar_store, 'BAR_STORE_DB', str(tmp_path / 'market_data.db'))
+    monkeypatch.setattr(market_cache, 'SHARED_CACHE_DB', str(tmp_path / 'shared_cache.db'))
+    monkeypatch.setattr(signal_table, 'SIGNAL_TABLE_DB', str(tmp_path / 'signals.db'))
+    bar_store.init_bar_store()
+    market_cache.init_shared_cache()
+    signal_table.init_signal_table()
+    monkeypatch.setattr(market_cache, 'memory_cache', market_cache.MemoryCache())
+    monkeypatch.setattr(market_cache, 'hot_keys', market_cache.HotKeys())
+    # These are the live files as far as a provider switch is concerned
+    monkeypatch.setattr(market_data, '_stores', [(module, attr, init, getattr(module, attr))
+                                                 for module, attr, init, _ in market_data._stores])
+    monkeypatch.setattr(screener, '_snapshots', {})
+    yield
+    _wait_for_refreshes()
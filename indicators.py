@@ -0,0 +1,715 @@
+"""
+Technical Indicator Kernel
+NumPy implementations of the indicators StockEngine.calculate_technical_indicators adds
+(EMA, RSI, MACD, Stochastic, ADX, VWAP, support/resistance, Bollinger, ATR, OBV, Williams %R).
+Every kernel works along axis 0, so a 2-D array (bars × tickers) is computed in one pass.
+
+calculate_pandas() is the original pandas implementation, kept as the reference the
+kernel is tested against (test_indicators.py) and used for frames with missing values.
+"""
+import copy
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import vwap
+
+# Column order matches what the pandas implementation produces
+COLUMNS = [
+    'EMA9', 'EMA20', 'EMA50', 'RSI', 'MACD', 'Signal_Line', 'MACD_Hist', 'Stoch_K', 'Stoch_D',
+    'ADX', 'Plus_DI', 'Minus_DI', 'VWAP', 'Resistance', 'Support', 'BB_Middle', 'BB_Std',
+    'BB_Upper', 'BB_Lower', 'ATR', 'OBV', 'Williams_R',
+]
+
+_INPUTS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# EMA blocks are sized so (1 - alpha) ** -block stays below e**40 (no overflow, no precision loss)
+_EMA_MAX_EXPONENT = 40.0
+_EMA_MAX_BLOCK = 1024
+
+
+# --- KERNELS (axis 0) ---
+
+def _column(weights, ndim):
+    """Reshapes a 1-D weight vector to broadcast down axis 0 of an ndim array."""
+    return weights.reshape((-1,) + (1,) * (ndim - 1))
+
+
+def ema(x, span=None, alpha=None, min_periods=0):
+    """Exponential moving average, same as pandas ewm(adjust=False).mean() on gap-free input.
+
+    Runs the recursion y[t] = (1 - a) * y[t-1] + a * x[t] in closed form, one block of bars
+    at a time, so the Python loop is n / block iterations instead of n.
+    """
+    x = np.asarray(x, dtype='float64')
+    a = 2.0 / (span + 1.0) if alpha is None else float(alpha)
+    n = len(x)
+    out = np.empty_like(x)
+    if n == 0:
+        return out
+    decay = 1.0 - a
+    if decay <= 0:
+        out[:] = x
+    else:
+        block = int(min(_EMA_MAX_BLOCK, max(1, _EMA_MAX_EXPONENT / -np.log(decay))))
+        j = np.arange(block, dtype='float64')
+        grow = decay ** -j             # (1-a)^-j
+        shrink = decay ** j            # (1-a)^j
+        carry = decay ** (j + 1)       # (1-a)^(j+1)
+        out[0] = x[0]
+        prev = x[0]
+        start = 1
+        while start < n:
+            stop = min(start + block, n)
+            m = stop - start
+            acc = np.cumsum(x[start:stop] * _column(grow[:m], x.ndim), axis=0)
+            y = _column(carry[:m], x.ndim) * prev + a * _column(shrink[:m], x.ndim) * acc
+            out[start:stop] = y
+            prev = y[-1]
+            start = stop
+    if min_periods > 1:
+        out[:min_periods - 1] = np.nan
+    return out
+
+
+def _rolling(x, window, reduce, **kwargs):
+    x = np.asarray(x, dtype='float64')
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = reduce(sliding_window_view(x, window, axis=0), axis=-1, **kwargs)
+    return out
+
+
+def rolling_mean(x, window):
+    """pandas rolling(window).mean(): NaN until the window is full or if it holds a NaN."""
+    return _rolling(x, window, np.mean)
+
+
+def rolling_std(x, window):
+    """pandas rolling(window).std() (sample standard deviation)."""
+    return _rolling(x, window, np.std, ddof=1)
+
+
+def _rolling_extreme(x, window, op, pad_value):
+    """van Herk/Gil-Werman running max/min: O(n) whatever the window, NaN if the window holds one.
+
+    Split into blocks of `window`; every window is then the suffix of one block plus
+    the prefix of the next, both precomputed with op.accumulate.
+    """
+    x = np.asarray(x, dtype='float64')
+    n = len(x)
+    out = np.full(x.shape, np.nan)
+    if n < window or window < 1:
+        return out
+    pad = (-n) % window
+    padded = np.concatenate([x, np.full((pad,) + x.shape[1:], pad_value)]) if pad else x
+    blocks = padded.reshape((-1, window) + x.shape[1:])
+    prefix = op.accumulate(blocks, axis=1).reshape(padded.shape)
+    suffix = op.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+    out[window - 1:] = op(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+
+def rolling_max(x, window):
+    """pandas rolling(window).max()."""
+    return _rolling_extreme(x, window, np.maximum, -np.inf)
+
+
+def rolling_min(x, window):
+    """pandas rolling(window).min()."""
+    return _rolling_extreme(x, window, np.minimum, np.inf)
+
+
+def shift(x, periods=1):
+    x = np.asarray(x, dtype='float64')
+    out = np.full(x.shape, np.nan)
+    if periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+
+def diff(x):
+    x = np.asarray(x, dtype='float64')
+    out = np.full(x.shape, np.nan)
+    out[1:] = x[1:] - x[:-1]
+    return out
+
+
+def true_range(high, low, close):
+    """max(H-L, |H-prevC|, |L-prevC|), the first bar falling back to H-L."""
+    prev_close = shift(close)
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def obv(close, volume):
+    """On-balance volume starting at 0; keeps volume's dtype (int volumes give int OBV)."""
+    volume = np.asarray(volume)
+    if len(volume) == 0:
+        return volume.copy()
+    change = diff(close)
+    signed = np.where(change > 0, volume, np.where(change < 0, -volume, 0))
+    signed[0] = 0
+    return np.cumsum(signed, axis=0)
+
+
+# --- DEPENDENCY GRAPH ---
+# Each node: (prerequisites, fn(ctx) -> array). Inputs are 'high', 'low', 'close', 'volume';
+# names starting with '_' are intermediates that are never returned.
+
+def _rsi(ctx):
+    delta = diff(ctx['close'])
+    avg_gain = ema(np.where(delta > 0, delta, 0.0), alpha=1 / 14, min_periods=14)
+    avg_loss = ema(-np.where(delta < 0, delta, 0.0), alpha=1 / 14, min_periods=14)
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def _directional(ctx, sign):
+    dm = sign * diff(ctx['high'] if sign > 0 else ctx['low'])
+    dm[dm < 0] = 0
+    return 100 * (rolling_mean(dm, 14) / ctx['ATR'])
+
+
+_GRAPH = {
+    'EMA9': (('close',), lambda c: ema(c['close'], span=9)),
+    'EMA20': (('close',), lambda c: ema(c['close'], span=20)),
+    'EMA50': (('close',), lambda c: ema(c['close'], span=50)),
+    'RSI': (('close',), _rsi),
+    'MACD': (('close',), lambda c: ema(c['close'], span=12) - ema(c['close'], span=26)),
+    'Signal_Line': (('MACD',), lambda c: ema(c['MACD'], span=9)),
+    'MACD_Hist': (('MACD', 'Signal_Line'), lambda c: c['MACD'] - c['Signal_Line']),
+    '_low_14': (('low',), lambda c: rolling_min(c['low'], 14)),
+    '_high_14': (('high',), lambda c: rolling_max(c['high'], 14)),
+    'Stoch_K': (('close', '_low_14', '_high_14'),
+                lambda c: ((c['close'] - c['_low_14']) / (c['_high_14'] - c['_low_14'])) * 100),
+    'Stoch_D': (('Stoch_K',), lambda c: rolling_mean(c['Stoch_K'], 3)),
+    'ATR': (('high', 'low', 'close'), lambda c: rolling_mean(true_range(c['high'], c['low'], c['close']), 14)),
+    'Plus_DI': (('high', 'ATR'), lambda c: _directional(c, 1)),
+    'Minus_DI': (('low', 'ATR'), lambda c: _directional(c, -1)),
+    'ADX': (('Plus_DI', 'Minus_DI'), lambda c: rolling_mean(
+        (np.abs(c['Plus_DI'] - c['Minus_DI']) / (c['Plus_DI'] + c['Minus_DI'])) * 100, 14)),
+    'VWAP': (('close', 'volume'), lambda c: vwap.vwap(c['close'], c['_volume_f'], c.get('_sessions'))),
+    'Resistance': (('high',), lambda c: shift(rolling_max(c['high'], 20))),
+    'Support': (('low',), lambda c: shift(rolling_min(c['low'], 20))),
+    'BB_Middle': (('close',), lambda c: rolling_mean(c['close'], 20)),
+    'BB_Std': (('close',), lambda c: rolling_std(c['close'], 20)),
+    'BB_Upper': (('BB_Middle', 'BB_Std'), lambda c: c['BB_Middle'] + (c['BB_Std'] * 2)),
+    'BB_Lower': (('BB_Middle', 'BB_Std'), lambda c: c['BB_Middle'] - (c['BB_Std'] * 2)),
+    'OBV': (('close', 'volume'), lambda c: obv(c['close'], c['volume'])),
+    'Williams_R': (('close', '_low_14', '_high_14'),
+                   lambda c: ((c['_high_14'] - c['close']) / (c['_high_14'] - c['_low_14'])) * -100),
+}
+
+# Every column get_recommendation reads (it recomputes ATR itself)
+RECOMMENDATION_INPUTS = frozenset({
+    'EMA9', 'EMA20', 'EMA50', 'RSI', 'MACD', 'Signal_Line', 'Stoch_K', 'Stoch_D', 'ADX',
+    'Plus_DI', 'Minus_DI', 'VWAP', 'Resistance', 'Support', 'BB_Upper', 'BB_Lower',
+})
+
+
+def resolve(columns=None):
+    """Nodes needed for the requested columns, prerequisites first (None = every column)."""
+    wanted = COLUMNS if columns is None else columns
+    order = []
+    seen = set()
+
+    def visit(name):
+        if name in seen or name not in _GRAPH:
+            return
+        seen.add(name)
+        for dep in _GRAPH[name][0]:
+            visit(dep)
+        order.append(name)
+
+    for name in wanted:
+        if name not in _GRAPH:
+            raise KeyError(f"Unknown indicator {name!r}")
+        visit(name)
+    return order
+
+
+def compute(high, low, close, volume=None, columns=None, sessions=None):
+    """Indicator arrays for equally long OHLCV arrays (1-D, or 2-D bars × tickers).
+
+    columns: indicators wanted (None = all). Only they and their prerequisites are
+    computed; prerequisite indicators (e.g. Plus_DI for ADX) are returned as well.
+    sessions: bool array marking each session's first bar, where VWAP restarts (see
+    vwap.session_starts); None runs VWAP over the whole array.
+    Returns {column: array} in COLUMNS order. VWAP and OBV need volume.
+    """
+    ctx = {
+        'high': np.asarray(high, dtype='float64'),
+        'low': np.asarray(low, dtype='float64'),
+        'close': np.asarray(close, dtype='float64'),
+    }
+    if volume is not None:
+        ctx['volume'] = np.asarray(volume)
+        ctx['_volume_f'] = ctx['volume'].astype('float64')
+    if sessions is not None:
+        ctx['_sessions'] = sessions
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name in resolve(columns):
+            if 'volume' in _GRAPH[name][0] and volume is None:
+                continue
+            ctx[name] = _GRAPH[name][1](ctx)
+    return {name: ctx[name] for name in COLUMNS if name in ctx}
+
+
+def kernel_ready(df):
+    """The kernel assumes complete numeric OHLCV; anything else goes to pandas."""
+    for col in _INPUTS:
+        if col not in df.columns:
+            return False
+        values = df[col].to_numpy()
+        if values.dtype.kind not in 'if' or (values.dtype.kind == 'f' and np.isnan(values).any()):
+            return False
+    return True
+
+
+def session_starts(df):
+    """VWAP session starts for a frame, or None when it is one session (daily and longer bars)."""
+    starts = vwap.session_starts(df.index, df.attrs.get('interval'))
+    return starts if starts[1:].any() else None
+
+
+def calculate(df, columns=None):
+    """Adds indicator columns to df in place and returns it (NumPy kernel).
+
+    columns: the indicators the caller reads (None = all); see compute().
+    """
+    if not kernel_ready(df):
+        return calculate_pandas(df)
+    volume = df['Volume'].to_numpy()
+    values = compute(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), volume, columns,
+                     session_starts(df))
+    for name, arr in values.items():
+        df[name] = arr
+    return df
+
+
+# --- STREAMING ---
+
+_NAN = float('nan')
+
+
+def _ratio(num, den):
+    """num / den with NumPy's semantics for zero denominators (±inf, or NaN for 0/0)."""
+    if den == 0:
+        if num == 0 or math.isnan(num):
+            return _NAN
+        return math.copysign(math.inf, num)
+    return num / den
+
+
+def _full_mean(window, size):
+    """Mean of a full window without NaNs, else NaN (pandas rolling semantics)."""
+    if len(window) < size:
+        return _NAN
+    total = 0.0
+    for v in window:
+        total += v
+    return total / size  # NaN propagates through the sum
+
+
+def _full_std(window, size):
+    if len(window) < size:
+        return _NAN
+    mean = sum(window) / size
+    return math.sqrt(sum((v - mean) ** 2 for v in window) / (size - 1))
+
+
+def _last_extreme(window, size, fn, skip_last=False):
+    values = list(window)
+    if skip_last:
+        values = values[:-1]
+    if len(values) < size:
+        return _NAN
+    return fn(values[-size:])
+
+
+class IndicatorState:
+    """Running indicator state for one series, advanced one bar at a time.
+
+    update() applies a new bar, or revises the last one (same timestamp) while it is still
+    forming. Values equal what calculate() gives over the same bars. frame() returns the
+    last TAIL bars with indicator columns, which is all get_recommendation looks at.
+    The state pickles and round-trips through to_dict()/from_dict().
+    """
+
+    TAIL = 30
+
+    _SCALARS = ('n', 'ema9', 'ema20', 'ema50', 'ema12', 'ema26', 'signal', 'avg_gain', 'avg_loss',
+                'prev_close', 'prev_high', 'prev_low', 'obv')
+    _WINDOWS = {'highs': 21, 'lows': 21, 'closes': 20, 'trs': 14, 'plus_dm': 14, 'minus_dm': 14,
+                'dxs': 14, 'stochs': 3}
+
+    def __init__(self):
+        self.n = 0
+        self.ema9 = self.ema20 = self.ema50 = self.ema12 = self.ema26 = self.signal = _NAN
+        self.avg_gain = self.avg_loss = 0.0
+        self.prev_close = self.prev_high = self.prev_low = _NAN
+        self.obv = 0
+        # Restarts at each session open once the bars turn out to be intraday
+        self.session_vwap = vwap.VWAPState()
+        for name, size in self._WINDOWS.items():
+            setattr(self, name, deque(maxlen=size))
+        self.seed_ts = None
+        self.last_ts = None
+        self.tz = None
+        self._before = None           # state before the last bar, to re-apply a revision
+        self._tail = deque(maxlen=self.TAIL)  # (ts, row)
+
+    def __setstate__(self, data):
+        self.__dict__.update(data)
+        if 'session_vwap' not in data:
+            # Pickled before the VWAP moved into a VWAPState: advance() reseeds from the frame
+            self.session_vwap = vwap.VWAPState()
+            self.seed_ts = None
+
+    # --- state copies ---
+    def _snapshot(self):
+        snap = {name: getattr(self, name) for name in self._SCALARS}
+        for name, size in self._WINDOWS.items():
+            snap[name] = deque(getattr(self, name), maxlen=size)
+        return snap
+
+    def _restore(self, snap):
+        for name in self._SCALARS:
+            setattr(self, name, snap[name])
+        for name, size in self._WINDOWS.items():
+            setattr(self, name, deque(snap[name], maxlen=size))
+
+    def clone(self):
+        other = IndicatorState()
+        other._restore(self._snapshot())
+        other.seed_ts, other.last_ts, other.tz = self.seed_ts, self.last_ts, self.tz
+        other.session_vwap = copy.copy(self.session_vwap)
+        other._before = {k: (deque(v, maxlen=v.maxlen) if isinstance(v, deque) else v)
+                         for k, v in self._before.items()} if self._before else None
+        other._tail = deque(self._tail, maxlen=self.TAIL)
+        return other
+
+    # --- per-bar update ---
+    def _apply(self, open_, high, low, close, volume, session_vwap=None):
+        a9, a20, a50, a12, a26 = 2 / 10, 2 / 21, 2 / 51, 2 / 13, 2 / 27
+        if self.n == 0:
+            self.ema9 = self.ema20 = self.ema50 = self.ema12 = self.ema26 = close
+            self.signal = 0.0
+            tr = high - low
+            plus_dm = minus_dm = _NAN
+        else:
+            delta = close - self.prev_close
+            self.ema9 += a9 * (close - self.ema9)
+            self.ema20 += a20 * (close - self.ema20)
+            self.ema50 += a50 * (close - self.ema50)
+            self.ema12 += a12 * (close - self.ema12)
+            self.ema26 += a26 * (close - self.ema26)
+            self.signal += a9 * ((self.ema12 - self.ema26) - self.signal)
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            self.avg_gain += (gain - self.avg_gain) / 14
+            self.avg_loss += (loss - self.avg_loss) / 14
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+            plus_dm = max(high - self.prev_high, 0.0)
+            minus_dm = max(self.prev_low - low, 0.0)
+            if volume is not None:
+                self.obv = self.obv + volume if delta > 0 else self.obv - volume if delta < 0 else self.obv
+        self.n += 1
+        self.prev_close, self.prev_high, self.prev_low = close, high, low
+
+        self.highs.append(high)
+        self.lows.append(low)
+        self.closes.append(close)
+        self.trs.append(tr)
+        self.plus_dm.append(plus_dm)
+        self.minus_dm.append(minus_dm)
+
+        macd = self.ema12 - self.ema26
+        rsi = 100 - _ratio(100, 1 + _ratio(self.avg_gain, self.avg_loss)) if self.n >= 14 else _NAN
+
+        high_14 = _last_extreme(self.highs, 14, max)
+        low_14 = _last_extreme(self.lows, 14, min)
+        stoch_k = _ratio(close - low_14, high_14 - low_14) * 100
+        self.stochs.append(stoch_k)
+
+        atr = _full_mean(self.trs, 14)
+        plus_di = 100 * _ratio(_full_mean(self.plus_dm, 14), atr)
+        minus_di = 100 * _ratio(_full_mean(self.minus_dm, 14), atr)
+        dx = _ratio(abs(plus_di - minus_di), plus_di + minus_di) * 100
+        self.dxs.append(dx)
+
+        bb_middle = _full_mean(self.closes, 20)
+        bb_std = _full_std(self.closes, 20)
+
+        row = {'Open': open_, 'High': high, 'Low': low, 'Close': close}
+        if volume is not None:
+            row['Volume'] = volume
+        row.update({
+            'EMA9': self.ema9, 'EMA20': self.ema20, 'EMA50': self.ema50, 'RSI': rsi,
+            'MACD': macd, 'Signal_Line': self.signal, 'MACD_Hist': macd - self.signal,
+            'Stoch_K': stoch_k, 'Stoch_D': _full_mean(self.stochs, 3),
+            'ADX': _full_mean(self.dxs, 14), 'Plus_DI': plus_di, 'Minus_DI': minus_di,
+        })
+        if volume is not None:
+            row['VWAP'] = session_vwap
+        row.update({
+            'Resistance': _last_extreme(self.highs, 20, max, skip_last=True),
+            'Support': _last_extreme(self.lows, 20, min, skip_last=True),
+            'BB_Middle': bb_middle, 'BB_Std': bb_std,
+            'BB_Upper': bb_middle + bb_std * 2, 'BB_Lower': bb_middle - bb_std * 2,
+            'ATR': atr,
+        })
+        if volume is not None:
+            row['OBV'] = self.obv
+        row['Williams_R'] = _ratio(high_14 - close, high_14 - low_14) * -100
+        return row
+
+    def update(self, ts, open_, high, low, close, volume=None):
+        """Applies one bar and returns its indicator row. A bar with the last bar's
+        timestamp replaces it (the forming bar was revised)."""
+        ts = pd.Timestamp(ts)
+        if self.last_ts is not None and ts < self.last_ts:
+            raise ValueError(f"Bar {ts} is older than the last applied bar {self.last_ts}")
+        if ts == self.last_ts:
+            self._restore(self._before)
+            self._tail.pop()
+        else:
+            self._before = self._snapshot()
+        if self.seed_ts is None:
+            self.seed_ts, self.tz = ts, (str(ts.tz) if ts.tz is not None else None)
+        # The VWAP state revises a bar with the last bar's timestamp on its own
+        session_vwap = self.session_vwap.update(ts, close, volume) if volume is not None else None
+        row = self._apply(float(open_), float(high), float(low), float(close), volume, session_vwap)
+        self.last_ts = ts
+        self._tail.append((ts, row))
+        return row
+
+    # --- seeding from history ---
+    @classmethod
+    def from_frame(cls, df):
+        """Builds the state for a history frame: one kernel pass, then the last bar through
+        update() so that it can be revised."""
+        state = cls()
+        n = len(df)
+        has_volume = 'Volume' in df.columns
+        interval = df.attrs.get('interval')
+        if interval is not None or n > 1:
+            state.session_vwap.intraday = vwap.is_intraday(df.index, interval)
+        if n < 3 or not kernel_ready(df):
+            for ts, row in zip(df.index, df.itertuples(index=False)):
+                bar = row._asdict()
+                state.update(ts, bar['Open'], bar['High'], bar['Low'], bar['Close'],
+                             bar['Volume'] if has_volume else None)
+            return state
+
+        high = df['High'].to_numpy(dtype='float64')
+        low = df['Low'].to_numpy(dtype='float64')
+        close = df['Close'].to_numpy(dtype='float64')
+        volume = df['Volume'].to_numpy()
+        starts = vwap.session_starts(df.index, interval)
+        values = compute(high, low, close, volume, sessions=starts)
+
+        i = n - 2  # state just before the last bar
+        delta = diff(close)
+        avg_gain = ema(np.where(delta > 0, delta, 0.0), alpha=1 / 14)
+        avg_loss = ema(-np.where(delta < 0, delta, 0.0), alpha=1 / 14)
+        plus_dm = diff(high)
+        minus_dm = -diff(low)
+        plus_dm[plus_dm < 0] = 0
+        minus_dm[minus_dm < 0] = 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dx = (np.abs(values['Plus_DI'] - values['Minus_DI']) / (values['Plus_DI'] + values['Minus_DI'])) * 100
+        vol = volume.astype('float64')
+
+        state.n = i + 1
+        state.ema9, state.ema20, state.ema50 = values['EMA9'][i], values['EMA20'][i], values['EMA50'][i]
+        state.ema12, state.ema26 = ema(close, span=12)[i], ema(close, span=26)[i]
+        state.signal = values['Signal_Line'][i]
+        state.avg_gain, state.avg_loss = avg_gain[i], avg_loss[i]
+        state.prev_close, state.prev_high, state.prev_low = close[i], high[i], low[i]
+        first = int(np.flatnonzero(starts[:i + 1])[-1])
+        running = state.session_vwap
+        running.session = vwap.session_key(df.index[i])
+        running.cum_pv = float(np.cumsum(close[first:i + 1] * vol[first:i + 1])[-1])
+        running.cum_v = float(np.cumsum(vol[first:i + 1])[-1])
+        running.last_ts = df.index[i]
+        state.obv = values['OBV'][i].item()
+        series = {'highs': high, 'lows': low, 'closes': close, 'trs': true_range(high, low, close),
+                  'plus_dm': plus_dm, 'minus_dm': minus_dm, 'dxs': dx, 'stochs': values['Stoch_K']}
+        for name, size in cls._WINDOWS.items():
+            setattr(state, name, deque(series[name][max(0, i + 1 - size):i + 1].tolist(), maxlen=size))
+
+        columns = ['Open', 'High', 'Low', 'Close', 'Volume'] + [c for c in COLUMNS if c in values]
+        start = max(0, i + 1 - (cls.TAIL - 1))
+        tail = df.iloc[start:i + 1]
+        for k, ts in enumerate(tail.index):
+            row = {c: tail[c].iloc[k] for c in ('Open', 'High', 'Low', 'Close', 'Volume')}
+            row.update({c: values[c][start + k] for c in columns[5:]})
+            state._tail.append((ts, {c: row[c] for c in columns}))
+        state.seed_ts = df.index[0]
+        state.tz = str(df.index.tz) if getattr(df.index, 'tz', None) is not None else None
+        state.last_ts = tail.index[-1]
+
+        last = df.iloc[-1]
+        state.update(df.index[-1], last['Open'], last['High'], last['Low'], last['Close'], volume[-1])
+        return state
+
+    def advance(self, df):
+        """Brings the state up to date with a newer copy of the same history window.
+
+        Only bars at or after the last applied one are processed. If the window no longer
+        starts where this state was seeded (it rolled forward) or doesn't overlap, returns a
+        fresh state seeded from df instead — so results always match a full recompute.
+        """
+        if df is None or df.empty:
+            return self
+        if self.seed_ts is None or df.index[0] != self.seed_ts or self.last_ts is None or df.index[-1] < self.last_ts:
+            return IndicatorState.from_frame(df)
+        new = df[df.index >= self.last_ts]
+        if new.empty:
+            return IndicatorState.from_frame(df)
+        has_volume = 'Volume' in df.columns
+        for ts, row in zip(new.index, new.itertuples(index=False)):
+            bar = row._asdict()
+            self.update(ts, bar['Open'], bar['High'], bar['Low'], bar['Close'],
+                        bar['Volume'] if has_volume else None)
+        return self
+
+    # --- output ---
+    def latest(self):
+        return dict(self._tail[-1][1]) if self._tail else {}
+
+    def frame(self):
+        """The last TAIL bars with indicator columns, as calculate() would produce them."""
+        if not self._tail:
+            return pd.DataFrame()
+        index = pd.DatetimeIndex([ts for ts, _ in self._tail])
+        return pd.DataFrame([row for _, row in self._tail], index=index)
+
+    # --- serialization ---
+    def to_dict(self):
+        def ts(value):
+            return value.isoformat() if value is not None else None
+
+        def scalar(value):
+            return value.item() if isinstance(value, np.generic) else value
+
+        data = {
+            'scalars': {name: scalar(getattr(self, name)) for name in self._SCALARS},
+            'windows': {name: [scalar(v) for v in getattr(self, name)] for name in self._WINDOWS},
+            'before': None,
+            'seed_ts': ts(self.seed_ts),
+            'last_ts': ts(self.last_ts),
+            'session_vwap': self.session_vwap.to_dict(),
+            'tail': [[ts(t), {k: scalar(v) for k, v in row.items()}] for t, row in self._tail],
+        }
+        if self._before is not None:
+            data['before'] = {k: ([scalar(x) for x in v] if isinstance(v, deque) else scalar(v))
+                              for k, v in self._before.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        snap = dict(data['scalars'])
+        snap.update(data['windows'])
+        state._restore(snap)
+        if data['before'] is not None:
+            state._before = {k: (deque(v, maxlen=cls._WINDOWS[k]) if k in cls._WINDOWS else v)
+                             for k, v in data['before'].items()}
+        state.seed_ts = pd.Timestamp(data['seed_ts']) if data['seed_ts'] else None
+        state.last_ts = pd.Timestamp(data['last_ts']) if data['last_ts'] else None
+        state.session_vwap = vwap.VWAPState.from_dict(data['session_vwap'])
+        state.tz = str(state.seed_ts.tz) if state.seed_ts is not None and state.seed_ts.tz is not None else None
+        for t, row in data['tail']:
+            state._tail.append((pd.Timestamp(t), row))
+        return state
+
+
+# --- REFERENCE (pandas) ---
+
+def calculate_pandas(df):
+    """Calculates advanced technical indicators: RSI, MACD, EMA, VWAP, Stochastic, ADX, Bollinger."""
+    # EMA (multiple periods)
+    df['EMA9'] = df['Close'].ewm(span=9, adjust=False).mean()
+    df['EMA20'] = df['Close'].ewm(span=20, adjust=False).mean()
+    df['EMA50'] = df['Close'].ewm(span=50, adjust=False).mean()
+
+    # RSI (Wilder's Smoothing / EMA method — matches TradingView/Bloomberg)
+    delta = df['Close'].diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.ewm(alpha=1/14, min_periods=14, adjust=False).mean()
+    avg_loss = loss.ewm(alpha=1/14, min_periods=14, adjust=False).mean()
+    rs = avg_gain / avg_loss
+    df['RSI'] = 100 - (100 / (1 + rs))
+
+    # MACD
+    exp1 = df['Close'].ewm(span=12, adjust=False).mean()
+    exp2 = df['Close'].ewm(span=26, adjust=False).mean()
+    df['MACD'] = exp1 - exp2
+    df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    df['MACD_Hist'] = df['MACD'] - df['Signal_Line']
+
+    # Stochastic Oscillator (%K and %D)
+    low_14 = df['Low'].rolling(window=14).min()
+    high_14 = df['High'].rolling(window=14).max()
+    df['Stoch_K'] = ((df['Close'] - low_14) / (high_14 - low_14)) * 100
+    df['Stoch_D'] = df['Stoch_K'].rolling(window=3).mean()
+
+    # ADX (Average Directional Index — trend strength)
+    plus_dm = df['High'].diff()
+    minus_dm = -df['Low'].diff()
+    plus_dm[plus_dm < 0] = 0
+    minus_dm[minus_dm < 0] = 0
+
+    tr1 = df['High'] - df['Low']
+    tr2 = abs(df['High'] - df['Close'].shift())
+    tr3 = abs(df['Low'] - df['Close'].shift())
+    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+    atr_14 = tr.rolling(window=14).mean()
+
+    plus_di = 100 * (plus_dm.rolling(window=14).mean() / atr_14)
+    minus_di = 100 * (minus_dm.rolling(window=14).mean() / atr_14)
+    dx = (abs(plus_di - minus_di) / (plus_di + minus_di)) * 100
+    df['ADX'] = dx.rolling(window=14).mean()
+    df['Plus_DI'] = plus_di
+    df['Minus_DI'] = minus_di
+
+    # VWAP (Volume Weighted Average Price)
+    if 'Volume' in df.columns:
+        session = pd.Series(vwap.session_starts(df.index, df.attrs.get('interval')), index=df.index).cumsum()
+        cumulative_tp_vol = (df['Close'] * df['Volume']).groupby(session).cumsum()
+        cumulative_vol = df['Volume'].groupby(session).cumsum()
+        df['VWAP'] = cumulative_tp_vol / cumulative_vol
+
+    # Support and Resistance (Reversal Zones)
+    window = 20
+    df['Resistance'] = df['High'].rolling(window=window, center=False).max().shift(1)
+    df['Support'] = df['Low'].rolling(window=window, center=False).min().shift(1)
+
+    # Bollinger Bands
+    df['BB_Middle'] = df['Close'].rolling(window=20).mean()
+    df['BB_Std'] = df['Close'].rolling(window=20).std()
+    df['BB_Upper'] = df['BB_Middle'] + (df['BB_Std'] * 2)
+    df['BB_Lower'] = df['BB_Middle'] - (df['BB_Std'] * 2)
+
+    # ATR (Average True Range — volatility measure)
+    tr1 = df['High'] - df['Low']
+    tr2 = abs(df['High'] - df['Close'].shift())
+    tr3 = abs(df['Low'] - df['Close'].shift())
+    tr_all = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+    df['ATR'] = tr_all.rolling(window=14).mean()
+
+    # OBV (On-Balance Volume — volume momentum): volume signed by the close's move.
+    # Unchanged or missing closes add nothing; a missing volume on a move stays NaN from there on.
+    direction = np.zeros(len(df), dtype='int64')
+    direction[1:] = np.sign(np.nan_to_num(np.diff(df['Close'].to_numpy(dtype='float64')), nan=0.0))
+    df['OBV'] = np.cumsum(np.where(direction == 0, 0, direction * df['Volume'].to_numpy()))
+
+    # Williams %R
+    df['Williams_R'] = ((high_14 - df['Close']) / (high_14 - low_14)) * -100
+
+    return df
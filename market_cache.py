@@ -0,0 +1,369 @@
+"""
+Market Data Cache
+Two tiers used by every market-data path:
+  1. A per-process LRU + TTL cache bounded by total bytes, with per-namespace stats.
+  2. A shared tier on disk (SQLite in WAL mode) that every gunicorn worker reads and writes,
+     so a ticker downloaded by one worker is a hit for the others.
+Expired entries are served while a background thread refreshes them (stale-while-revalidate),
+and keys read often are refreshed shortly before they expire.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from single_flight import coalesce
+
+SHARED_CACHE_DB = os.environ.get('SHARED_CACHE_DB', 'shared_cache.db')
+_PURGE_EVERY = 200  # writes between sweeps of expired rows
+
+_writes = 0
+
+
+def _connect():
+    conn = sqlite3.connect(SHARED_CACHE_DB, timeout=5)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def init_shared_cache():
+    """Creates the cache table if it doesn't exist."""
+    conn = _connect()
+    conn.execute('''CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB,
+        created REAL,
+        expires REAL
+    )''')
+    conn.commit()
+    conn.close()
+
+
+try:
+    init_shared_cache()
+    _SHARED_OK = True
+except Exception as e:
+    print(f"Shared cache disabled: {e}")
+    _SHARED_OK = False
+
+
+def shared_get(key):
+    """Returns (value, created) for a live entry, or (None, 0)."""
+    if not _SHARED_OK:
+        return None, 0
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT value, created, expires FROM cache WHERE key=?", (key,)).fetchone()
+        finally:
+            conn.close()
+        if row and row[2] > time.time():
+            return pickle.loads(row[0]), row[1]
+    except Exception as e:
+        print(f"Shared cache read failed for {key}: {e}")
+    return None, 0
+
+
+def shared_set(key, value, ttl, created=None):
+    """Stores a value for all workers, expiring ttl seconds after created (default now)."""
+    global _writes
+    if not _SHARED_OK:
+        return
+    now = created or time.time()
+    try:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn = _connect()
+        try:
+            conn.execute("INSERT OR REPLACE INTO cache (key, value, created, expires) VALUES (?, ?, ?, ?)",
+                         (key, blob, now, now + ttl))
+            _writes += 1
+            if _writes % _PURGE_EVERY == 0:
+                conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Shared cache write failed for {key}: {e}")
+
+
+# --- IN-PROCESS TIER ---
+MEMORY_CACHE_MAX_BYTES = int(os.environ.get('MARKET_CACHE_MAX_MB', '128')) * 1024 * 1024
+_SWEEP_EVERY = 100  # sets between sweeps of long-expired entries
+
+
+def _sizeof(value):
+    """Approximate resident size of a cached value in bytes."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(index=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+class MemoryCache:
+    """LRU cache bounded by total bytes, with TTL expiry and per-namespace stats."""
+
+    def __init__(self, max_bytes=MEMORY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.resident_bytes = 0
+        self._entries = OrderedDict()  # (namespace, key) -> (value, created, ttl, nbytes)
+        self._stats = {}
+        self._sets = 0
+        self._lock = threading.Lock()
+
+    def _ns(self, namespace):
+        if namespace not in self._stats:
+            self._stats[namespace] = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0,
+                                      'stale_served': 0, 'refreshes': 0, 'entries': 0, 'bytes': 0}
+        return self._stats[namespace]
+
+    def _remove(self, entry_key):
+        value, created, ttl, nbytes = self._entries.pop(entry_key)
+        ns = self._ns(entry_key[0])
+        ns['entries'] -= 1
+        ns['bytes'] -= nbytes
+        self.resident_bytes -= nbytes
+
+    def lookup(self, namespace, key):
+        """Returns (value, created, fresh) — stale entries are still returned, marked not fresh."""
+        entry_key = (namespace, key)
+        with self._lock:
+            ns = self._ns(namespace)
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                ns['misses'] += 1
+                return None, 0, False
+            value, created, ttl, _ = entry
+            if time.time() - created < ttl:
+                self._entries.move_to_end(entry_key)
+                ns['hits'] += 1
+                return value, created, True
+            ns['misses'] += 1
+            ns['expirations'] += 1
+            return value, created, False
+
+    def get(self, namespace, key):
+        """Returns a fresh cached value, or None."""
+        value, _, fresh = self.lookup(namespace, key)
+        return value if fresh else None
+
+    def set(self, namespace, key, value, ttl, created=None):
+        entry_key = (namespace, key)
+        nbytes = _sizeof(value)
+        with self._lock:
+            if entry_key in self._entries:
+                self._remove(entry_key)
+            if nbytes > self.max_bytes:
+                return
+            self._entries[entry_key] = (value, created or time.time(), ttl, nbytes)
+            ns = self._ns(namespace)
+            ns['entries'] += 1
+            ns['bytes'] += nbytes
+            self.resident_bytes += nbytes
+
+            self._sets += 1
+            if self._sets % _SWEEP_EVERY == 0:
+                self._sweep()
+            # Evict least recently used until we fit
+            while self.resident_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._ns(oldest[0])['evictions'] += 1
+
+    def _sweep(self):
+        """Drops entries that expired more than one TTL ago (kept briefly as a fallback)."""
+        now = time.time()
+        for entry_key, (_, created, ttl, _) in list(self._entries.items()):
+            if now - created > ttl * 2:
+                self._remove(entry_key)
+                self._ns(entry_key[0])['evictions'] += 1
+
+    def record(self, namespace, counter):
+        """Bumps one of the namespace counters kept outside lookup/set (e.g. 'refreshes')."""
+        with self._lock:
+            self._ns(namespace)[counter] += 1
+
+    def clear(self, namespace=None):
+        with self._lock:
+            for entry_key in list(self._entries):
+                if namespace is None or entry_key[0] == namespace:
+                    self._remove(entry_key)
+
+    def stats(self):
+        """Per-namespace hits, misses, evictions and resident bytes."""
+        with self._lock:
+            namespaces = {}
+            for name, s in self._stats.items():
+                lookups = s['hits'] + s['misses']
+                namespaces[name] = dict(s, hit_rate=round(s['hits'] / lookups, 3) if lookups else 0)
+            return {
+                'max_bytes': self.max_bytes,
+                'resident_bytes': self.resident_bytes,
+                'entries': len(self._entries),
+                'namespaces': namespaces,
+            }
+
+
+memory_cache = MemoryCache()
+
+
+# --- STALE-WHILE-REVALIDATE ---
+STALE_GRACE = 2        # expired values are served for up to this many TTLs while refreshing,
+STALE_MAX = 600        # but never more than this many seconds past expiry (weekend TTLs are long)
+REFRESH_AHEAD = 0.8    # hot keys are refreshed once this fraction of their TTL has passed
+HOT_HITS = 3           # reads per HOT_WINDOW that make a key hot
+HOT_WINDOW = 60        # seconds
+REFRESH_WORKERS = int(os.environ.get('CACHE_REFRESH_WORKERS', '4'))
+
+
+class HotKeys:
+    """Read counts per key over the last one to two windows."""
+
+    def __init__(self, window=HOT_WINDOW):
+        self.window = window
+        self._current = Counter()
+        self._previous = Counter()
+        self._rotated = time.time()
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        now = time.time()
+        if now - self._rotated >= self.window:
+            # Skip a window entirely if nothing was read during it
+            self._previous = self._current if now - self._rotated < self.window * 2 else Counter()
+            self._current = Counter()
+            self._rotated = now
+
+    def touch(self, namespace, key):
+        """Counts a read and returns the key's recent read count."""
+        entry_key = (namespace, key)
+        with self._lock:
+            self._rotate()
+            self._current[entry_key] += 1
+            return self._current[entry_key] + self._previous[entry_key]
+
+    def top(self, n=10):
+        with self._lock:
+            self._rotate()
+            counts = self._current + self._previous
+            return [{'namespace': ns, 'key': key, 'reads': reads} for (ns, key), reads in counts.most_common(n)]
+
+
+hot_keys = HotKeys()
+
+_refresh_pool = None
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+
+def _schedule_refresh(namespace, key, refresh):
+    """Runs refresh() on the background pool unless one is already queued for this key."""
+    global _refresh_pool
+    entry_key = (namespace, key)
+    with _refresh_lock:
+        if entry_key in _refreshing:
+            return
+        _refreshing.add(entry_key)
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='cache-refresh')
+
+    def run():
+        try:
+            refresh()
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(entry_key)
+
+    memory_cache.record(namespace, 'refreshes')
+    _refresh_pool.submit(run)
+
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, (pd.DataFrame, pd.Series, dict, list)):
+        return len(value) == 0
+    return False
+
+
+def get_cached(namespace, key, ttl):
+    """Returns a live value from the memory or shared tier without fetching, else None."""
+    value = memory_cache.get(namespace, key)
+    if value is not None:
+        return value
+    value, created = shared_get(f"{namespace}|{key}")
+    if value is not None:
+        memory_cache.set(namespace, key, value, ttl, created=created)
+    return value
+
+
+def put(namespace, key, value, ttl):
+    """Stores a value in both tiers."""
+    if _is_empty(value):
+        return
+    memory_cache.set(namespace, key, value, ttl)
+    shared_set(f"{namespace}|{key}", value, ttl)
+
+
+def get_or_fetch(namespace, key, fetch, ttl):
+    """Memory tier → shared tier → fetch(). Empty results are not cached.
+
+    Concurrent misses for the same key (threads or workers) share one fetch().
+    A value that expired recently (see STALE_GRACE/STALE_MAX) is returned at once and
+    refreshed in the background; hot keys are refreshed in the background before they expire.
+    If fetch() fails or returns nothing, a stale in-process value is served instead.
+    """
+    reads = hot_keys.touch(namespace, key)
+    value, created, fresh = memory_cache.lookup(namespace, key)
+    shared_key = f"{namespace}|{key}"
+
+    def recheck(newer_than=0):
+        value, created = shared_get(shared_key)
+        if value is None or created <= newer_than:
+            return None
+        memory_cache.set(namespace, key, value, ttl, created=created)
+        return value
+
+    def fetch_and_store():
+        try:
+            value = fetch()
+        except Exception as e:
+            print(f"Fetch failed for {shared_key}: {e}")
+            return None
+        if not _is_empty(value):
+            now = time.time()
+            memory_cache.set(namespace, key, value, ttl, created=now)
+            shared_set(shared_key, value, ttl, created=now)
+        return value
+
+    def refresh(since):
+        # Another worker may have refreshed it already; only a newer shared value counts
+        return coalesce(shared_key, fetch_and_store, lambda: recheck(newer_than=since))
+
+    age = time.time() - created
+    if fresh:
+        if reads >= HOT_HITS and age > ttl * REFRESH_AHEAD:
+            _schedule_refresh(namespace, key, lambda: refresh(created))
+        return value
+    stale = value
+
+    value = recheck()
+    if value is not None:
+        return value
+    if stale is not None and age - ttl < min(ttl * (STALE_GRACE - 1), STALE_MAX):
+        memory_cache.record(namespace, 'stale_served')
+        _schedule_refresh(namespace, key, lambda: refresh(created))
+        return stale
+
+    value = coalesce(shared_key, fetch_and_store, recheck)
+    if _is_empty(value):
+        return stale if stale is not None else value
+    return value
@@ -0,0 +1,178 @@
+"""
+NYSE Trading Calendar
+Session hours, exchange holidays and early closes, and the cache-expiry policy built on
+them: live data expires at the next bar close, data fetched while the market is closed
+expires at the next session open.
+"""
+from datetime import date, timedelta
+from functools import lru_cache
+
+import pandas as pd
+
+TZ = 'America/New_York'
+OPEN = (9, 30)
+CLOSE = (16, 0)
+EARLY_CLOSE = (13, 0)
+
+BAR_CLOSE_GRACE = 5   # seconds after a bar closes before Yahoo reliably has it
+SETTLE_SECONDS = 900  # the closing auction print can revise the last bar for a while
+MIN_TTL = 5           # never cache live data for less than this (seconds)
+
+_BAR_SECONDS = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800,
+    '60m': 3600, '90m': 5400, '1h': 3600,
+}
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th weekday (Mon=0) of a month; n=-1 for the last one."""
+    if n > 0:
+        d = date(year, month, 1)
+        d += timedelta(days=(weekday - d.weekday()) % 7)
+        return d + timedelta(weeks=n - 1)
+    d = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return d - timedelta(days=(d.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """Western Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(d):
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday."""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+@lru_cache(maxsize=32)
+def holidays(year):
+    """Full-day NYSE closures for a year."""
+    days = {
+        _nth_weekday(year, 1, 0, 3),            # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),            # Washington's Birthday
+        _easter(year) - timedelta(days=2),      # Good Friday
+        _nth_weekday(year, 5, 0, -1),           # Memorial Day
+        _observed(date(year, 7, 4)),            # Independence Day
+        _nth_weekday(year, 9, 0, 1),            # Labor Day
+        _nth_weekday(year, 11, 3, 4),           # Thanksgiving
+        _observed(date(year, 12, 25)),          # Christmas
+    }
+    # New Year's Day on a Saturday is not observed on the Friday before (NYSE rule 7.2)
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return frozenset(days)
+
+
+@lru_cache(maxsize=32)
+def early_closes(year):
+    """1 p.m. closes: July 3, the day after Thanksgiving and Christmas Eve (when trading days)."""
+    days = {
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24),
+    }
+    return frozenset(d for d in days if is_trading_day(d))
+
+
+def is_trading_day(d):
+    return d.weekday() < 5 and d not in holidays(d.year)
+
+
+def session(d):
+    """(open, close) Timestamps in New York time for a trading day, else None."""
+    if not is_trading_day(d):
+        return None
+    close = EARLY_CLOSE if d in early_closes(d.year) else CLOSE
+    day = pd.Timestamp(d, tz=TZ)
+    return (day + pd.Timedelta(hours=OPEN[0], minutes=OPEN[1]),
+            day + pd.Timedelta(hours=close[0], minutes=close[1]))
+
+
+def _now(now=None):
+    if now is None:
+        return pd.Timestamp.now(tz=TZ)
+    now = pd.Timestamp(now, unit='s') if isinstance(now, (int, float)) else pd.Timestamp(now)
+    return now.tz_localize('UTC').tz_convert(TZ) if now.tzinfo is None else now.tz_convert(TZ)
+
+
+def is_open(now=None):
+    now = _now(now)
+    hours = session(now.date())
+    return hours is not None and hours[0] <= now < hours[1]
+
+
+def next_open(now=None):
+    """Start of the next session (the current one's open if we're before it today)."""
+    now = _now(now)
+    d = now.date()
+    for _ in range(15):
+        hours = session(d)
+        if hours is not None and now < hours[0]:
+            return hours[0]
+        d += timedelta(days=1)
+    raise RuntimeError("No trading session in the next two weeks")
+
+
+def previous_close(now=None):
+    """End of the most recent session that has closed."""
+    now = _now(now)
+    d = now.date()
+    for _ in range(15):
+        hours = session(d)
+        if hours is not None and hours[1] <= now:
+            return hours[1]
+        d -= timedelta(days=1)
+    raise RuntimeError("No trading session in the last two weeks")
+
+
+def next_bar_close(interval, now=None):
+    """When the bar currently forming for `interval` closes (session close for daily and up)."""
+    now = _now(now)
+    hours = session(now.date())
+    if hours is None or not (hours[0] <= now < hours[1]):
+        return None
+    seconds = _BAR_SECONDS.get(interval)
+    if seconds is None:
+        return hours[1]
+    elapsed = (now - hours[0]).total_seconds()
+    bar_end = hours[0] + pd.Timedelta(seconds=(elapsed // seconds + 1) * seconds)
+    return min(bar_end, hours[1])
+
+
+def expires_at(interval, max_ttl, now=None):
+    """Epoch seconds at which data for `interval` fetched at `now` should be refetched.
+
+    In session: the next bar close (plus a short grace), but no later than max_ttl —
+    the forming bar keeps moving. Market closed: the next session open, once the last
+    session's closing prints have settled.
+    """
+    now = _now(now)
+    bar_close = next_bar_close(interval, now)
+    if bar_close is None:
+        if (now - previous_close(now)).total_seconds() < SETTLE_SECONDS:
+            return now.timestamp() + max_ttl
+        return next_open(now).timestamp()
+    return min(bar_close.timestamp() + BAR_CLOSE_GRACE, now.timestamp() + max_ttl)
+
+
+def ttl_for(interval, max_ttl, now=None):
+    """Cache TTL in seconds for data of `interval` fetched now (see expires_at)."""
+    now = _now(now)
+    return max(MIN_TTL, int(expires_at(interval, max_ttl, now) - now.timestamp()))
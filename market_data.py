@@ -0,0 +1,393 @@
+"""
+Market Data Providers
+Every call that leaves the process for market data goes through a provider:
+  - YFinanceProvider: live data from Yahoo Finance (default).
+  - FixtureProvider: replays data recorded to disk (Parquet or JSON), for offline
+    benchmarks and load tests.
+Select with MARKET_DATA_PROVIDER=yfinance|fixture (fixtures are read from
+MARKET_DATA_FIXTURES, default ./fixtures). Replayed data never shares storage with live
+data: while the fixture provider is active the bar store, shared cache and signal table use
+their own files (market_data.fixture.db, shared_cache.fixture.db, signals.fixture.db).
+Record fixtures with:
+    python market_data.py record AAPL MSFT ^GSPC --history 6mo:1d 2y:1h
+"""
+import json
+import os
+
+import pandas as pd
+import yfinance as yf
+
+import bar_store
+import market_cache
+
+FIXTURES_DIR = os.environ.get('MARKET_DATA_FIXTURES', 'fixtures')
+
+
+class MarketDataProvider:
+    """Interface for market data sources. Symbols are Yahoo-style ('^GSPC', 'AAPL')."""
+
+    name = 'base'
+    # Set by providers that don't serve live data: the bar store, shared cache and signal
+    # table then use files of their own (market_data.<tag>.db), so their bars never mix with live ones
+    storage_tag = None
+
+    def history(self, symbol, period=None, start=None, interval='1d'):
+        """OHLCV frame (plus Dividends/Stock Splits) for a period or from a start date."""
+        raise NotImplementedError
+
+    def history_many(self, symbols, period=None, start=None, interval='1d'):
+        """{symbol: frame} for many symbols. Providers override this to batch."""
+        frames = {}
+        for sym in symbols:
+            try:
+                frames[sym] = self.history(sym, period=period, start=start, interval=interval)
+            except Exception as e:
+                print(f"History failed for {sym}: {e}")
+        return frames
+
+    def info(self, symbol):
+        """Company info dict."""
+        raise NotImplementedError
+
+    def options(self, symbol):
+        """Option expiration dates (tuple of 'YYYY-MM-DD')."""
+        raise NotImplementedError
+
+    def option_chain(self, symbol, expiry):
+        """(calls, puts) frames for one expiration."""
+        raise NotImplementedError
+
+    def balance_sheet(self, symbol):
+        """Quarterly balance sheet (rows = line items, columns = quarter ends)."""
+        raise NotImplementedError
+
+    def calendar(self, symbol):
+        """Upcoming events dict (earnings/dividend dates)."""
+        raise NotImplementedError
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = 'yfinance'
+
+    def history(self, symbol, period=None, start=None, interval='1d'):
+        t = yf.Ticker(symbol)
+        if start is not None:
+            return t.history(start=start, interval=interval)
+        return t.history(period=period, interval=interval)
+
+    def history_many(self, symbols, period=None, start=None, interval='1d'):
+        """One yf.download call for many symbols, split into {symbol: frame}."""
+        data = yf.download(list(symbols), period=period, start=start, interval=interval, group_by='ticker',
+                           actions=True, ignore_tz=False, progress=False, threads=True)
+        frames = {}
+        if data is None or data.empty:
+            return frames
+        present = set(data.columns.get_level_values(0))
+        for sym in symbols:
+            if sym in present:
+                frames[sym] = data[sym].dropna(subset=['Open', 'High', 'Low', 'Close'], how='all')
+        return frames
+
+    def info(self, symbol):
+        return yf.Ticker(symbol).info
+
+    def options(self, symbol):
+        return yf.Ticker(symbol).options
+
+    def option_chain(self, symbol, expiry):
+        chain = yf.Ticker(symbol).option_chain(expiry)
+        return chain.calls, chain.puts
+
+    def balance_sheet(self, symbol):
+        return yf.Ticker(symbol).quarterly_balance_sheet
+
+    def calendar(self, symbol):
+        return yf.Ticker(symbol).calendar
+
+
+# --- FIXTURES ---
+# Layout: <root>/<SYMBOL>/history_<interval>.parquet|.json, info.json, options.json,
+#         balance_sheet.json, calendar.json
+
+def _symbol_dir(root, symbol):
+    return os.path.join(root, symbol.replace('/', '_'))
+
+
+def _encode_labels(index):
+    if isinstance(index, pd.DatetimeIndex):
+        tz = str(index.tz) if index.tz is not None else None
+        utc = index.tz_convert('UTC') if index.tz is not None else index
+        return {'kind': 'datetime', 'tz': tz, 'values': [int(v) for v in utc.asi8 // 10**9]}
+    return {'kind': 'label', 'values': [str(v) for v in index]}
+
+
+def _decode_labels(spec, name=None):
+    if spec['kind'] == 'datetime':
+        index = pd.to_datetime(spec['values'], unit='s', utc=spec['tz'] is not None)
+        if spec['tz'] is not None:
+            index = index.tz_convert(spec['tz'])
+        return index.rename(name)
+    return pd.Index(spec['values'], name=name)
+
+
+def frame_to_json(df):
+    """JSON-safe dict for a frame whose index and/or columns may be timestamps."""
+    return {
+        'index': _encode_labels(df.index),
+        'index_name': df.index.name,
+        'columns': _encode_labels(df.columns),
+        'data': json.loads(df.to_json(orient='values', double_precision=15)),
+    }
+
+
+def frame_from_json(obj):
+    index = _decode_labels(obj['index'], obj.get('index_name'))
+    columns = _decode_labels(obj['columns'])
+    df = pd.DataFrame(obj['data'], index=index, columns=columns)
+    return df.infer_objects()
+
+
+def _write_json(path, obj):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, default=str)
+
+
+def _read_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_history(root, symbol, interval, df):
+    """Writes a history fixture, as Parquet when pyarrow/fastparquet is installed, else JSON."""
+    path = os.path.join(_symbol_dir(root, symbol), f"history_{interval}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        df.to_parquet(path + '.parquet')
+        return
+    except ImportError:
+        pass
+    _write_json(path + '.json', frame_to_json(df))
+
+
+class FixtureProvider(MarketDataProvider):
+    """Serves recorded data from disk.
+
+    Periods are measured back from the last recorded bar. With align_to_now (default),
+    bar dates are moved forward by whole weeks so the last bar falls in the current week;
+    prices and weekdays are unchanged, and the bar store's calendar windows still line up.
+    """
+
+    name = 'fixture'
+    storage_tag = 'fixture'
+
+    def __init__(self, root=FIXTURES_DIR, align_to_now=True):
+        self.root = root
+        self.align_to_now = align_to_now
+        self._frames = {}
+
+    def _path(self, symbol, name):
+        return os.path.join(_symbol_dir(self.root, symbol), name)
+
+    def _load(self, symbol, name):
+        path = self._path(symbol, name)
+        if not os.path.exists(path):
+            raise KeyError(f"No fixture {name} for {symbol} in {self.root}")
+        return _read_json(path)
+
+    def _history_frame(self, symbol, interval):
+        key = (symbol, interval)
+        if key not in self._frames:
+            base = self._path(symbol, f"history_{interval}")
+            if os.path.exists(base + '.parquet'):
+                df = pd.read_parquet(base + '.parquet')
+            elif os.path.exists(base + '.json'):
+                df = frame_from_json(_read_json(base + '.json'))
+            else:
+                df = pd.DataFrame(columns=bar_store.COLUMNS)
+            if self.align_to_now and isinstance(df.index, pd.DatetimeIndex) and len(df):
+                now = pd.Timestamp.now(tz=df.index.tz)
+                weeks = (now - df.index[-1]).days // 7
+                if weeks > 0:
+                    df.index = df.index + pd.DateOffset(weeks=weeks)
+            self._frames[key] = df
+        return self._frames[key]
+
+    def history(self, symbol, period=None, start=None, interval='1d'):
+        df = self._history_frame(symbol, interval)
+        if df.empty:
+            return df.copy()
+        if start is not None:
+            since = pd.Timestamp(start)
+            if since.tzinfo is None and df.index.tz is not None:
+                since = since.tz_localize(df.index.tz)
+            return df[df.index >= since].copy()
+        now = df.index[-1]
+        now = now.tz_convert('UTC') if now.tzinfo is not None else now.tz_localize('UTC')
+        since = bar_store.window_start(period or 'max', interval, now=now)
+        if since is None:
+            return df.copy()
+        out = df[df.index >= since]
+        days = bar_store._session_days(period or '')
+        if days is not None and not out.empty:
+            sessions = out.index.normalize().unique()
+            out = out[out.index >= sessions[-days:][0]]
+        return out.copy()
+
+    def info(self, symbol):
+        return self._load(symbol, 'info.json')
+
+    def options(self, symbol):
+        try:
+            return tuple(self._load(symbol, 'options.json'))
+        except KeyError:
+            return ()
+
+    def option_chain(self, symbol, expiry):
+        chain = self._load(symbol, 'options.json')[expiry]
+        return pd.DataFrame(chain['calls']), pd.DataFrame(chain['puts'])
+
+    def balance_sheet(self, symbol):
+        try:
+            return frame_from_json(self._load(symbol, 'balance_sheet.json'))
+        except KeyError:
+            return pd.DataFrame()
+
+    def calendar(self, symbol):
+        try:
+            return self._load(symbol, 'calendar.json')
+        except KeyError:
+            return {}
+
+
+def record(symbols, root=FIXTURES_DIR, history=(('6mo', '1d'),), source=None):
+    """Records fixtures for symbols from a live provider (yfinance by default).
+
+    history: (period, interval) pairs to save, one file per interval.
+    """
+    source = source or YFinanceProvider()
+    for sym in symbols:
+        folder = _symbol_dir(root, sym)
+        os.makedirs(folder, exist_ok=True)
+        for period, interval in history:
+            try:
+                save_history(root, sym, interval, source.history(sym, period=period, interval=interval))
+            except Exception as e:
+                print(f"Recording history {period}/{interval} failed for {sym}: {e}")
+        try:
+            _write_json(os.path.join(folder, 'info.json'), source.info(sym))
+        except Exception as e:
+            print(f"Recording info failed for {sym}: {e}")
+        try:
+            chains = {}
+            for expiry in tuple(source.options(sym))[:1]:
+                calls, puts = source.option_chain(sym, expiry)
+                chains[expiry] = {'calls': json.loads(calls.to_json(orient='records', date_format='iso')),
+                                  'puts': json.loads(puts.to_json(orient='records', date_format='iso'))}
+            _write_json(os.path.join(folder, 'options.json'), chains)
+        except Exception as e:
+            print(f"Recording options failed for {sym}: {e}")
+        try:
+            bs = source.balance_sheet(sym)
+            if bs is not None and not bs.empty:
+                _write_json(os.path.join(folder, 'balance_sheet.json'), frame_to_json(bs))
+        except Exception as e:
+            print(f"Recording balance sheet failed for {sym}: {e}")
+        try:
+            _write_json(os.path.join(folder, 'calendar.json'), source.calendar(sym) or {})
+        except Exception as e:
+            print(f"Recording calendar failed for {sym}: {e}")
+
+
+_PROVIDERS = {
+    'yfinance': YFinanceProvider,
+    'fixture': FixtureProvider,
+}
+
+_provider = None
+
+# Stores whose files follow the provider: [(module, path attribute, init function, live path)]
+_stores = []
+
+
+def _tagged(path, tag):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{tag}{ext or '.db'}"
+
+
+def _point_store(store, provider):
+    """Points one store at the provider's file; True if it moved."""
+    module, attr, init, live = store
+    tag = getattr(provider, 'storage_tag', None)
+    path = live if tag is None else _tagged(live, tag)
+    if getattr(module, attr) == path:
+        return False
+    setattr(module, attr, path)
+    try:
+        init()
+    except Exception as e:
+        print(f"Storage {path} for provider {provider.name} unavailable: {e}")
+    return True
+
+
+def _use_storage(provider):
+    """Points every registered store at the provider's files."""
+    moved = [_point_store(store, provider) for store in _stores]
+    if any(moved):
+        # The memory tier holds the other provider's data under the same keys
+        market_cache.memory_cache.clear()
+
+
+def register_store(module, attr, init):
+    """Makes module.<attr>, the path of a SQLite file, follow the provider (see storage_tag).
+
+    The path it holds now is the live data's file; init() creates the tables in a new file.
+    """
+    store = (module, attr, init, getattr(module, attr))
+    _stores.append(store)
+    if _provider is not None:
+        _point_store(store, _provider)
+
+
+def _from_env():
+    name = os.environ.get('MARKET_DATA_PROVIDER', 'yfinance').lower()
+    if name not in _PROVIDERS:
+        raise ValueError(f"Unknown MARKET_DATA_PROVIDER {name!r} (expected one of {', '.join(_PROVIDERS)})")
+    return _PROVIDERS[name]()
+
+
+def get_provider():
+    """The process-wide provider, chosen by MARKET_DATA_PROVIDER when this module is imported."""
+    if _provider is None:
+        set_provider(_from_env())
+    return _provider
+
+
+def set_provider(provider):
+    """Swaps the provider (benchmarks, tests). Returns the previous one."""
+    global _provider
+    previous, _provider = _provider, provider
+    if provider is not None:
+        _use_storage(provider)
+    return previous
+
+
+register_store(bar_store, 'BAR_STORE_DB', bar_store.init_bar_store)
+register_store(market_cache, 'SHARED_CACHE_DB', market_cache.init_shared_cache)
+# Chosen before anything reads the cache, so fixture runs never see the live files
+set_provider(_from_env())
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Record market data fixtures for FixtureProvider.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    rec = sub.add_parser('record')
+    rec.add_argument('symbols', nargs='+')
+    rec.add_argument('--root', default=FIXTURES_DIR)
+    rec.add_argument('--history', nargs='+', default=['6mo:1d'], help='period:interval pairs')
+    args = parser.parse_args()
+
+    pairs = [tuple(h.split(':', 1)) for h in args.history]
+    record(args.symbols, root=args.root, history=pairs)
+    print(f"Recorded {len(args.symbols)} symbols to {args.root}")
@@ -0,0 +1,115 @@
+"""
+Panel Indicator Engine
+Computes indicators for a whole universe in one vectorized pass: frames with the same
+number of bars are stacked into (bars × tickers) arrays and run through the indicator
+kernel together, instead of one DataFrame round trip per ticker.
+The result holds the latest-bar snapshot of every ticker; full per-ticker frames (the
+last TAIL bars, which is all get_recommendation reads) are only built when asked for.
+scan_market and the signal table score whole universes through it. The auto-trader's
+short watch list uses per-ticker IndicatorState instead, so a repeat scan only applies
+the bars that changed; both give the same rows.
+"""
+import numpy as np
+import pandas as pd
+
+import indicators
+
+TAIL = indicators.IndicatorState.TAIL
+
+_OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class _Block:
+    """One kernel pass: tickers whose frames have the same length and volume dtype."""
+
+    def __init__(self, tickers, frames, values):
+        self.tickers = tickers
+        self.frames = frames
+        self.values = values
+
+
+class Panel:
+    """Indicator results for many tickers.
+
+    snapshot: DataFrame indexed by ticker with the source columns and indicator values
+    of each ticker's last bar.
+    """
+
+    def __init__(self, snapshot, blocks, fallback, tail=TAIL):
+        self.snapshot = snapshot
+        self.tail = tail
+        self._blocks = blocks
+        self._fallback = fallback  # ticker -> frame computed on its own (gaps in the data)
+        self._where = {t: (b, i) for b, block in enumerate(blocks) for i, t in enumerate(block.tickers)}
+
+    def __contains__(self, ticker):
+        return ticker in self._where or ticker in self._fallback
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    @property
+    def tickers(self):
+        return list(self.snapshot.index)
+
+    def frame(self, ticker):
+        """The last `tail` bars of one ticker with indicator columns, as calculate() adds them."""
+        if ticker in self._fallback:
+            return self._fallback[ticker].iloc[-self.tail:].copy()
+        b, i = self._where[ticker]
+        block = self._blocks[b]
+        src = block.frames[i]
+        start = max(0, len(src) - self.tail)
+        data = {col: src[col].to_numpy()[start:] for col in src.columns}
+        for name, arr in block.values.items():
+            data[name] = arr[start:, i]
+        return pd.DataFrame(data, index=src.index[start:])
+
+
+def _stack(frames, col):
+    return np.column_stack([df[col].to_numpy() for df in frames])
+
+
+def _sessions(frames):
+    """(bars × tickers) VWAP session starts, or None when every frame is a single session."""
+    starts = [indicators.session_starts(df) for df in frames]
+    if all(s is None for s in starts):
+        return None
+    return np.column_stack([s if s is not None else np.arange(len(df)) == 0 for s, df in zip(starts, frames)])
+
+
+def compute(frames, columns=None, tail=TAIL):
+    """Indicators for {ticker: OHLCV frame} in as few kernel passes as possible.
+
+    columns: indicators wanted (None = all), see indicators.compute().
+    Empty frames are skipped; frames with gaps (NaN) go through indicators.calculate on
+    their own, exactly as a single-ticker caller would.
+    """
+    groups = {}
+    fallback = {}
+    for ticker, df in frames.items():
+        if df is None or df.empty:
+            continue
+        if indicators.kernel_ready(df):
+            groups.setdefault((len(df), df['Volume'].dtype.str), []).append(ticker)
+        else:
+            fallback[ticker] = indicators.calculate(df.copy(), columns)
+
+    blocks = []
+    parts = []
+    for tickers in groups.values():
+        block_frames = [frames[t] for t in tickers]
+        values = indicators.compute(_stack(block_frames, 'High'), _stack(block_frames, 'Low'),
+                                    _stack(block_frames, 'Close'), _stack(block_frames, 'Volume'), columns,
+                                    _sessions(block_frames))
+        blocks.append(_Block(tickers, block_frames, values))
+        last = {col: np.array([df[col].iat[-1] for df in block_frames]) for col in _OHLCV}
+        last.update({name: arr[-1] for name, arr in values.items()})
+        parts.append(pd.DataFrame(last, index=pd.Index(tickers, name='Ticker')))
+    if fallback:
+        rows = pd.DataFrame([df.iloc[-1] for df in fallback.values()], index=list(fallback))
+        parts.append(rows[[c for c in rows.columns if c in _OHLCV or c in indicators.COLUMNS]])
+
+    snapshot = pd.concat(parts) if parts else pd.DataFrame(columns=_OHLCV)
+    snapshot.index.name = 'Ticker'
+    return Panel(snapshot, blocks, fallback, tail)
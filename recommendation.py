@@ -0,0 +1,174 @@
+"""
+Recommendation Scoring
+The multi-factor score behind StockEngine.get_recommendation as a scoring rule table
+(scoring.py), evaluated for every bar at once. Signal labels and SL/TP levels follow from
+the score. evaluate() gives the whole history (backtests, charts); latest() is what users
+see for the last bar, with the same reasons text.
+"""
+import numpy as np
+import pandas as pd
+
+import scoring
+
+# (score threshold, signal, SL and TP offsets from the entry in ATRs), checked top to
+# bottom: buys need score >= threshold, sells score <= threshold
+BUY_SIGNALS = [
+    (4, "Strong Buy (شراء قوي) 🟢🟢", -1.5, 4),
+    (1.5, "Buy (شراء) 🟢", -2, 3),
+]
+SELL_SIGNALS = [
+    (-4, "Strong Sell (بيع قوي) 🔴🔴", 1.5, -4),
+    (-1.5, "Sell (بيع) 🔴", 2, -3),
+]
+HOLD = "Hold (انتظار/مراقبة) 🟡"
+
+TREND_STRENGTH = [
+    (40, "قوي جداً 🔥"),
+    (25, "قوي 💪"),
+    (15, "متوسط ⚡"),
+]
+WEAK_TREND = "ضعيف 😴"
+
+RULES = {
+    'required': ['Open', 'Close', 'EMA20', 'EMA50', 'RSI', 'MACD', 'Signal_Line'],
+    'defaults': {'Stoch_D': None, 'Plus_DI': 0, 'Minus_DI': 0},
+    'define': {
+        'trend_pct': '(Close - prev4_Close) / prev4_Close * 100',
+        'macd_hist': 'MACD - Signal_Line',
+        'bb_width': 'BB_Upper - BB_Lower',
+        'bb_position': '(Close - BB_Lower) / bb_width',
+        'avg_volume': 'mean(Volume, 20)',
+        'stoch_d': 'fill(Stoch_D, Stoch_K)',
+    },
+    'rules': [
+        # 1. Price trend over the last five closes
+        {'group': 'trend', 'when': 'trend_pct > 1.5', 'points': 1, 'side': 'bull', 'reason': "اتجاه صاعد {trend_pct:.1f}%"},
+        {'group': 'trend', 'when': 'trend_pct < -1.5', 'points': -1, 'side': 'bear', 'reason': "اتجاه هابط {trend_pct:.1f}%"},
+        # 2. Close vs EMA20 and EMA50
+        {'group': 'ema', 'when': 'Close > EMA20 and Close > EMA50', 'points': 1, 'side': 'bull', 'reason': "السعر فوق EMA20 و EMA50"},
+        {'group': 'ema', 'when': 'not Close > EMA20 and not Close > EMA50', 'points': -1, 'side': 'bear', 'reason': "السعر تحت EMA20 و EMA50"},
+        # 3. EMA20/EMA50 trend and fresh golden/death crosses
+        {'when': 'EMA20 > EMA50', 'points': 1, 'side': 'bull', 'reason': "EMA20 فوق EMA50 (اتجاه صاعد)"},
+        {'when': 'EMA20 > EMA50 and not prev_EMA20 > prev_EMA50', 'points': 1, 'side': 'bull', 'reason': "تقاطع ذهبي حديث!"},
+        {'when': 'not EMA20 > EMA50', 'points': -1, 'side': 'bear', 'reason': "EMA20 تحت EMA50 (اتجاه هابط)"},
+        {'when': 'not EMA20 > EMA50 and prev_EMA20 > prev_EMA50', 'points': -1, 'side': 'bear', 'reason': "تقاطع سلبي حديث!"},
+        # 4. RSI zones and direction
+        {'group': 'rsi', 'when': 'RSI < 30', 'points': 2, 'side': 'bull', 'reason': "RSI تشبع بيعي قوي ({RSI:.0f})"},
+        {'group': 'rsi', 'when': 'RSI < 45', 'points': 1, 'side': 'bull', 'reason': "RSI منخفض ({RSI:.0f})"},
+        {'group': 'rsi', 'when': 'RSI > 80', 'points': -2, 'side': 'bear', 'reason': "RSI تشبع شرائي شديد ({RSI:.0f})"},
+        {'group': 'rsi', 'when': 'RSI > 65', 'points': -1, 'side': 'bear', 'reason': "RSI مرتفع ({RSI:.0f})"},
+        {'group': 'rsi', 'when': '50 <= RSI <= 60', 'points': 0.5},
+        {'group': 'rsi_direction', 'when': 'RSI > prev_RSI and RSI < 70', 'points': 0.5},
+        {'group': 'rsi_direction', 'when': 'RSI < prev_RSI and RSI > 30', 'points': -0.5},
+        # 5. MACD vs signal line, fresh crosses and histogram momentum
+        {'group': 'macd', 'when': 'MACD > Signal_Line', 'points': 1, 'side': 'bull', 'reason': "MACD إيجابي"},
+        {'when': 'MACD > Signal_Line and prev_MACD <= prev_Signal_Line', 'points': 1, 'side': 'bull', 'reason': "تقاطع MACD صاعد جديد!"},
+        {'group': 'macd', 'when': 'MACD < Signal_Line', 'points': -1, 'side': 'bear', 'reason': "MACD سلبي"},
+        {'when': 'MACD < Signal_Line and prev_MACD >= prev_Signal_Line', 'points': -1, 'side': 'bear', 'reason': "تقاطع MACD هابط جديد!"},
+        {'group': 'macd_hist', 'when': 'macd_hist > prev_macd_hist', 'points': 0.5},
+        {'group': 'macd_hist', 'when': 'macd_hist < prev_macd_hist', 'points': -0.5},
+        # 6. Position inside the Bollinger Bands
+        {'group': 'bollinger', 'when': 'bb_width > 0 and bb_position < 0.2', 'points': 1, 'side': 'bull', 'reason': "السعر قرب الحد الأدنى لبولنجر"},
+        {'group': 'bollinger', 'when': 'bb_width > 0 and bb_position > 0.8', 'points': -1, 'side': 'bear', 'reason': "السعر قرب الحد الأعلى لبولنجر"},
+        # 7. Three candles of the same colour
+        {'group': 'candles', 'when': 'Close > Open and prev_Close > prev_Open and prev2_Close > prev2_Open', 'points': 1, 'side': 'bull', 'reason': "3 شموع خضراء متتالية"},
+        {'group': 'candles', 'when': 'Close < Open and prev_Close < prev_Open and prev2_Close < prev2_Open', 'points': -1, 'side': 'bear', 'reason': "3 شموع حمراء متتالية"},
+        # 8. Volume spike confirming the candle's direction
+        {'group': 'volume', 'when': 'avg_volume > 0 and Volume > avg_volume * 1.5 and Close > Open', 'points': 1, 'side': 'bull', 'reason': "حجم تداول مرتفع مع صعود"},
+        {'group': 'volume', 'when': 'avg_volume > 0 and Volume > avg_volume * 1.5 and Close < Open', 'points': -1, 'side': 'bear', 'reason': "حجم تداول مرتفع مع هبوط"},
+        # 9. Stochastic zones and %K/%D cross
+        {'group': 'stochastic', 'when': 'Stoch_K < 20', 'points': 1, 'side': 'bull', 'reason': "Stochastic تشبع بيعي ({Stoch_K:.0f})"},
+        {'group': 'stochastic', 'when': 'Stoch_K > 80', 'points': -1, 'side': 'bear', 'reason': "Stochastic تشبع شرائي ({Stoch_K:.0f})"},
+        {'group': 'stochastic_cross', 'when': 'Stoch_K > stoch_d and Stoch_K < 50', 'points': 0.5},
+        {'group': 'stochastic_cross', 'when': 'Stoch_K < stoch_d and Stoch_K > 50', 'points': -0.5},
+        # 10. Strong ADX trend in the direction of the dominant DI
+        {'group': 'adx', 'when': 'ADX > 25 and Plus_DI > Minus_DI', 'points': 1, 'side': 'bull', 'reason': "اتجاه قوي صاعد (ADX={ADX:.0f})"},
+        {'group': 'adx', 'when': 'ADX > 25 and Minus_DI > Plus_DI', 'points': -1, 'side': 'bear', 'reason': "اتجاه قوي هابط (ADX={ADX:.0f})"},
+        # 11. Close vs VWAP
+        {'group': 'vwap', 'when': 'Close > VWAP', 'points': 0.5, 'side': 'bull', 'reason': "السعر فوق VWAP"},
+        {'group': 'vwap', 'when': 'Close < VWAP', 'points': -0.5, 'side': 'bear', 'reason': "السعر تحت VWAP"},
+        # 12. EMA9 short-term momentum
+        {'group': 'ema9', 'when': 'Close > EMA9 and EMA9 > EMA20', 'points': 0.5, 'side': 'bull', 'reason': "زخم قصير المدى إيجابي (EMA9)"},
+        {'group': 'ema9', 'when': 'Close < EMA9 and EMA9 < EMA20', 'points': -0.5, 'side': 'bear', 'reason': "زخم قصير المدى سلبي (EMA9)"},
+    ],
+}
+
+TABLE = scoring.table('recommendation', RULES)
+
+_NAN = float('nan')
+
+
+def _column(df, name, default=_NAN):
+    if name not in df.columns:
+        return np.full(len(df), default, dtype='float64')
+    return df[name].to_numpy(dtype='float64', na_value=_NAN)
+
+
+def _levels(df, score):
+    """Signal labels, entry/SL/TP, support/resistance and trend strength for every bar."""
+    n = len(df)
+    close = _column(df, 'Close')
+    atr = _column(df, 'ATR')
+    atr = np.where(np.isnan(atr), close * 0.02, atr)
+    support = _column(df, 'Support')
+    resistance = _column(df, 'Resistance')
+    adx = _column(df, 'ADX')
+    adx = np.where(np.isnan(adx), 0, adx)
+
+    signal = np.full(n, HOLD, dtype=object)
+    sl = np.full(n, _NAN)
+    tp = np.full(n, _NAN)
+    decided = np.zeros(n, dtype=bool)
+    for table, reached in ((BUY_SIGNALS, np.greater_equal), (SELL_SIGNALS, np.less_equal)):
+        for bound, label, sl_atr, tp_atr in table:
+            hit = ~decided & reached(score, bound)
+            signal[hit] = label
+            sl[hit] = close[hit] + sl_atr * atr[hit]
+            tp[hit] = close[hit] + tp_atr * atr[hit]
+            decided |= hit
+
+    strength = np.full(n, WEAK_TREND, dtype=object)
+    for bound, label in reversed(TREND_STRENGTH):
+        strength[adx > bound] = label
+
+    return {
+        'Signal': signal,
+        'Entry': np.where(decided, close, _NAN),
+        'SL': sl,
+        'TP': tp,
+        'Support': np.where(np.isnan(support), close * 0.95, support),
+        'Resistance': np.where(np.isnan(resistance), close * 1.05, resistance),
+        'Trend_Strength': strength,
+    }
+
+
+def evaluate(df):
+    """Score, signal and levels for every bar of an indicator frame (needs ATR as well).
+
+    Returns a DataFrame on df's index: Score, Signal, Entry, SL, TP (NaN on Hold bars),
+    Support, Resistance and Trend_Strength.
+    """
+    score = TABLE.evaluate(df).scores
+    out = {'Score': score}
+    out.update(_levels(df, score))
+    return pd.DataFrame(out, index=df.index)
+
+
+def latest(df):
+    """(signal, levels) for the last bar, exactly as get_recommendation returns them."""
+    if len(df) < 2:
+        raise IndexError("A recommendation needs at least two bars")
+    window = df.iloc[-TABLE.lookback:]
+    result = TABLE.evaluate(window)
+    row = {name: values[-1] for name, values in _levels(window, result.scores).items()}
+
+    levels = {}
+    if row['Signal'] != HOLD:
+        levels = {"Entry": row['Entry'], "SL": row['SL'], "TP": row['TP']}
+    levels["Support"] = row['Support']
+    levels["Resistance"] = row['Resistance']
+    levels["score"] = result.score()
+    levels["trend_strength"] = row['Trend_Strength']
+    levels["reasons_bull"] = result.reasons(side='bull')
+    levels["reasons_bear"] = result.reasons(side='bear')
+    return row['Signal'], levels
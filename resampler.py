@@ -0,0 +1,121 @@
+"""
+Local OHLCV Resampler
+Builds coarser bars (15m → 30m → 1h → 4h → 1d → 1wk) from a finer series that is already
+downloaded, so multi-timeframe views cost one history request instead of one per interval.
+Intraday bins are anchored to the 9:30 session open and never span two sessions (4h bars
+run 9:30–13:30 and 13:30–close).
+"""
+import pandas as pd
+
+import bar_store
+
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+
+# Interval strings as yfinance spells them → pandas offsets
+_RULES = {
+    '1m': '1min', '2m': '2min', '5m': '5min', '15m': '15min', '30m': '30min',
+    '60m': '60min', '90m': '90min', '1h': '60min', '4h': '240min',
+    '1d': '1D', '5d': '5D', '1wk': 'W-MON', '1mo': 'MS', '3mo': 'QS',
+}
+
+_AGG = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+    'Dividends': 'sum',
+    'Stock Splits': 'max',
+}
+
+
+def is_intraday(interval):
+    # Includes built-only intervals such as 4h, which Yahoo doesn't serve
+    return interval in bar_store.INTRADAY_LIMITS or _RULES.get(interval, '').endswith('min')
+
+
+def _bar_length(interval):
+    rule = _RULES[interval]
+    return pd.Timedelta(rule) if is_intraday(interval) else None
+
+
+def _session_bins(index, length):
+    """Start of each bar's bin: 9:30 + k * length on the exchange's wall clock.
+
+    Binning on wall-clock time keeps the edges on the session across DST changes
+    (1h bars run 9:30–10:30 like Yahoo's, 4h bars 9:30–13:30, all year round).
+    """
+    wall = index.tz_localize(None) if index.tz is not None else index
+    day = wall.normalize()
+    bins = day + SESSION_OPEN + ((wall - day - SESSION_OPEN) // length) * length
+    return bins.tz_localize(index.tz) if index.tz is not None else bins
+
+
+def can_build(base_interval, interval):
+    """True if bars of `interval` can be built from bars of `base_interval`."""
+    if base_interval not in _RULES or interval not in _RULES:
+        return False
+    if base_interval == interval or not is_intraday(interval):
+        return True
+    if not is_intraday(base_interval):
+        return False
+    coarse, fine = _bar_length(interval), _bar_length(base_interval)
+    return coarse >= fine and coarse % fine == pd.Timedelta(0)
+
+
+def resample(df, interval, base_interval=None):
+    """Aggregates a history frame to a coarser yfinance interval.
+
+    Open/High/Low/Close/Volume follow the usual first/max/min/last/sum rules.
+    Intraday bins start at the session open; daily bars are labelled at local midnight
+    and weekly bars on the Monday that starts the week, as Yahoo labels them.
+    """
+    if df is None or df.empty or interval == base_interval:
+        return df
+    if base_interval is not None and not can_build(base_interval, interval):
+        raise ValueError(f"Can't build {interval} bars from {base_interval} bars")
+
+    agg = {col: how for col, how in _AGG.items() if col in df.columns}
+    rule = _RULES[interval]
+
+    if is_intraday(interval):
+        out = df.groupby(_session_bins(df.index, pd.Timedelta(rule))).agg(agg)
+        out.index.name = 'Datetime'
+    else:
+        # Group intraday bars by exchange-local session date first
+        if is_intraday(base_interval or '') or df.index.name == 'Datetime':
+            daily = df.groupby(df.index.normalize()).agg(agg)
+        else:
+            daily = df
+        if interval == '1d':
+            out = daily
+        else:
+            out = daily.resample(rule, label='left', closed='left').agg(agg)
+        out.index.name = 'Date'
+
+    # Bins with no trades (nights, weekends, holidays) come back empty
+    out = out.dropna(subset=['Close'])
+    if 'Volume' in out.columns and df['Volume'].dtype.kind == 'i':
+        out['Volume'] = out['Volume'].astype('int64')
+    # pandas carries attrs over; these bars are a different series than the source
+    out.attrs = dict(df.attrs, interval=interval)
+    return out
+
+
+def trim(df, period, interval):
+    """Keeps the bars a `period` request for `interval` would return."""
+    if df is None or df.empty:
+        return df
+    start = bar_store.window_start(period, interval)
+    if start is None:
+        return df
+    return df[df.index >= start].copy()
+
+
+def build_timeframes(base, base_interval, frames):
+    """Builds several (interval, period) views from one base series.
+
+    frames: iterable of (interval, period). Returns {(interval, period): DataFrame}.
+    """
+    return {(interval, period): trim(resample(base, interval, base_interval), period, interval)
+            for interval, period in frames}
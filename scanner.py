@@ -0,0 +1,241 @@
+"""
+Market Scanner
+Runs a universe scan as batches of tickers on a bounded thread pool: each batch is
+downloaded (one batched request, see StockEngine.fetch_many) on a worker while batches
+that already arrived are scored in the calling thread. A batch that takes longer than
+the per-batch timeout, or is still outstanding at the overall deadline, is left behind
+and the scan returns what it has, marked partial. Abandoned downloads still finish in
+the background and warm the cache for the next scan. stream() hands out each batch's
+hits as soon as it is scored, for callers that show results as they come in.
+
+Tracker remembers the last bar each ticker was scored on, so repeated scans only
+re-score tickers with a new (or revised) bar, and reports how signals changed since
+the previous scan (new Buy, signal dropped, ...).
+"""
+import copy
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from market_cache import get_cached, put
+
+SCAN_WORKERS = int(os.environ.get('SCAN_WORKERS', '8'))
+SCAN_BATCH = int(os.environ.get('SCAN_BATCH', '10'))
+SCAN_TIMEOUT = float(os.environ.get('SCAN_TIMEOUT', '6'))    # seconds per batch download
+SCAN_DEADLINE = float(os.environ.get('SCAN_DEADLINE', '8'))  # seconds for the whole scan (serverless limit is 10)
+
+# The default universe: a sample of large S&P 500 names, or SCAN_UNIVERSE=AAPL,MSFT,...
+UNIVERSE = [t.strip().upper() for t in os.environ.get('SCAN_UNIVERSE', ','.join([
+    "AAPL", "MSFT", "NVDA", "TSLA", "META", "AMZN", "GOOG", "AMD", "NFLX", "JPM",
+    "V", "UNH", "HD", "PG", "COST",
+])).split(',') if t.strip()]
+
+
+# Scan state outlives the bars it describes by a wide margin; a missing state only
+# means the next scan scores everything
+STATE_TTL = 24 * 3600
+
+
+class ScanResult(list):
+    """Scan hits in universe order.
+
+    partial: the scan stopped before every ticker was scored; pending lists those tickers.
+    events: signal changes since the previous scan (see diff()).
+    """
+
+    def __init__(self, items=(), pending=(), elapsed=0.0, events=()):
+        super().__init__(items)
+        self.pending = list(pending)
+        self.elapsed = elapsed
+        self.events = list(events)
+
+    @property
+    def partial(self):
+        return bool(self.pending)
+
+
+def batches(tickers, size):
+    size = max(1, int(size))
+    return [tickers[i:i + size] for i in range(0, len(tickers), size)]
+
+
+def stream(tickers, fetch, score, batch_size=None, max_workers=None, timeout=None, deadline=None):
+    """Scans tickers within a time budget, yielding hits as they are found.
+
+    fetch(batch) -> {ticker: frame} runs on the pool; score(frames) -> {ticker: hit or None}
+    runs in the caller as batches arrive. Each batch's hits are yielded as a list (universe
+    order within the batch); the generator returns a ScanResult of all of them. Closing
+    the generator early abandons the outstanding batches.
+    """
+    batch_size = SCAN_BATCH if batch_size is None else batch_size
+    max_workers = SCAN_WORKERS if max_workers is None else max_workers
+    timeout = SCAN_TIMEOUT if timeout is None else timeout
+    deadline = SCAN_DEADLINE if deadline is None else deadline
+
+    tickers = list(dict.fromkeys(tickers))
+    start = time.monotonic()
+    stop_at = start + deadline
+    order = {t: i for i, t in enumerate(tickers)}
+    hits = {}
+    pending = set(tickers)
+    started = {}  # batch -> time its download began (queued batches aren't timed yet)
+    lock = threading.Lock()
+
+    def task(batch):
+        with lock:
+            started[batch] = time.monotonic()
+        return fetch(list(batch))
+
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='scan')
+    waiting = {pool.submit(task, tuple(batch)): tuple(batch) for batch in batches(tickers, batch_size)}
+    try:
+        while waiting:
+            now = time.monotonic()
+            with lock:
+                expired = [f for f, batch in waiting.items()
+                           if not f.done() and batch in started and now - started[batch] > timeout]
+            for f in expired:
+                print(f"Scan batch timed out after {timeout}s: {', '.join(waiting.pop(f))}")
+            if not waiting or now >= stop_at:
+                break
+            with lock:
+                running = [started[batch] + timeout for batch in waiting.values() if batch in started]
+            wake = min([stop_at] + running) - now
+            done, _ = wait(list(waiting), timeout=max(wake, 0.01), return_when=FIRST_COMPLETED)
+            for f in done:
+                batch = waiting.pop(f)
+                try:
+                    found = score(f.result())
+                except Exception as e:
+                    print(f"Error scanning {', '.join(batch)}: {e}")
+                    found = {}
+                pending.difference_update(batch)
+                found = {t: hit for t, hit in found.items() if hit is not None}
+                hits.update(found)
+                if found:
+                    yield [found[t] for t in sorted(found, key=order.get)]
+    finally:
+        # Don't wait for stragglers; queued batches are dropped, running ones finish on their own
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    items = [hits[t] for t in sorted(hits, key=order.get)]
+    return ScanResult(items, sorted(pending, key=order.get), time.monotonic() - start)
+
+
+def drain(scan):
+    """Runs a stream()-style generator to the end and returns its ScanResult."""
+    while True:
+        try:
+            next(scan)
+        except StopIteration as stop:
+            return stop.value
+
+
+def run(tickers, fetch, score, batch_size=None, max_workers=None, timeout=None, deadline=None):
+    """stream() without the intermediate results: returns the ScanResult of the hits."""
+    return drain(stream(tickers, fetch, score, batch_size, max_workers, timeout, deadline))
+
+
+# --- INCREMENTAL SCANS ---
+
+def bar_key(df):
+    """Fingerprint of a frame's last bar: timestamp, close and volume (a revised forming bar changes it)."""
+    last = df.iloc[-1]
+    volume = last['Volume'] if 'Volume' in df.columns else None
+    return (df.index[-1].value, float(last['Close']), None if volume is None else float(volume))
+
+
+def side(signal):
+    """'buy', 'sell' or 'hold' for a recommendation signal label."""
+    if signal and "Buy" in signal:
+        return 'buy'
+    if signal and "Sell" in signal:
+        return 'sell'
+    return 'hold'
+
+
+# Event kinds: the side a ticker moved to, or 'changed' for a new label on the same side
+EVENT_KINDS = {
+    'new_buy': "إشارة شراء جديدة",
+    'new_sell': "إشارة بيع جديدة",
+    'dropped': "انتهت الإشارة",
+    'changed': "تغيرت قوة الإشارة",
+}
+
+
+def diff(previous, current):
+    """Change events between two {ticker: signal label} snapshots, in current's order.
+
+    A ticker seen for the first time only counts when it arrives with a Buy or Sell.
+    """
+    events = []
+    for ticker, new in current.items():
+        old = previous.get(ticker)
+        if old == new:
+            continue
+        old_side, new_side = side(old), side(new)
+        if old_side == new_side:
+            if old is None:
+                continue
+            kind = 'changed'
+        elif new_side == 'hold':
+            kind = 'dropped'
+        else:
+            kind = f"new_{new_side}"
+        events.append({'ticker': ticker, 'kind': kind, 'old': old, 'new': new})
+    return events
+
+
+class Tracker:
+    """What a repeated scan (one universe on one timeframe) last saw, per ticker.
+
+    The state lives in the shared cache, so every worker's scans build on each other:
+    {ticker: (bar_key, record)} where record is the scan's result for that ticker and
+    record['signal'] its recommendation label.
+    """
+
+    def __init__(self, name, ttl=STATE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        cached = get_cached("scan_state", name, ttl)
+        self.baseline = dict(cached) if cached is not None else None
+        self.state = dict(cached or {})
+
+    def changed(self, frames):
+        """The frames whose last bar differs from the one their record was scored on."""
+        with self._lock:
+            return {t: df for t, df in frames.items() if t not in self.state or self.state[t][0] != bar_key(df)}
+
+    def update(self, frames, records):
+        """Stores fresh records ({ticker: record}) with the bars they were scored on.
+
+        A ticker of frames with a new bar but no fresh record (its scoring failed) loses
+        its old record: that one describes a bar that is gone.
+        """
+        with self._lock:
+            for ticker, df in frames.items():
+                key = bar_key(df)
+                if ticker in records:
+                    self.state[ticker] = (key, copy.deepcopy(records[ticker]))
+                elif ticker in self.state and self.state[ticker][0] != key:
+                    del self.state[ticker]
+
+    def records(self, frames):
+        """{ticker: record} for the frames whose record was scored on their current bar,
+        fresh or carried over. The records are copies; the state stays as it was."""
+        with self._lock:
+            return {t: copy.deepcopy(self.state[t][1]) for t, df in frames.items()
+                    if t in self.state and self.state[t][0] == bar_key(df)}
+
+    def save(self):
+        """Persists the state and returns the signal changes since the previous scan
+        (none the first time: there is nothing to compare against)."""
+        with self._lock:
+            put("scan_state", self.name, dict(self.state), self.ttl)
+            if self.baseline is None:
+                return []
+            before = {t: record.get('signal') for t, (_, record) in self.baseline.items()}
+            after = {t: record.get('signal') for t, (_, record) in self.state.items()}
+            return diff(before, after)
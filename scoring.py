@@ -0,0 +1,352 @@
+"""
+Declarative Scoring Rules
+Rule tables (condition, points, reason text) compiled once into vectorized evaluators
+that score every bar of an indicator frame in one pass, or just the last one.
+get_recommendation, the auto-trader's smart score and the report's technical score are
+all tables in this format.
+
+Conditions are small expressions over frame columns, parsed with `ast` and restricted
+to arithmetic, comparisons, and/or/not and a few functions. Nothing is eval'd:
+    Close > EMA20 and EMA20 > prev_EMA20     prev_X / prev3_X: X one / three bars back
+    mean(Volume, 20) > 0                     abs, isnan, fill(x, y), mean(x, n), min, max
+
+A table is a dict:
+    {
+        'base': 50, 'clip': [0, 100],              # optional
+        'required': ['Close', 'RSI'],               # KeyError when missing
+        'defaults': {'RSI': 50, 'EMA20': 'Close'},  # value or column used when missing
+        'define': {'pct': '(Close - prev4_Close) / prev4_Close * 100'},
+        'rules': [
+            {'when': 'RSI < 30', 'points': 15, 'reason': 'RSI low ({RSI:.0f})', 'group': 'rsi'},
+            {'when': 'RSI > 70', 'points': -15, 'group': 'rsi', 'side': 'bear'},
+        ],
+    }
+Rules sharing a group behave like if/elif in table order: only the first match counts.
+Rules that reference a missing column (without a default) never fire. Tables can be
+tuned without code changes: SCORING_RULES_DIR/<name>.json replaces the built-in table.
+"""
+import ast
+import json
+import os
+import re
+import string
+
+import numpy as np
+
+RULES_DIR = os.environ.get('SCORING_RULES_DIR', 'scoring_rules')
+
+_NAN = float('nan')
+_PREV = re.compile(r'^prev(\d*)_(.+)$')
+
+
+# --- EXPRESSIONS ---
+
+class Env:
+    """Column lookup for one evaluation: frame columns, table defaults and definitions."""
+
+    def __init__(self, df, defaults=None, define=None):
+        self.df = df
+        self.n = len(df)
+        self.defaults = defaults or {}
+        self.define = define or {}
+        self._values = {}
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            self._values[name] = self._resolve(name)
+        return self._values[name]
+
+    def _resolve(self, name):
+        if name in self.define:
+            return np.broadcast_to(np.asarray(self.define[name].evaluate(self), dtype='float64'), (self.n,))
+        if name in self.df.columns:
+            return self.df[name].to_numpy(dtype='float64', na_value=_NAN)
+        if name in self.defaults:
+            default = self.defaults[name]
+            if isinstance(default, str):
+                return self[default]
+            return np.full(self.n, _NAN if default is None else default, dtype='float64')
+        raise KeyError(name)
+
+
+def _shift(x, periods):
+    out = np.full(len(x), _NAN)
+    if periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+
+def _rolling_mean(x, window):
+    """NaN-skipping mean of the last `window` values (like Series.tail(window).mean()), NaN before that."""
+    x = np.asarray(x, dtype='float64')
+    out = np.full(len(x), _NAN)
+    if len(x) < window:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(x, window)
+    present = ~np.isnan(windows)
+    total = np.ascontiguousarray(np.where(present, windows, 0.0)).sum(axis=1)
+    count = present.sum(axis=1)
+    out[window - 1:] = np.where(count > 0, total / np.maximum(count, 1), _NAN)
+    return out
+
+
+def _fill(x, y):
+    return np.where(np.isnan(x), y, x)
+
+
+# name -> (arity, fn)
+_FUNCTIONS = {
+    'abs': (1, np.abs),
+    'isnan': (1, np.isnan),
+    'fill': (2, _fill),
+    'min': (2, np.fmin),
+    'max': (2, np.fmax),
+    'mean': (2, _rolling_mean),
+}
+
+_BINARY = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide}
+_COMPARE = {ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+            ast.Eq: np.equal, ast.NotEq: np.not_equal}
+
+# Nesting an expression may use; compiling and evaluating recurse once per level
+MAX_DEPTH = 100
+
+
+class ExpressionError(ValueError):
+    """An expression uses syntax or names the rule language doesn't allow."""
+
+
+def _depth(node):
+    """Nesting depth of a syntax tree (without recursing, so any tree can be measured)."""
+    deepest, stack = 0, [(node, 1)]
+    while stack:
+        node, depth = stack.pop()
+        deepest = max(deepest, depth)
+        stack.extend((child, depth + 1) for child in ast.iter_child_nodes(node))
+    return deepest
+
+
+class Expression:
+    """A compiled expression: evaluate(env) returns an array (or a scalar for constants).
+
+    names: columns/definitions it reads; span: bars of history the last value depends on.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        try:
+            tree = ast.parse(text.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ExpressionError(f"Can't parse {text!r}: {e.msg}") from None
+        except (RecursionError, MemoryError):
+            raise ExpressionError(f"Expression is nested too deeply: {text[:50]!r}...") from None
+        if _depth(tree.body) > MAX_DEPTH:
+            raise ExpressionError(f"Expression is nested more than {MAX_DEPTH} levels deep: {text[:50]!r}...")
+        self.names = set()
+        self.span = 1
+        self.tree = tree.body
+        self._fn = self._compile(tree.body)
+
+    def evaluate(self, env):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._fn(env)
+
+    def _compile(self, node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (bool, int, float)):
+            value = node.value
+            return lambda env: value
+        if isinstance(node, ast.Name):
+            return self._name(node.id)
+        if isinstance(node, ast.UnaryOp):
+            operand = self._compile(node.operand)
+            if isinstance(node.op, ast.Not):
+                return lambda env: np.logical_not(operand(env))
+            if isinstance(node.op, ast.USub):
+                return lambda env: np.negative(operand(env))
+            if isinstance(node.op, ast.UAdd):
+                return operand
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            op = _BINARY[type(node.op)]
+            left, right = self._compile(node.left), self._compile(node.right)
+            return lambda env: op(left(env), right(env))
+        if isinstance(node, ast.BoolOp):
+            parts = [self._compile(v) for v in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+            def boolop(env):
+                out = parts[0](env)
+                for part in parts[1:]:
+                    out = combine(out, part(env))
+                return out
+            return boolop
+        if isinstance(node, ast.Compare) and all(type(op) in _COMPARE for op in node.ops):
+            operands = [self._compile(node.left)] + [self._compile(c) for c in node.comparators]
+            ops = [_COMPARE[type(op)] for op in node.ops]
+
+            def compare(env):
+                values = [f(env) for f in operands]
+                out = ops[0](values[0], values[1])
+                for i in range(1, len(ops)):
+                    out = np.logical_and(out, ops[i](values[i], values[i + 1]))
+                return out
+            return compare
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            name = node.func.id
+            if name not in _FUNCTIONS:
+                raise ExpressionError(f"Unknown function {name!r} in {self.text!r}")
+            arity, fn = _FUNCTIONS[name]
+            if len(node.args) != arity:
+                raise ExpressionError(f"{name}() takes {arity} argument(s) in {self.text!r}")
+            if name == 'mean':
+                window = node.args[1]
+                if not (isinstance(window, ast.Constant) and isinstance(window.value, int) and window.value > 0):
+                    raise ExpressionError(f"mean() needs a positive whole window in {self.text!r}")
+                series = self._compile(node.args[0])
+                self.span += window.value - 1
+                return lambda env: fn(series(env), window.value)
+            args = [self._compile(a) for a in node.args]
+            return lambda env: fn(*[a(env) for a in args])
+        raise ExpressionError(f"Unsupported syntax {ast.dump(node)[:40]}... in {self.text!r}")
+
+    def _name(self, name):
+        if name == 'nan':
+            return lambda env: _NAN
+        match = _PREV.match(name)
+        if match:
+            periods = int(match.group(1) or 1)
+            base = match.group(2)
+            self.names.add(base)
+            self.span = max(self.span, periods + 1)
+            return lambda env: _shift(env[base], periods)
+        self.names.add(name)
+        return lambda env: env[name]
+
+
+# --- RULE TABLES ---
+
+class Rule:
+    __slots__ = ('when', 'points', 'reason', 'side', 'group', 'fields')
+
+    def __init__(self, when, points=0, reason=None, side=None, group=None):
+        self.when = Expression(when)
+        self.points = points
+        self.reason = reason
+        self.side = side
+        self.group = group
+        self.fields = [Expression(f) for _, f, _, _ in string.Formatter().parse(reason or '') if f]
+
+
+class Result:
+    """Scores for every bar; masks[i] tells which bars rule i fired on."""
+
+    def __init__(self, table, env, masks):
+        self.table = table
+        self.masks = masks
+        self._env = env
+        points = np.zeros(env.n)
+        fractional = np.zeros(env.n, dtype=bool)
+        for rule, mask in zip(table.rules, masks):
+            if mask is None:
+                continue
+            points += np.where(mask, rule.points, 0)
+            if rule.points != int(rule.points):
+                fractional |= mask
+        score = table.base + points
+        if table.clip is not None:
+            score = np.clip(score, *table.clip)
+        self.scores = score
+        self.fractional = fractional | (table.base != int(table.base))
+
+    def __len__(self):
+        return len(self.scores)
+
+    def score(self, i=-1):
+        """One bar's score as a Python number: int unless a fractional rule fired."""
+        value = self.scores[i]
+        return float(value) if self.fractional[i] else int(value)
+
+    def reasons(self, i=-1, side=None):
+        """Reason texts of the rules that fired on bar i (optionally one side), in table order."""
+        out = []
+        for rule, mask in zip(self.table.rules, self.masks):
+            if mask is None or rule.reason is None or not mask[i] or (side is not None and rule.side != side):
+                continue
+            values = {f.text: f.evaluate(self._env)[i] for f in rule.fields}
+            out.append(rule.reason.format(**values))
+        return out
+
+
+class RuleTable:
+    """A compiled rule table (see the module docstring for the format)."""
+
+    def __init__(self, spec, name=None):
+        self.name = name
+        self.spec = spec
+        self.base = spec.get('base', 0)
+        clip = spec.get('clip')
+        self.clip = tuple(clip) if clip is not None else None
+        self.required = list(spec.get('required', ()))
+        self.defaults = dict(spec.get('defaults', {}))
+        self.define = {key: Expression(text) for key, text in spec.get('define', {}).items()}
+        self.rules = [Rule(**rule) for rule in spec['rules']]
+        self.lookback = self._lookback()
+
+    def _lookback(self):
+        """Bars of history the last bar's score depends on."""
+        spans = {}
+
+        def span(expr):
+            extra = expr.span - 1
+            deps = [span_of(name) for name in expr.names]
+            return extra + max(deps, default=1)
+
+        def span_of(name):
+            if name not in spans:
+                spans[name] = 1
+                if name in self.define:
+                    spans[name] = span(self.define[name])
+            return spans[name]
+
+        exprs = [r.when for r in self.rules] + [f for r in self.rules for f in r.fields]
+        return max((span(e) for e in exprs), default=1)
+
+    def evaluate(self, df):
+        """Result for every bar of df."""
+        for col in self.required:
+            if col not in df.columns:
+                raise KeyError(col)
+        env = Env(df, self.defaults, self.define)
+        masks = []
+        taken = {}
+        for rule in self.rules:
+            try:
+                mask = np.broadcast_to(np.asarray(rule.when.evaluate(env), dtype=bool), (env.n,))
+            except KeyError:
+                masks.append(None)
+                continue
+            if rule.group is not None:
+                before = taken.get(rule.group)
+                if before is not None:
+                    mask = mask & ~before
+                    taken[rule.group] = before | mask
+                else:
+                    taken[rule.group] = mask
+            masks.append(mask)
+        return Result(self, env, masks)
+
+    def latest(self, df):
+        """Result over just enough trailing bars to score the last one (read it at i=-1)."""
+        return self.evaluate(df.iloc[-self.lookback:])
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), name=os.path.splitext(os.path.basename(path))[0])
+
+
+def table(name, spec):
+    """The rule table `name`: RULES_DIR/<name>.json when it exists, else the built-in spec."""
+    path = os.path.join(RULES_DIR, f"{name}.json")
+    if os.path.exists(path):
+        return RuleTable.load(path)
+    return RuleTable(spec, name=name)
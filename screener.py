@@ -0,0 +1,154 @@
+"""
+Stock Screener
+Custom screens over the latest indicator snapshot of the whole universe:
+    RSI < 30 and Close > EMA50 and shariah == true order by score desc limit 20
+The filter is a scoring.py expression (same syntax, functions and NaN handling as the
+rule tables; field names are case-insensitive, true/false/buy/sell are allowed), compiled
+once and evaluated as one NumPy mask over every ticker. Sorting and the limit run on the
+arrays too, so a screen over a few hundred tickers takes a millisecond or two.
+
+The snapshot is the signal table (signal_table.py), read once per refresh and kept as
+arrays; each screen only checks the table's version (an index-only query). Screen.run()
+also takes any DataFrame indexed by ticker, e.g. a panel.Panel snapshot.
+"""
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+import scoring
+import signal_table
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+MAX_QUERY_LENGTH = 2000  # characters
+
+# Snapshot columns every screen can use besides the indicators: {name: signal table column}
+FIELDS = {
+    'Close': 'price', 'Volume': 'volume', 'change_pct': 'change_pct', 'score': 'score',
+    'Entry': 'entry', 'SL': 'sl', 'TP': 'tp', 'Support': 'support', 'Resistance': 'resistance',
+    'shariah': 'shariah',
+}
+FIELDS.update({name: col for col, name in signal_table.INDICATORS.items()})
+
+# Names usable as constants in a filter
+_CONSTANTS = {'true': 1, 'false': 0}
+
+_QUERY = re.compile(
+    r'^\s*(?:where\s+)?(?P<where>.*?)'
+    r'(?:\s*\border\s+by\s+(?P<order>.+?))?'
+    r'(?:\s*\blimit\s+(?P<limit>\d+))?\s*$',
+    re.IGNORECASE | re.DOTALL)
+_SORT = re.compile(r'^(?P<expr>.+?)(?:\s+(?P<dir>asc|desc))?$', re.IGNORECASE | re.DOTALL)
+
+
+class ScreenError(ValueError):
+    """The query can't be parsed or uses unknown fields."""
+
+
+_snapshots = {}  # interval -> (signal_table.version, frame with every row)
+
+
+def _frame(rows):
+    out = pd.DataFrame({name: pd.to_numeric(rows[col], errors='coerce').astype('float64') for name, col in FIELDS.items()})
+    out['buy'] = (rows['side'] == 'buy').astype('float64')
+    out['sell'] = (rows['side'] == 'sell').astype('float64')
+    out['signal'] = rows['signal']
+    out['updated'] = rows['updated'].astype('float64')
+    out['expires'] = rows['expires'].astype('float64')
+    out.index = pd.Index(rows['ticker'], name='Ticker')
+    return out
+
+
+def snapshot(interval='1d', now=None):
+    """Live signal table rows for a timeframe as a DataFrame indexed by ticker.
+
+    Columns: FIELDS plus 'buy'/'sell' (1 when that is the row's side), 'signal',
+    'updated' and 'expires'. The table is only re-read after a refresh wrote to it.
+    """
+    version = signal_table.version(interval)
+    cached = _snapshots.get(interval)
+    if cached is None or cached[0] != version:
+        cached = (version, _frame(signal_table.frame(interval)))
+        _snapshots[interval] = cached
+    rows = cached[1]
+    now = time.time() if now is None else now
+    return rows[rows['expires'].to_numpy() > now]
+
+
+class Screen:
+    """A compiled screen: filter expression, sort keys and limit."""
+
+    def __init__(self, query):
+        self.query = query
+        if len(query or '') > MAX_QUERY_LENGTH:
+            raise ScreenError(f"Query is longer than {MAX_QUERY_LENGTH} characters")
+        match = _QUERY.match(query or '')
+        if match is None:
+            raise ScreenError(f"Can't parse {query!r}")
+        where = match.group('where').strip()
+        try:
+            self.where = scoring.Expression(where) if where else None
+            self.order = []
+            for part in (match.group('order') or '').split(','):
+                if part.strip():
+                    sort = _SORT.match(part.strip())
+                    self.order.append((scoring.Expression(sort.group('expr')), (sort.group('dir') or 'asc').lower() == 'desc'))
+        except scoring.ExpressionError as e:
+            raise ScreenError(str(e)) from None
+        self.limit = min(int(match.group('limit') or DEFAULT_LIMIT), MAX_LIMIT)
+
+        exprs = ([self.where] if self.where else []) + [expr for expr, _ in self.order]
+        if any(expr.span > 1 for expr in exprs):
+            raise ScreenError("Screens see only the latest bar: prev_X and mean() aren't available")
+        self.names = set().union(*(expr.names for expr in exprs)) if exprs else set()
+
+    def _env(self, df):
+        # Field names are case-insensitive: unknown spellings resolve to the real column
+        columns = {str(c).lower(): c for c in df.columns}
+        defaults = dict(_CONSTANTS)
+        known = ', '.join(sorted(str(c) for c in df.columns if df[c].dtype.kind == 'f'))
+        for name in self.names:
+            if name not in df.columns and name.lower() in _CONSTANTS:
+                continue
+            column = name if name in df.columns else columns.get(name.lower())
+            if column is None:
+                raise ScreenError(f"Unknown field {name!r}. Fields: {known}")
+            # Expressions work on floats; text columns such as 'signal' can't be compared
+            if df[column].dtype.kind not in 'biuf':
+                raise ScreenError(f"Field {name!r} isn't numeric (use buy/sell for the signal). Fields: {known}")
+            if column != name:
+                defaults[name] = column
+        return scoring.Env(df, defaults)
+
+    def run(self, df):
+        """The rows of df (indexed by ticker) that pass the filter, sorted and limited."""
+        env = self._env(df)
+        if df.empty:
+            return df.iloc[:0]
+        with np.errstate(invalid='ignore'):
+            keep = np.ones(len(df), dtype=bool) if self.where is None else \
+                np.broadcast_to(np.asarray(self.where.evaluate(env), dtype=bool), (len(df),))
+            rows = np.flatnonzero(keep)
+            if self.order:
+                # np.lexsort sorts by the last key first; NaNs go last either way
+                keys = []
+                for expr, descending in reversed(self.order):
+                    values = np.broadcast_to(np.asarray(expr.evaluate(env), dtype='float64'), (len(df),))[rows]
+                    keys.append(-values if descending else values)
+                rows = rows[np.lexsort(keys)]
+        return df.iloc[rows[:self.limit]]
+
+
+def screen(query, interval='1d', now=None):
+    """Runs a query against the signal table. Returns (rows as a list of dicts, milliseconds taken)."""
+    start = time.perf_counter()
+    compiled = Screen(query)
+    result = compiled.run(snapshot(interval, now))
+    columns = {'ticker': result.index.tolist()}
+    for name in result.columns:
+        values = result[name].to_numpy()
+        columns[name] = [None if v != v else v for v in values.tolist()]  # NaN -> None for JSON
+    records = [dict(zip(columns, row)) for row in zip(*columns.values())]
+    return records, (time.perf_counter() - start) * 1000
@@ -0,0 +1,472 @@
+"""
+Universe Signal Table
+Recommendation score, signal, SL/TP levels, a few indicator values and Shariah status for
+every ticker of a universe, precomputed by a job and kept in an indexed SQLite table, so
+"give me a stock" is one query instead of a live scan.
+
+The job runs from the command line (cron) or on a background thread in the app:
+    python signal_table.py refresh                      # prices and signals
+    python signal_table.py refresh --shariah            # + Shariah screen (nightly)
+    python signal_table.py top --side buy --limit 10
+Only one gunicorn worker refreshes at a time. Rows expire like cached market data
+(at the next bar close in session, at the next open otherwise), so readers never see
+yesterday's signals as current. A refresh only re-scores tickers whose last bar changed
+and logs how their signals moved (new Buy, signal dropped, ...) in signal_events.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import market_calendar
+import market_data
+import panel
+import scanner
+from single_flight import worker_lock
+from stock_engine import StockEngine
+
+SIGNAL_TABLE_DB = os.environ.get('SIGNAL_TABLE_DB', 'signals.db')
+
+# Tickers to precompute: a comma-separated list or a file with one ticker per line
+# (e.g. S&P 500 or Nasdaq 100 constituents); defaults to the scanner's universe
+SIGNAL_UNIVERSE = os.environ.get('SIGNAL_UNIVERSE', '')
+# Timeframes kept in the table and the history window each one is scored on
+SIGNAL_INTERVALS = {'1d': '6mo', '1h': '1mo'}
+SIGNAL_MAX_AGE = 30 * 60       # a row is stale after this long in session (seconds)
+SIGNAL_REFRESH_SECONDS = int(os.environ.get('SIGNAL_REFRESH_SECONDS', '900'))
+# Run the refresh thread inside the app (long-running servers; use cron on serverless)
+SIGNAL_TABLE_JOB = os.environ.get('SIGNAL_TABLE_JOB', '') == '1'
+
+# Latest indicator values kept per row: {table column: indicator column}
+INDICATORS = {
+    'rsi': 'RSI', 'adx': 'ADX', 'ema9': 'EMA9', 'ema20': 'EMA20', 'ema50': 'EMA50',
+    'macd': 'MACD', 'signal_line': 'Signal_Line', 'stoch_k': 'Stoch_K', 'stoch_d': 'Stoch_D',
+    'plus_di': 'Plus_DI', 'minus_di': 'Minus_DI', 'vwap': 'VWAP', 'bb_upper': 'BB_Upper',
+    'bb_lower': 'BB_Lower', 'atr': 'ATR',
+}
+COLUMNS = ['ticker', 'interval', 'ts', 'price', 'change_pct', 'volume', 'score', 'signal', 'side',
+           'entry', 'sl', 'tp', 'support', 'resistance', 'trend_strength', *INDICATORS,
+           'shariah', 'shariah_reason', 'updated', 'expires']
+_SHARIAH = ('shariah', 'shariah_reason')
+
+
+def _connect():
+    conn = sqlite3.connect(SIGNAL_TABLE_DB, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_signal_table():
+    """Creates the signal table and its indexes if they don't exist."""
+    conn = _connect()
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS signals (
+        ticker TEXT,
+        interval TEXT,
+        ts INTEGER,
+        price REAL,
+        change_pct REAL,
+        volume REAL,
+        score REAL,
+        signal TEXT,
+        side TEXT,
+        entry REAL,
+        sl REAL,
+        tp REAL,
+        support REAL,
+        resistance REAL,
+        trend_strength TEXT,
+        rsi REAL,
+        adx REAL,
+        ema9 REAL,
+        ema20 REAL,
+        ema50 REAL,
+        macd REAL,
+        signal_line REAL,
+        stoch_k REAL,
+        stoch_d REAL,
+        plus_di REAL,
+        minus_di REAL,
+        vwap REAL,
+        bb_upper REAL,
+        bb_lower REAL,
+        atr REAL,
+        shariah INTEGER,
+        shariah_reason TEXT,
+        updated REAL,
+        expires REAL,
+        PRIMARY KEY (ticker, interval)
+    )''')
+    # Tables created before an indicator column was added get it now
+    existing = {row[1] for row in c.execute('PRAGMA table_info(signals)')}
+    for col in INDICATORS:
+        if col not in existing:
+            c.execute(f'ALTER TABLE signals ADD COLUMN {col} REAL')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_signals_side ON signals (interval, side, score)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_signals_shariah ON signals (interval, shariah, score)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_signals_updated ON signals (interval, updated)')
+    c.execute('''CREATE TABLE IF NOT EXISTS signal_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ticker TEXT,
+        interval TEXT,
+        kind TEXT,
+        old_signal TEXT,
+        new_signal TEXT,
+        score REAL,
+        price REAL,
+        created REAL
+    )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_signal_events_interval ON signal_events (interval, id)')
+    c.execute('''CREATE TABLE IF NOT EXISTS signal_runs (
+        interval TEXT PRIMARY KEY,
+        finished REAL,
+        shariah_finished REAL,
+        tickers INTEGER
+    )''')
+    conn.commit()
+    conn.close()
+
+
+try:
+    init_signal_table()
+    _TABLE_OK = True
+except Exception as e:
+    # Read-only filesystems (e.g. serverless) fall back to live scans
+    print(f"Signal table disabled: {e}")
+    _TABLE_OK = False
+
+# Scores of replayed data go to a table of their own (see MarketDataProvider.storage_tag)
+market_data.register_store(sys.modules[__name__], 'SIGNAL_TABLE_DB', init_signal_table)
+
+
+def universe():
+    """The tickers to precompute (see SIGNAL_UNIVERSE)."""
+    spec = SIGNAL_UNIVERSE.strip()
+    if spec and os.path.exists(spec):
+        with open(spec, encoding='utf-8') as f:
+            spec = ','.join(line.split('#', 1)[0] for line in f)
+    tickers = [t.strip().upper() for t in spec.split(',') if t.strip()]
+    return list(dict.fromkeys(tickers)) or list(scanner.UNIVERSE)
+
+
+def _number(value):
+    if value is None:
+        return None
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+# --- JOB ---
+
+def _rows(engine, frames, interval, now):
+    """Signal rows for {ticker: history frame}, scored in one panel pass."""
+    frames = {t: df for t, df in frames.items() if df is not None and len(df) >= 50}
+    computed = panel.compute(frames, indicators.RECOMMENDATION_INPUTS)
+    expires = market_calendar.expires_at(interval, SIGNAL_MAX_AGE, now=now)
+    rows = []
+    for ticker in computed.tickers:
+        try:
+            hist = computed.frame(ticker)
+            signal, levels = engine.get_recommendation(hist)
+        except Exception as e:
+            print(f"Error scoring {ticker}: {e}")
+            continue
+        last, prev = hist.iloc[-1], hist.iloc[-2]
+        rows.append({
+            'ticker': ticker, 'interval': interval, 'ts': int(hist.index[-1].timestamp()),
+            'price': _number(last['Close']),
+            'change_pct': _number((last['Close'] - prev['Close']) / prev['Close'] * 100),
+            'volume': _number(last['Volume']),
+            'score': _number(levels['score']), 'signal': signal, 'side': scanner.side(signal),
+            'entry': _number(levels.get('Entry')), 'sl': _number(levels.get('SL')), 'tp': _number(levels.get('TP')),
+            'support': _number(levels['Support']), 'resistance': _number(levels['Resistance']),
+            'trend_strength': levels['trend_strength'],
+            **{col: _number(last.get(name)) for col, name in INDICATORS.items()},
+            'updated': now, 'expires': expires,
+        })
+    return rows
+
+
+def _shariah(tickers):
+    """{ticker: (compliant 1/0/None, reason)} from StockEngine.screen_shariah_compliance."""
+    def screen(ticker):
+        try:
+            compliant, reason = StockEngine(ticker).screen_shariah_compliance()
+        except Exception as e:
+            compliant, reason = None, str(e)
+        return ticker, (None if compliant is None else int(bool(compliant)), reason)
+
+    with ThreadPoolExecutor(max_workers=scanner.SCAN_WORKERS) as pool:
+        return dict(pool.map(screen, tickers))
+
+
+def write(rows, shariah=None):
+    """Upserts signal rows; Shariah columns are only overwritten when screened this run."""
+    if not rows:
+        return 0
+    shariah = shariah or {}
+    conn = _connect()
+    c = conn.cursor()
+    for row in rows:
+        row = dict(row)
+        if row['ticker'] in shariah:
+            row['shariah'], row['shariah_reason'] = shariah[row['ticker']]
+            cols = COLUMNS
+        else:
+            cols = [col for col in COLUMNS if col not in _SHARIAH]
+        updates = ', '.join(f"{col}=excluded.{col}" for col in cols if col not in ('ticker', 'interval'))
+        c.execute(f"INSERT INTO signals ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+                  f"ON CONFLICT(ticker, interval) DO UPDATE SET {updates}",
+                  [row.get(col) for col in cols])
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def _last_run(interval):
+    conn = _connect()
+    row = conn.execute("SELECT finished, shariah_finished FROM signal_runs WHERE interval=?", (interval,)).fetchone()
+    conn.close()
+    return (row['finished'] or 0, row['shariah_finished'] or 0) if row else (0, 0)
+
+
+def _record_run(interval, tickers, shariah):
+    now = time.time()
+    conn = _connect()
+    conn.execute("INSERT INTO signal_runs (interval, finished, shariah_finished, tickers) VALUES (?, ?, ?, ?) "
+                 "ON CONFLICT(interval) DO UPDATE SET finished=excluded.finished, tickers=excluded.tickers"
+                 + (", shariah_finished=excluded.shariah_finished" if shariah else ""),
+                 (interval, now, now if shariah else None, tickers))
+    conn.commit()
+    conn.close()
+
+
+def _stored(interval, tickers):
+    """{ticker: (last bar key, signal)} for the rows already in the table."""
+    conn = _connect()
+    marks = ','.join('?' * len(tickers))
+    rows = conn.execute(f"SELECT ticker, ts, price, volume, signal FROM signals WHERE interval=? AND ticker IN ({marks})",
+                        [interval, *tickers]).fetchall()
+    conn.close()
+    return {r['ticker']: ((r['ts'], r['price'], r['volume']), r['signal']) for r in rows}
+
+
+def _bar(df):
+    last = df.iloc[-1]
+    return (int(df.index[-1].timestamp()), _number(last['Close']), _number(last['Volume']))
+
+
+def _extend(interval, tickers, now):
+    """Unchanged rows stay current: push their expiry out as if they had just been written."""
+    if not tickers:
+        return
+    conn = _connect()
+    conn.executemany("UPDATE signals SET updated=?, expires=? WHERE ticker=? AND interval=?",
+                     [(now, market_calendar.expires_at(interval, SIGNAL_MAX_AGE, now=now), t, interval) for t in tickers])
+    conn.commit()
+    conn.close()
+
+
+def _log(events, interval, scores, now):
+    if not events:
+        return
+    conn = _connect()
+    conn.executemany("INSERT INTO signal_events (ticker, interval, kind, old_signal, new_signal, score, price, created) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     [(e['ticker'], interval, e['kind'], e['old'], e['new'], *scores.get(e['ticker'], (None, None)), now)
+                      for e in events])
+    conn.commit()
+    conn.close()
+
+
+def update(engine, frames, interval, now=None, shariah=False):
+    """Re-scores the frames whose last bar changed since their row was written and logs
+    how their signals moved. shariah: re-score and screen every frame.
+    Returns (rows written, events).
+    """
+    now = time.time() if now is None else now
+    frames = {t: df for t, df in frames.items() if df is not None and len(df) >= 50}
+    if not frames:
+        return 0, []
+    stored = _stored(interval, list(frames))
+    changed = {t: df for t, df in frames.items() if shariah or t not in stored or stored[t][0] != _bar(df)}
+    rows = _rows(engine, changed, interval, now)
+    written = write(rows, _shariah([r['ticker'] for r in rows]) if shariah else None)
+    _extend(interval, [t for t in frames if t not in changed], now)
+    # Tickers new to the table have no previous signal to move from
+    events = scanner.diff({t: signal for t, (_, signal) in stored.items()},
+                          {r['ticker']: r['signal'] for r in rows if r['ticker'] in stored})
+    _log(events, interval, {r['ticker']: (r['score'], r['price']) for r in rows}, now)
+    return written, events
+
+
+def refresh(tickers=None, interval='1d', period=None, shariah=False, min_age=0):
+    """Brings the rows for tickers (default: the universe) on one timeframe up to date.
+
+    Only tickers with a new bar are re-scored (see update()).
+    shariah: also re-run the Shariah screen (slow: fundamentals per ticker).
+    min_age: skip if another worker refreshed this timeframe less than min_age seconds ago.
+    Returns the number of rows written.
+    """
+    if not _TABLE_OK:
+        return 0
+    tickers = list(tickers) if tickers is not None else universe()
+    period = period or SIGNAL_INTERVALS.get(interval, '6mo')
+    engine = StockEngine("SPY")
+    with worker_lock(f"signal_table|{interval}"):
+        finished, shariah_finished = _last_run(interval)
+        if min_age and time.time() - (shariah_finished if shariah else finished) < min_age:
+            return 0
+        written = 0
+        for batch in scanner.batches(tickers, scanner.SCAN_BATCH * 5):
+            frames = StockEngine.fetch_many(batch, period=period, interval=interval)
+            written += update(engine, frames, interval, shariah=shariah)[0]
+        _record_run(interval, written, shariah)
+    return written
+
+
+# --- READS ---
+
+def top(side='buy', interval='1d', limit=10, shariah=None, now=None):
+    """The strongest live rows on one side ('buy': highest score first, 'sell': lowest).
+
+    shariah: True/False to keep only compliant / non-compliant tickers. Returns a list of
+    dicts; empty when the table has nothing current for this timeframe.
+    """
+    if not _TABLE_OK:
+        return []
+    sql = "SELECT * FROM signals WHERE interval=? AND side=? AND expires>?"
+    args = [interval, side, now if now is not None else time.time()]
+    if shariah is not None:
+        sql += " AND shariah=?"
+        args.append(int(bool(shariah)))
+    sql += f" ORDER BY score {'ASC' if side == 'sell' else 'DESC'} LIMIT ?"
+    args.append(int(limit))
+    conn = _connect()
+    rows = [dict(r) for r in conn.execute(sql, args).fetchall()]
+    conn.close()
+    return rows
+
+
+def frame(interval='1d'):
+    """Every row for a timeframe as a DataFrame with COLUMNS, expired ones included."""
+    if not _TABLE_OK:
+        return pd.DataFrame(columns=COLUMNS)
+    conn = sqlite3.connect(SIGNAL_TABLE_DB, timeout=30)
+    rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM signals WHERE interval=?", (interval,)).fetchall()
+    conn.close()
+    return pd.DataFrame.from_records(rows, columns=COLUMNS)
+
+
+def version(interval='1d'):
+    """Changes whenever a row of the timeframe is written (row count, last write time)."""
+    if not _TABLE_OK:
+        return None
+    conn = sqlite3.connect(SIGNAL_TABLE_DB, timeout=30)
+    row = conn.execute("SELECT COUNT(*), MAX(updated) FROM signals WHERE interval=?", (interval,)).fetchone()
+    conn.close()
+    return tuple(row)
+
+
+def get(ticker, interval='1d', now=None):
+    """The live row for one ticker, or None."""
+    if not _TABLE_OK:
+        return None
+    conn = _connect()
+    row = conn.execute("SELECT * FROM signals WHERE ticker=? AND interval=? AND expires>?",
+                       (ticker.upper(), interval, now if now is not None else time.time())).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+def events(after=0, interval=None, limit=100):
+    """Signal change events with an id above `after`, oldest first (see scanner.diff)."""
+    if not _TABLE_OK:
+        return []
+    sql = "SELECT * FROM signal_events WHERE id>?"
+    args = [int(after)]
+    if interval is not None:
+        sql += " AND interval=?"
+        args.append(interval)
+    sql += " ORDER BY id LIMIT ?"
+    args.append(int(limit))
+    conn = _connect()
+    rows = [dict(r) for r in conn.execute(sql, args).fetchall()]
+    conn.close()
+    return rows
+
+
+def is_current(interval='1d', now=None):
+    """True when the table holds live rows for this timeframe."""
+    if not _TABLE_OK:
+        return False
+    conn = _connect()
+    row = conn.execute("SELECT 1 FROM signals WHERE interval=? AND expires>? LIMIT 1",
+                       (interval, now if now is not None else time.time())).fetchone()
+    conn.close()
+    return row is not None
+
+
+# --- BACKGROUND JOB ---
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _loop(intervals):
+    while True:
+        for interval in intervals:
+            try:
+                if market_calendar.is_open():
+                    refresh(interval=interval, min_age=SIGNAL_REFRESH_SECONDS - 30)
+                else:
+                    # Once per closed market: a full pass on the settled bars, with the Shariah screen
+                    since_close = time.time() - market_calendar.previous_close().timestamp()
+                    if since_close > market_calendar.SETTLE_SECONDS:
+                        refresh(interval=interval, shariah=True, min_age=since_close)
+            except Exception as e:
+                print(f"Signal table refresh failed ({interval}): {e}")
+        time.sleep(SIGNAL_REFRESH_SECONDS)
+
+
+def start_background(intervals=None):
+    """Starts the refresh thread once per process (every worker may call this)."""
+    global _thread
+    with _thread_lock:
+        if _thread is None and _TABLE_OK:
+            _thread = threading.Thread(target=_loop, args=(list(intervals or SIGNAL_INTERVALS),),
+                                       name='signal-table', daemon=True)
+            _thread.start()
+    return _thread
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Precompute the universe signal table.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    ref = sub.add_parser('refresh')
+    ref.add_argument('tickers', nargs='*', help='default: SIGNAL_UNIVERSE')
+    ref.add_argument('--interval', nargs='+', default=list(SIGNAL_INTERVALS))
+    ref.add_argument('--shariah', action='store_true', help='also run the Shariah screen')
+    show = sub.add_parser('top')
+    show.add_argument('--side', default='buy', choices=['buy', 'sell', 'hold'])
+    show.add_argument('--interval', default='1d')
+    show.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == 'refresh':
+        for interval in args.interval:
+            start = time.time()
+            written = refresh(args.tickers or None, interval=interval, shariah=args.shariah)
+            print(f"{interval}: {written} rows in {time.time() - start:.1f}s")
+    else:
+        for row in top(args.side, args.interval, args.limit):
+            print(f"{row['ticker']:<8}{row['score']:>6.1f}  {row['signal']}  ${row['price']:.2f}")
@@ -0,0 +1,130 @@
+"""
+Single-Flight Request Coalescing
+Concurrent callers asking for the same key wait on one in-flight fetch and share its result:
+threads inside a worker through an in-process table, gunicorn workers through a lock file.
+"""
+import copy
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process coalescing only
+    fcntl = None
+
+LOCK_DIR = os.environ.get('SINGLE_FLIGHT_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'eagles_locks'))
+LOCK_TIMEOUT = 20  # seconds to wait for another worker before fetching anyway
+_POLL_INTERVAL = 0.05
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _share(value):
+    """Followers get their own copy of mutable results (callers add indicator columns in place)."""
+    if hasattr(value, 'copy'):
+        try:
+            return value.copy()
+        except Exception:
+            pass
+    return copy.copy(value)
+
+
+class SingleFlight:
+    """Runs fn() once per key while it is in flight; other threads wait for the result."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=LOCK_TIMEOUT * 2):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            if call.event.wait(timeout):
+                if call.error is not None:
+                    raise call.error
+                return _share(call.result)
+            return fn()  # Leader is stuck — don't hold this request hostage
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+
+class worker_lock:
+    """Cross-process lock on a key (flock on a file in LOCK_DIR). Fails open after timeout."""
+
+    def __init__(self, key, timeout=LOCK_TIMEOUT):
+        self.key = key
+        self.timeout = timeout
+        self._fh = None
+
+    def __enter__(self):
+        if fcntl is None:
+            return self
+        try:
+            os.makedirs(LOCK_DIR, exist_ok=True)
+            name = hashlib.sha1(self.key.encode('utf-8')).hexdigest() + '.lock'
+            self._fh = open(os.path.join(LOCK_DIR, name), 'a+')
+        except OSError:
+            self._fh = None
+            return self
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                fcntl.flock(self._fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return self
+            except OSError:
+                if time.time() >= deadline:
+                    self._fh.close()
+                    self._fh = None
+                    return self
+                time.sleep(_POLL_INTERVAL)
+
+    def __exit__(self, *exc):
+        if self._fh is not None:
+            try:
+                fcntl.flock(self._fh, fcntl.LOCK_UN)
+            finally:
+                self._fh.close()
+                self._fh = None
+        return False
+
+
+_flight = SingleFlight()
+
+
+def coalesce(key, fetch, recheck=None):
+    """Runs fetch() once for all concurrent callers of key, across threads and workers.
+
+    recheck() is called after the cross-worker lock is taken; if another worker has
+    just produced the value (e.g. into the shared cache) it returns it and we skip fetch().
+    """
+    def leader():
+        with worker_lock(key):
+            if recheck is not None:
+                value = recheck()
+                if value is not None:
+                    return value
+            return fetch()
+    return _flight.do(key, leader)
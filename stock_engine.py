@@ -1,6 +1,20 @@
-import yfinance as yf
+import copy
+import hashlib
+
 import pandas as pd
 import numpy as np
+import bar_store
+import market_data
+import market_calendar
+import indicators
+import candlesticks
+import recommendation
+import swings
+import vwap
+import panel
+import scanner
+from market_cache import get_or_fetch, get_cached, put
+from single_flight import coalesce
 
 class StockEngine:
     TICKER_MAP = {
@@ -10,119 +24,105 @@ class StockEngine:
         "VIX": "^VIX"
     }
 
+    # Company info and balance sheets change at most daily
+    FUNDAMENTALS_TTL = 6 * 3600  # 6 hours
+    # Incremental indicator states stay valid until their history window rolls forward
+    INDICATOR_STATE_TTL = 6 * 3600
+    # Indicator/recommendation results are keyed by the bars they were computed from, so
+    # they never go stale; the TTL only bounds how long they are kept
+    RESULT_TTL = 15 * 60
+
     def __init__(self, ticker):
         self.original_ticker = ticker.upper()
         self.ticker_symbol = self.TICKER_MAP.get(self.original_ticker, self.original_ticker)
-        self.ticker = yf.Ticker(self.ticker_symbol)
-        
-        try:
-            self.info = self.ticker.info
-        except:
-            self.info = {}
-        
-        if not self.info:
-            self.info = {}
-            
-        if "longName" not in self.info and "shortName" in self.info:
-            self.info["longName"] = self.info["shortName"]
-        
+        self._info = None  # Loaded on first access — creating an engine does no I/O
+
+    @property
+    def info(self):
+        """Company info (.info), loaded lazily from the fundamentals cache."""
+        if self._info is None:
+            try:
+                # Coalesced: concurrent engines for the same ticker share one .info call
+                info = get_or_fetch("info", self.ticker_symbol, lambda: market_data.get_provider().info(self.ticker_symbol), StockEngine.FUNDAMENTALS_TTL)
+                self._info = dict(info or {})
+            except:
+                self._info = {}
+
+            if "longName" not in self._info and "shortName" in self._info:
+                self._info["longName"] = self._info["shortName"]
+        return self._info
+
+    @info.setter
+    def info(self, value):
+        self._info = value
+
     def get_market_data(self, period="1y", interval="1d"):
-        """Fetches historical market data."""
+        """Fetches historical market data (incrementally, via the local bar store)."""
+        provider = market_data.get_provider()
+
+        def fetch(period=None, start=None):
+            return provider.history(self.ticker_symbol, period=period, start=start, interval=interval)
+
         try:
-            history = self.ticker.history(period=period, interval=interval)
+            # Concurrent requests for the same series wait on one download (threads and workers)
+            key = f"history|{self.ticker_symbol}|{period}|{interval}"
+            history = coalesce(key, lambda: bar_store.get_history(self.ticker_symbol, period, interval, fetch))
+            # Identifies the series for the indicator/recommendation result caches
+            history.attrs.update(symbol=self.ticker_symbol, interval=interval)
             return history
         except Exception as e:
             print(f"Error fetching data for {self.original_ticker}: {e}")
             return pd.DataFrame()
 
-    def calculate_technical_indicators(self, df):
-        """Calculates advanced technical indicators: RSI, MACD, EMA, VWAP, Stochastic, ADX, Bollinger."""
-        # EMA (multiple periods)
-        df['EMA9'] = df['Close'].ewm(span=9, adjust=False).mean()
-        df['EMA20'] = df['Close'].ewm(span=20, adjust=False).mean()
-        df['EMA50'] = df['Close'].ewm(span=50, adjust=False).mean()
-        
-        # RSI (Wilder's Smoothing / EMA method — matches TradingView/Bloomberg)
-        delta = df['Close'].diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        avg_gain = gain.ewm(alpha=1/14, min_periods=14, adjust=False).mean()
-        avg_loss = loss.ewm(alpha=1/14, min_periods=14, adjust=False).mean()
-        rs = avg_gain / avg_loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        exp1 = df['Close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['Close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = exp1 - exp2
-        df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Hist'] = df['MACD'] - df['Signal_Line']
-        
-        # Stochastic Oscillator (%K and %D)
-        low_14 = df['Low'].rolling(window=14).min()
-        high_14 = df['High'].rolling(window=14).max()
-        df['Stoch_K'] = ((df['Close'] - low_14) / (high_14 - low_14)) * 100
-        df['Stoch_D'] = df['Stoch_K'].rolling(window=3).mean()
-        
-        # ADX (Average Directional Index — trend strength)
-        plus_dm = df['High'].diff()
-        minus_dm = df['Low'].diff().apply(lambda x: -x)
-        plus_dm[plus_dm < 0] = 0
-        minus_dm[minus_dm < 0] = 0
-        
-        tr1 = df['High'] - df['Low']
-        tr2 = abs(df['High'] - df['Close'].shift())
-        tr3 = abs(df['Low'] - df['Close'].shift())
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        atr_14 = tr.rolling(window=14).mean()
-        
-        plus_di = 100 * (plus_dm.rolling(window=14).mean() / atr_14)
-        minus_di = 100 * (minus_dm.rolling(window=14).mean() / atr_14)
-        dx = (abs(plus_di - minus_di) / (plus_di + minus_di)) * 100
-        df['ADX'] = dx.rolling(window=14).mean()
-        df['Plus_DI'] = plus_di
-        df['Minus_DI'] = minus_di
-        
-        # VWAP (Volume Weighted Average Price)
-        if 'Volume' in df.columns:
-            cumulative_tp_vol = (df['Close'] * df['Volume']).cumsum()
-            cumulative_vol = df['Volume'].cumsum()
-            df['VWAP'] = cumulative_tp_vol / cumulative_vol
-        
-        # Support and Resistance (Reversal Zones)
-        window = 20
-        df['Resistance'] = df['High'].rolling(window=window, center=False).max().shift(1)
-        df['Support'] = df['Low'].rolling(window=window, center=False).min().shift(1)
-
-        # Bollinger Bands
-        df['BB_Middle'] = df['Close'].rolling(window=20).mean()
-        df['BB_Std'] = df['Close'].rolling(window=20).std()
-        df['BB_Upper'] = df['BB_Middle'] + (df['BB_Std'] * 2)
-        df['BB_Lower'] = df['BB_Middle'] - (df['BB_Std'] * 2)
-        
-        # ATR (Average True Range — volatility measure)
-        tr1 = df['High'] - df['Low']
-        tr2 = abs(df['High'] - df['Close'].shift())
-        tr3 = abs(df['Low'] - df['Close'].shift())
-        tr_all = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        df['ATR'] = tr_all.rolling(window=14).mean()
-        
-        # OBV (On-Balance Volume — volume momentum)
-        obv = [0]
-        for i in range(1, len(df)):
-            if df['Close'].iloc[i] > df['Close'].iloc[i-1]:
-                obv.append(obv[-1] + df['Volume'].iloc[i])
-            elif df['Close'].iloc[i] < df['Close'].iloc[i-1]:
-                obv.append(obv[-1] - df['Volume'].iloc[i])
-            else:
-                obv.append(obv[-1])
-        df['OBV'] = obv
-        
-        # Williams %R
-        df['Williams_R'] = ((high_14 - df['Close']) / (high_14 - low_14)) * -100
-        
+    @staticmethod
+    def _result_key(df, *parts):
+        """Cache key for results computed from df, or None when df's source is unknown.
+
+        Frames from get_market_data/fetch_many carry their symbol and interval in df.attrs;
+        the window (first/last bar, length) and a digest of every bar's OHLCV pin down the
+        data, so a revised forming bar or a re-adjusted history gets a new key.
+        """
+        symbol, interval = df.attrs.get('symbol'), df.attrs.get('interval')
+        if symbol is None or interval is None or df.empty or not isinstance(df.index, pd.DatetimeIndex):
+            return None
+        values = df[[col for col in ('Open', 'High', 'Low', 'Close', 'Volume') if col in df.columns]]
+        digest = hashlib.blake2b(np.ascontiguousarray(values.to_numpy(dtype='float64')).tobytes(), digest_size=8).hexdigest()
+        return "|".join([symbol, interval, str(df.index[0].value), str(df.index[-1].value), str(len(df)), digest, *parts])
+
+    def calculate_technical_indicators(self, df, columns=None):
+        """Calculates advanced technical indicators: RSI, MACD, EMA, VWAP, Stochastic, ADX, Bollinger.
+
+        columns: only compute these (and what they depend on), e.g. indicators.RECOMMENDATION_INPUTS.
+        Results are cached per source series, so callers that see the same bars share one computation.
+        """
+        wanted = "all" if columns is None else ",".join(sorted(columns))
+        key = StockEngine._result_key(df, wanted)
+        if key is None:
+            return indicators.calculate(df, columns)
+        cached = get_cached("indicators", key, StockEngine.RESULT_TTL)
+        if cached is None and columns is not None:
+            cached = get_cached("indicators", StockEngine._result_key(df, "all"), StockEngine.RESULT_TTL)
+        if cached is not None:
+            return cached.copy()
+        df = indicators.calculate(df, columns)
+        put("indicators", key, df.copy(), StockEngine.RESULT_TTL)
         return df
 
+    def indicator_state(self, df, period, interval):
+        """Incremental indicators for a history window (cached per ticker, period and interval).
+
+        Only bars newer than the cached state are applied; state.frame() is the indicator
+        tail get_recommendation needs.
+        """
+        key = f"{self.ticker_symbol}|{period}|{interval}"
+        cached = get_cached("indicator_state", key, StockEngine.INDICATOR_STATE_TTL)
+        if cached is not None:
+            state = cached.clone().advance(df)
+        else:
+            state = indicators.IndicatorState.from_frame(df)
+        put("indicator_state", key, state, StockEngine.INDICATOR_STATE_TTL)
+        return state
+
     def screen_shariah_compliance(self):
         """
         Screens for Shariah compliance based on common financial ratios.
@@ -148,8 +148,9 @@ class StockEngine:
                 return None, "بيانات القيمة السوقية مفقودة"
 
             # Balance Sheet Data
-            balance_sheet = self.ticker.quarterly_balance_sheet
-            if balance_sheet.empty:
+            balance_sheet = get_or_fetch("balance_sheet", self.ticker_symbol,
+                                         lambda: market_data.get_provider().balance_sheet(self.ticker_symbol), StockEngine.FUNDAMENTALS_TTL)
+            if balance_sheet is None or balance_sheet.empty:
                 return None, "بيانات الميزانية العمومية مفقودة"
             
             latest_bs = balance_sheet.iloc[:, 0] # Get most recent quarter
@@ -207,392 +208,98 @@ class StockEngine:
 
     def detect_candlestick_patterns(self, df):
         """Detects major Japanese candlestick patterns on the last few candles."""
-        patterns = []
-        if len(df) < 3:
-            return patterns
-        
-        latest = df.iloc[-1]
-        prev = df.iloc[-2]
-        prev2 = df.iloc[-3]
-        
-        body = abs(latest['Close'] - latest['Open'])
-        upper_shadow = latest['High'] - max(latest['Close'], latest['Open'])
-        lower_shadow = min(latest['Close'], latest['Open']) - latest['Low']
-        total_range = latest['High'] - latest['Low']
-        
-        prev_body = abs(prev['Close'] - prev['Open'])
-        
-        if total_range == 0:
-            return patterns
-        
-        # 1. Hammer (bullish reversal)
-        if (lower_shadow > body * 2 and upper_shadow < body * 0.5 
-            and latest['Close'] > latest['Open'] and prev['Close'] < prev['Open']):
-            patterns.append(("🔨 مطرقة (Hammer)", "صعودي", "نمط انعكاسي صعودي قوي"))
-        
-        # 2. Inverted Hammer
-        if (upper_shadow > body * 2 and lower_shadow < body * 0.5 
-            and prev['Close'] < prev['Open']):
-            patterns.append(("🔨 مطرقة مقلوبة (Inverted Hammer)", "صعودي", "إشارة انعكاس صعودي محتمل"))
-        
-        # 3. Bullish Engulfing
-        if (prev['Close'] < prev['Open'] and latest['Close'] > latest['Open']
-            and latest['Open'] <= prev['Close'] and latest['Close'] >= prev['Open']
-            and body > prev_body):
-            patterns.append(("🟢 ابتلاع صعودي (Bullish Engulfing)", "صعودي", "إشارة انعكاس صعودي قوية جداً"))
-        
-        # 4. Bearish Engulfing
-        if (prev['Close'] > prev['Open'] and latest['Close'] < latest['Open']
-            and latest['Open'] >= prev['Close'] and latest['Close'] <= prev['Open']
-            and body > prev_body):
-            patterns.append(("🔴 ابتلاع هبوطي (Bearish Engulfing)", "هبوطي", "إشارة انعكاس هبوطي قوية جداً"))
-        
-        # 5. Doji
-        if body < total_range * 0.1 and total_range > 0:
-            patterns.append(("✳️ دوجي (Doji)", "محايد", "تردد في السوق — انتظر تأكيد الاتجاه"))
-        
-        # 6. Morning Star (bullish — 3 candle pattern)
-        if (prev2['Close'] < prev2['Open']  # Big red
-            and abs(prev['Close'] - prev['Open']) < abs(prev2['Close'] - prev2['Open']) * 0.3  # Small body
-            and latest['Close'] > latest['Open']  # Big green
-            and latest['Close'] > (prev2['Open'] + prev2['Close']) / 2):
-            patterns.append(("⭐ نجمة الصباح (Morning Star)", "صعودي", "نمط انعكاسي صعودي ثلاثي قوي"))
-        
-        # 7. Evening Star (bearish — 3 candle pattern)
-        if (prev2['Close'] > prev2['Open']  # Big green
-            and abs(prev['Close'] - prev['Open']) < abs(prev2['Close'] - prev2['Open']) * 0.3  # Small body
-            and latest['Close'] < latest['Open']  # Big red
-            and latest['Close'] < (prev2['Open'] + prev2['Close']) / 2):
-            patterns.append(("⭐ نجمة المساء (Evening Star)", "هبوطي", "نمط انعكاسي هبوطي ثلاثي قوي"))
-        
-        # 8. Three White Soldiers
-        if (len(df) >= 3 
-            and all(df['Close'].iloc[-i] > df['Open'].iloc[-i] for i in range(1, 4))
-            and df['Close'].iloc[-1] > df['Close'].iloc[-2] > df['Close'].iloc[-3]):
-            patterns.append(("🟢🟢🟢 ثلاث جنود بيض (Three White Soldiers)", "صعودي", "زخم صعودي قوي جداً"))
-        
-        # 9. Three Black Crows
-        if (len(df) >= 3 
-            and all(df['Close'].iloc[-i] < df['Open'].iloc[-i] for i in range(1, 4))
-            and df['Close'].iloc[-1] < df['Close'].iloc[-2] < df['Close'].iloc[-3]):
-            patterns.append(("🔴🔴🔴 ثلاث غربان سود (Three Black Crows)", "هبوطي", "زخم هبوطي قوي جداً"))
-        
-        return patterns
-
-    def calculate_fibonacci_levels(self, df, lookback=50):
-        """Calculates Fibonacci retracement levels from recent swing high/low."""
-        if len(df) < lookback:
-            lookback = len(df)
-        
-        recent = df.tail(lookback)
-        swing_high = recent['High'].max()
-        swing_low = recent['Low'].min()
-        diff = swing_high - swing_low
-        
-        fib_levels = {
-            "0.0%": swing_high,
-            "23.6%": swing_high - (diff * 0.236),
-            "38.2%": swing_high - (diff * 0.382),
-            "50.0%": swing_high - (diff * 0.500),
-            "61.8%": swing_high - (diff * 0.618),
-            "78.6%": swing_high - (diff * 0.786),
-            "100%": swing_low
-        }
-        
-        return fib_levels
+        return candlesticks.latest(df)
 
     def get_recommendation(self, df):
-        """Advanced recommendation engine with multi-factor scoring."""
+        """Advanced recommendation engine with multi-factor scoring (cached per source series)."""
+        key = StockEngine._result_key(df, ",".join(c for c in df.columns.astype(str) if c != 'ATR'))
+        if key is not None:
+            cached = get_cached("recommendation", key, StockEngine.RESULT_TTL)
+            if cached is not None:
+                if 'ATR' not in df.columns:
+                    self.calculate_atr(df)
+                return copy.deepcopy(cached)
+        result = self._score_recommendation(df)
+        if key is not None:
+            put("recommendation", key, copy.deepcopy(result), StockEngine.RESULT_TTL)
+        return result
+
+    def _score_recommendation(self, df):
         df = self.calculate_atr(df)
-        latest = df.iloc[-1]
-        prev = df.iloc[-2]
-        
-        score = 0
-        reasons_bull = []
-        reasons_bear = []
-        
-        # === 1. Price Trend (Short-term direction) ===
-        if len(df) >= 5:
-            recent_5 = df['Close'].tail(5)
-            pct_change_5 = (recent_5.iloc[-1] - recent_5.iloc[0]) / recent_5.iloc[0] * 100
-            if pct_change_5 > 1.5:
-                score += 1
-                reasons_bull.append(f"اتجاه صاعد {pct_change_5:.1f}%")
-            elif pct_change_5 < -1.5:
-                score -= 1
-                reasons_bear.append(f"اتجاه هابط {pct_change_5:.1f}%")
-        
-        # === 2. EMA Position (Close vs EMA20 and EMA50) ===
-        above_ema20 = latest['Close'] > latest['EMA20']
-        above_ema50 = latest['Close'] > latest['EMA50']
-        
-        if above_ema20 and above_ema50:
-            score += 1
-            reasons_bull.append("السعر فوق EMA20 و EMA50")
-        elif not above_ema20 and not above_ema50:
-            score -= 1
-            reasons_bear.append("السعر تحت EMA20 و EMA50")
-            
-        # === 3. EMA Crossover (Golden/Death Cross) ===
-        ema20_above_ema50 = latest['EMA20'] > latest['EMA50']
-        prev_ema20_above_ema50 = prev['EMA20'] > prev['EMA50']
-        
-        if ema20_above_ema50:
-            score += 1
-            reasons_bull.append("EMA20 فوق EMA50 (اتجاه صاعد)")
-            if not prev_ema20_above_ema50:
-                score += 1  # Fresh golden cross
-                reasons_bull.append("تقاطع ذهبي حديث!")
-        else:
-            score -= 1
-            reasons_bear.append("EMA20 تحت EMA50 (اتجاه هابط)")
-            if prev_ema20_above_ema50:
-                score -= 1  # Fresh death cross
-                reasons_bear.append("تقاطع سلبي حديث!")
-        
-        # === 4. RSI Analysis (more nuanced) ===
-        rsi = latest['RSI']
-        if rsi < 30:
-            score += 2  # Oversold - strong buy signal
-            reasons_bull.append(f"RSI تشبع بيعي قوي ({rsi:.0f})")
-        elif rsi < 45:
-            score += 1
-            reasons_bull.append(f"RSI منخفض ({rsi:.0f})")
-        elif rsi > 80:
-            score -= 2  # Extremely overbought
-            reasons_bear.append(f"RSI تشبع شرائي شديد ({rsi:.0f})")
-        elif rsi > 65:
-            score -= 1
-            reasons_bear.append(f"RSI مرتفع ({rsi:.0f})")
-        elif 50 <= rsi <= 60:
-            score += 0.5  # Neutral-bullish zone
-        
-        # RSI momentum (direction)
-        if not pd.isna(prev['RSI']):
-            if rsi > prev['RSI'] and rsi < 70:
-                score += 0.5
-            elif rsi < prev['RSI'] and rsi > 30:
-                score -= 0.5
-        
-        # === 5. MACD Analysis ===
-        if latest['MACD'] > latest['Signal_Line']:
-            score += 1
-            reasons_bull.append("MACD إيجابي")
-            if prev['MACD'] <= prev['Signal_Line']:
-                score += 1
-                reasons_bull.append("تقاطع MACD صاعد جديد!")
-        elif latest['MACD'] < latest['Signal_Line']:
-            score -= 1
-            reasons_bear.append("MACD سلبي")
-            if prev['MACD'] >= prev['Signal_Line']:
-                score -= 1
-                reasons_bear.append("تقاطع MACD هابط جديد!")
-
-        # MACD Histogram momentum
-        macd_hist_now = latest['MACD'] - latest['Signal_Line']
-        macd_hist_prev = prev['MACD'] - prev['Signal_Line']
-        if macd_hist_now > macd_hist_prev:
-            score += 0.5  # Increasing momentum
-        elif macd_hist_now < macd_hist_prev:
-            score -= 0.5
-            
-        # === 6. Bollinger Bands Position ===
-        if 'BB_Upper' in latest and 'BB_Lower' in latest:
-            if not pd.isna(latest['BB_Lower']) and not pd.isna(latest['BB_Upper']):
-                bb_width = latest['BB_Upper'] - latest['BB_Lower']
-                if bb_width > 0:
-                    bb_position = (latest['Close'] - latest['BB_Lower']) / bb_width
-                    if bb_position < 0.2:
-                        score += 1
-                        reasons_bull.append("السعر قرب الحد الأدنى لبولنجر")
-                    elif bb_position > 0.8:
-                        score -= 1
-                        reasons_bear.append("السعر قرب الحد الأعلى لبولنجر")
-        
-        # === 7. Consecutive Candles ===
-        if len(df) >= 3:
-            last_3 = df.tail(3)
-            green_count = sum(last_3['Close'] > last_3['Open'])
-            red_count = sum(last_3['Close'] < last_3['Open'])
-            if green_count == 3:
-                score += 1
-                reasons_bull.append("3 شموع خضراء متتالية")
-            elif red_count == 3:
-                score -= 1
-                reasons_bear.append("3 شموع حمراء متتالية")
-        
-        # === 8. Volume Analysis ===
-        if 'Volume' in df.columns and len(df) >= 20:
-            avg_vol = df['Volume'].tail(20).mean()
-            if avg_vol > 0 and latest['Volume'] > avg_vol * 1.5:
-                # High volume confirms the direction
-                if latest['Close'] > latest['Open']:
-                    score += 1
-                    reasons_bull.append("حجم تداول مرتفع مع صعود")
-                elif latest['Close'] < latest['Open']:
-                    score -= 1
-                    reasons_bear.append("حجم تداول مرتفع مع هبوط")
-        
-        # === 9. Stochastic Oscillator ===
-        if 'Stoch_K' in latest and not pd.isna(latest['Stoch_K']):
-            stoch_k = latest['Stoch_K']
-            stoch_d = latest['Stoch_D'] if not pd.isna(latest.get('Stoch_D', float('nan'))) else stoch_k
-            if stoch_k < 20:
-                score += 1
-                reasons_bull.append(f"Stochastic تشبع بيعي ({stoch_k:.0f})")
-            elif stoch_k > 80:
-                score -= 1
-                reasons_bear.append(f"Stochastic تشبع شرائي ({stoch_k:.0f})")
-            # Stochastic crossover
-            if stoch_k > stoch_d and stoch_k < 50:
-                score += 0.5
-            elif stoch_k < stoch_d and stoch_k > 50:
-                score -= 0.5
-
-        # === 10. ADX (Trend Strength) ===
-        if 'ADX' in latest and not pd.isna(latest['ADX']):
-            adx_val = latest['ADX']
-            plus_di = latest.get('Plus_DI', 0)
-            minus_di = latest.get('Minus_DI', 0)
-            if adx_val > 25:
-                # Strong trend — follow direction
-                if not pd.isna(plus_di) and not pd.isna(minus_di):
-                    if plus_di > minus_di:
-                        score += 1
-                        reasons_bull.append(f"اتجاه قوي صاعد (ADX={adx_val:.0f})")
-                    elif minus_di > plus_di:
-                        score -= 1
-                        reasons_bear.append(f"اتجاه قوي هابط (ADX={adx_val:.0f})")
-
-        # === 11. VWAP Position (intraday key level) ===
-        if 'VWAP' in latest and not pd.isna(latest.get('VWAP', float('nan'))):
-            if latest['Close'] > latest['VWAP']:
-                score += 0.5
-                reasons_bull.append("السعر فوق VWAP")
-            elif latest['Close'] < latest['VWAP']:
-                score -= 0.5
-                reasons_bear.append("السعر تحت VWAP")
-
-        # === 12. EMA9 Short-term momentum ===
-        if 'EMA9' in latest and not pd.isna(latest['EMA9']):
-            if latest['Close'] > latest['EMA9'] and latest['EMA9'] > latest['EMA20']:
-                score += 0.5
-                reasons_bull.append("زخم قصير المدى إيجابي (EMA9)")
-            elif latest['Close'] < latest['EMA9'] and latest['EMA9'] < latest['EMA20']:
-                score -= 0.5
-                reasons_bear.append("زخم قصير المدى سلبي (EMA9)")
-        
-        # === Determine Final Signal ===
-        close_price = latest['Close']
-        atr = latest['ATR'] if not pd.isna(latest['ATR']) else (close_price * 0.02)
-        
-        support = latest['Support'] if 'Support' in latest and not pd.isna(latest['Support']) else close_price * 0.95
-        resistance = latest['Resistance'] if 'Resistance' in latest and not pd.isna(latest['Resistance']) else close_price * 1.05
-        
-        levels = {}
-        
-        # Trend strength classification
-        adx_val = latest.get('ADX', 0) if not pd.isna(latest.get('ADX', float('nan'))) else 0
-        if adx_val > 40:
-            trend_strength = "قوي جداً 🔥"
-        elif adx_val > 25:
-            trend_strength = "قوي 💪"
-        elif adx_val > 15:
-            trend_strength = "متوسط ⚡"
-        else:
-            trend_strength = "ضعيف 😴"
-        
-        if score >= 4:
-            signal = "Strong Buy (شراء قوي) 🟢🟢"
-            levels = {
-                "Entry": close_price,
-                "SL": close_price - (1.5 * atr),
-                "TP": close_price + (4 * atr)
-            }
-        elif score >= 1.5:
-            signal = "Buy (شراء) 🟢"
-            levels = {
-                "Entry": close_price,
-                "SL": close_price - (2 * atr),
-                "TP": close_price + (3 * atr)
-            }
-        elif score <= -4:
-            signal = "Strong Sell (بيع قوي) 🔴🔴"
-            levels = {
-                "Entry": close_price,
-                "SL": close_price + (1.5 * atr),
-                "TP": close_price - (4 * atr)
-            }
-        elif score <= -1.5:
-            signal = "Sell (بيع) 🔴"
-            levels = {
-                "Entry": close_price,
-                "SL": close_price + (2 * atr),
-                "TP": close_price - (3 * atr)
-            }
-        else:
-            signal = "Hold (انتظار/مراقبة) 🟡"
-            
-        levels["Support"] = support
-        levels["Resistance"] = resistance
-        levels["score"] = score
-        levels["trend_strength"] = trend_strength
-        levels["reasons_bull"] = reasons_bull
-        levels["reasons_bear"] = reasons_bear
-            
-        return signal, levels
+        return recommendation.latest(df)
+
+    def recommendation_history(self, df):
+        """get_recommendation's score, signal and SL/TP for every bar (see recommendation.evaluate)."""
+        return recommendation.evaluate(self.calculate_atr(df))
+
+    def iter_scan_market(self, tickers=None, period="6mo", interval="1d", max_workers=None, timeout=None, deadline=None):
+        """Scans a list of tickers for Buy signals using specific timeframe.
 
-    def scan_market(self, tickers=None, period="6mo", interval="1d"):
-        """Scans a list of tickers for Buy signals using specific timeframe."""
+        Batches are downloaded in parallel and scored as they arrive (see scanner.py);
+        max_workers, timeout (per batch) and deadline (whole scan, seconds) default to the
+        scanner's settings. Only tickers with a new bar since the last scan are re-scored.
+        Returns a scanner.ScanResult: the opportunities, with .partial set when the
+        deadline cut the scan short and .events listing signal changes since the last scan.
+
+        A generator: yields lists of opportunities as their batches are scored and returns
+        the ScanResult (scan_market() is the blocking form).
+        """
         if tickers is None:
-            # Minimal list for Vercel 10s Serverless limit
-            tickers = ["AAPL", "MSFT", "NVDA", "TSLA", "META"]
-            
-        opportunities = []
-        
-        for ticker in tickers:
-            try:
-                # Create a temporary engine for each ticker
-                temp_engine = StockEngine(ticker)
-                hist = temp_engine.get_market_data(period=period, interval=interval)
-                
-                if len(hist) < 50: continue # Skip if not enough data
-                
-                hist = temp_engine.calculate_technical_indicators(hist)
-                signal, levels = temp_engine.get_recommendation(hist)
-                
-                if "Buy" in signal:
-                    opportunities.append({
-                        "ticker": ticker,
-                        "signal": signal,
-                        "price": levels['Entry'],
-                        "sl": levels['SL'],
-                        "tp": levels['TP']
-                    })
-            except Exception as e:
-                print(f"Error scanning {ticker}: {e}")
-                continue
-                
-        return opportunities
+            tickers = scanner.UNIVERSE
+        tracker = scanner.Tracker(f"market|{period}|{interval}")
+
+        def fetch(batch):
+            # One batched download per batch instead of a request per ticker
+            return StockEngine.fetch_many(batch, period=period, interval=interval)
+
+        def score(frames):
+            # Skip tickers without enough data, then compute indicators for the changed ones in one pass
+            frames = {t: df for t, df in frames.items() if df is not None and len(df) >= 50}
+            computed = panel.compute(tracker.changed(frames), indicators.RECOMMENDATION_INPUTS)
+            records = {}
+            for ticker in computed.tickers:
+                try:
+                    signal, levels = self.get_recommendation(computed.frame(ticker))
+                except Exception as e:
+                    print(f"Error scanning {ticker}: {e}")
+                    continue
+                records[ticker] = {
+                    "ticker": ticker,
+                    "signal": signal,
+                    "price": levels.get('Entry'),
+                    "sl": levels.get('SL'),
+                    "tp": levels.get('TP')
+                }
+            tracker.update(frames, records)
+            return {t: r for t, r in tracker.records(frames).items() if "Buy" in r['signal']}
+
+        result = yield from scanner.stream(tickers, fetch, score, max_workers=max_workers, timeout=timeout, deadline=deadline)
+        result.events = tracker.save()
+        return result
+
+    def scan_market(self, tickers=None, period="6mo", interval="1d", max_workers=None, timeout=None, deadline=None):
+        """Scans a list of tickers for Buy signals (see iter_scan_market); returns the scanner.ScanResult."""
+        return scanner.drain(self.iter_scan_market(tickers, period, interval, max_workers, timeout, deadline))
 
     def get_options_data(self):
-        """Fetches and summarizes options data for the nearest expiration."""
+        """Fetches and summarizes options data for the nearest expiration (cached, coalesced)."""
+        ttl = market_calendar.ttl_for('1d', StockEngine._CACHE_TTL)
+        return get_or_fetch("options", self.original_ticker, self._fetch_options_summary, ttl)
+
+    def _fetch_options_summary(self):
         try:
-            target_ticker = self.ticker
+            provider = market_data.get_provider()
+            target_symbol = self.ticker_symbol
             # Use SPY options for SPX index requests because SPX options may be restricted or flaky
             if self.original_ticker.upper() in ['SPX', '^SPX']:
-                import yfinance as yf
-                target_ticker = yf.Ticker('SPY')
+                target_symbol = 'SPY'
 
-            expirations = target_ticker.options
+            expirations = provider.options(target_symbol)
             if not expirations:
                 return None
                 
             nearest_expiry = expirations[0]
-            chain = target_ticker.option_chain(nearest_expiry)
-            
-            calls = chain.calls
-            puts = chain.puts
+            calls, puts = provider.option_chain(target_symbol, nearest_expiry)
             
             # Extract total volume and open interest
             call_vol = calls['volume'].sum() if not calls['volume'].empty else 0
@@ -621,8 +328,7 @@ class StockEngine:
     def get_global_sentiment():
         """Returns a simple market sentiment based on S&P 500 performance."""
         try:
-            spy = yf.Ticker("^GSPC")
-            data = spy.history(period="2d")
+            data = market_data.get_provider().history("^GSPC", period="2d")
             if len(data) < 2:
                 return "Neutral", 0
             
@@ -695,38 +401,22 @@ class StockEngine:
         """Fetches top gainers/losers from a sample of S&P 500."""
         tickers = ["AAPL", "MSFT", "NVDA", "TSLA", "META", "AMZN", "GOOG", "AMD", "NFLX", "JPM", "V", "UNH", "HD", "PG", "COST"]
         movers = []
-        try:
-            data = yf.download(tickers, period="2d", group_by='ticker', progress=False, threads=True)
-            for ticker in tickers:
-                try:
-                    if ticker in data.columns.get_level_values(0):
-                        td = data[ticker].dropna()
-                        if len(td) >= 2:
-                            prev_close = td['Close'].iloc[-2]
-                            curr_close = td['Close'].iloc[-1]
-                            change = ((curr_close - prev_close) / prev_close) * 100
-                            movers.append({"ticker": ticker, "change": round(change, 2), "price": round(curr_close, 2)})
-                        elif len(td) == 1:
-                            open_p = td['Open'].iloc[0]
-                            close_p = td['Close'].iloc[0]
-                            if open_p > 0:
-                                change = ((close_p - open_p) / open_p) * 100
-                                movers.append({"ticker": ticker, "change": round(change, 2), "price": round(close_p, 2)})
-                except Exception:
-                    continue
-        except Exception:
-            # Fallback: fetch individually
-            for ticker in tickers[:8]:
-                try:
-                    t = yf.Ticker(ticker)
-                    h = t.history(period="2d")
-                    if h is not None and len(h) >= 2:
-                        prev = h['Close'].iloc[-2]
-                        curr = h['Close'].iloc[-1]
-                        change = ((curr - prev) / prev) * 100
-                        movers.append({"ticker": ticker, "change": round(change, 2), "price": round(curr, 2)})
-                except:
-                    continue
+        for ticker, td in StockEngine.fetch_many(tickers, period="2d").items():
+            try:
+                td = td.dropna(subset=['Close'])
+                if len(td) >= 2:
+                    prev_close = td['Close'].iloc[-2]
+                    curr_close = td['Close'].iloc[-1]
+                    change = ((curr_close - prev_close) / prev_close) * 100
+                    movers.append({"ticker": ticker, "change": round(change, 2), "price": round(curr_close, 2)})
+                elif len(td) == 1:
+                    open_p = td['Open'].iloc[0]
+                    close_p = td['Close'].iloc[0]
+                    if open_p > 0:
+                        change = ((close_p - open_p) / open_p) * 100
+                        movers.append({"ticker": ticker, "change": round(change, 2), "price": round(close_p, 2)})
+            except Exception:
+                continue
         
         if not movers:
             return [], []
@@ -738,55 +428,87 @@ class StockEngine:
         return gainers[:5], losers[:5]
 
     # --- DATA CACHE ---
-    _cache = {}
-    _CACHE_TTL = 300  # 5 minutes
+    _CACHE_TTL = 300  # 5 minutes at most during the session; see market_calendar.ttl_for
 
     def get_cached_data(self, period="6mo", interval="1d"):
-        """Fetches market data with 5-minute in-memory cache."""
-        import time as _time
-        cache_key = (self.ticker_symbol, period, interval)
-        now = _time.time()
-        if cache_key in StockEngine._cache:
-            ts, data = StockEngine._cache[cache_key]
-            if now - ts < StockEngine._CACHE_TTL:
-                return data.copy()
-        data = self.get_market_data(period, interval)
-        if data is not None and not data.empty:
-            StockEngine._cache[cache_key] = (now, data)
-        return data
+        """Fetches market data, cached until the next bar close (or next open when the market is closed)."""
+        cache_key = f"{self.ticker_symbol}|{period}|{interval}"
+        ttl = market_calendar.ttl_for(interval, StockEngine._CACHE_TTL)
+        data = get_or_fetch("engine", cache_key, lambda: self.get_market_data(period, interval), ttl)
+        return data.copy() if data is not None else data
+
+    @classmethod
+    def fetch_many(cls, tickers, period="6mo", interval="1d"):
+        """Fetches market data for many tickers at once (batched download, same cache as get_cached_data).
+
+        Returns {ticker: DataFrame}. Tickers the batch misses are fetched one by one.
+        """
+        symbols = {t: cls.TICKER_MAP.get(t.upper(), t.upper()) for t in tickers}
+        ttl = market_calendar.ttl_for(interval, cls._CACHE_TTL)
+        frames = {}
+        missing = []
+        for ticker, sym in symbols.items():
+            data = get_cached("engine", f"{sym}|{period}|{interval}", ttl)
+            if data is not None:
+                frames[ticker] = data.copy()
+            elif sym not in missing:
+                missing.append(sym)
+
+        batch = {}
+        if missing:
+            provider = market_data.get_provider()
+
+            def download(syms, period=None, start=None):
+                return provider.history_many(syms, period=period, start=start, interval=interval)
+            try:
+                key = f"history|{','.join(sorted(missing))}|{period}|{interval}"
+                batch = coalesce(key, lambda: bar_store.get_many(missing, period, interval, download))
+            except Exception as e:
+                print(f"Batch download failed for {len(missing)} tickers: {e}")
+
+        for ticker, sym in symbols.items():
+            if ticker in frames:
+                continue
+            data = batch.get(sym)
+            if data is None or data.empty:
+                data = cls(ticker).get_market_data(period, interval)
+            else:
+                data.attrs.update(symbol=sym, interval=interval)
+            put("engine", f"{sym}|{period}|{interval}", data, ttl)
+            frames[ticker] = data.copy()
+        return frames
 
     # --- VWAP ---
     def calculate_vwap(self, df):
-        """Calculates Volume Weighted Average Price."""
+        """Calculates Volume Weighted Average Price (restarting each session on intraday bars)."""
         try:
-            typical_price = (df['High'] + df['Low'] + df['Close']) / 3
-            df['VWAP'] = (typical_price * df['Volume']).cumsum() / df['Volume'].cumsum()
+            df['VWAP'] = vwap.session(df)
         except Exception:
             df['VWAP'] = df['Close']
         return df
 
+    def anchored_vwap(self, df, anchor):
+        """VWAP accumulated from `anchor` (a timestamp or bar position) on, NaN before it."""
+        try:
+            return vwap.anchored(df, anchor)
+        except Exception:
+            return pd.Series(np.nan, index=df.index, name='AVWAP')
+
     # --- FIBONACCI RETRACEMENT ---
     def calculate_fibonacci_levels(self, df, period=60):
-        """Calculates Fibonacci retracement levels from recent high/low."""
+        """Fibonacci retracement levels between the last confirmed swing high and low (see swings.py)."""
         try:
-            recent = df.tail(period)
-            high = recent['High'].max()
-            low = recent['Low'].min()
-            diff = high - low
-
-            levels = {
-                '0.0%': high,
-                '23.6%': high - 0.236 * diff,
-                '38.2%': high - 0.382 * diff,
-                '50.0%': high - 0.5 * diff,
-                '61.8%': high - 0.618 * diff,
-                '78.6%': high - 0.786 * diff,
-                '100.0%': low
-            }
-            return levels
+            return swings.key_levels(df, period)['Fibonacci']
         except Exception:
             return {}
 
+    def key_levels(self, df, period=60):
+        """Fibonacci grid, classic pivot points and the latest confirmed swing high/low (see swings.py)."""
+        try:
+            return swings.key_levels(df, period)
+        except Exception:
+            return {'Fibonacci': {}, 'Pivots': {}, 'Swing_High': float('nan'), 'Swing_Low': float('nan')}
+
     # --- BACKTESTING ENGINE ---
     def backtest_strategy(self, df, strategy='ema_cross'):
         """Backtests EMA crossover strategy on historical data."""
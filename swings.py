@@ -0,0 +1,140 @@
+"""
+Swing Levels Engine
+Swing highs/lows (pivots), Fibonacci retracement grids anchored on them and classic
+floor-trader pivot points, for the whole history in O(n) on top of the indicator kernel's
+running extremes.
+StockEngine.calculate_fibonacci_levels / key_levels and the report chart's Fibonacci,
+pivot and swing overlays all come from here.
+"""
+import numpy as np
+import pandas as pd
+
+from indicators import rolling_max, rolling_min, shift
+
+# Retracement ratios measured down from the swing high
+FIB_RATIOS = [
+    ('0.0%', 0.0), ('23.6%', 0.236), ('38.2%', 0.382), ('50.0%', 0.5),
+    ('61.8%', 0.618), ('78.6%', 0.786), ('100.0%', 1.0),
+]
+
+PIVOT_COLUMNS = ['PP', 'R1', 'S1', 'R2', 'S2']
+
+
+def _ahead(x, periods):
+    """x moved `periods` bars back in time (value at i is x[i + periods]), NaN past the end."""
+    x = np.asarray(x, dtype='float64')
+    out = np.full(x.shape, np.nan)
+    if periods < len(x):
+        out[:len(x) - periods] = x[periods:]
+    return out
+
+
+def pivots(high, low, strength=5):
+    """(is_swing_high, is_swing_low) bool arrays.
+
+    A swing high is a bar whose high beats the `strength` bars before it and is not
+    exceeded by the `strength` bars after it (swing lows mirror that). The last
+    `strength` bars can't be confirmed yet and are never pivots.
+    """
+    high = np.asarray(high, dtype='float64')
+    low = np.asarray(low, dtype='float64')
+    with np.errstate(invalid='ignore'):
+        is_high = (high > shift(rolling_max(high, strength))) & (high >= _ahead(rolling_max(high, strength), strength))
+        is_low = (low < shift(rolling_min(low, strength))) & (low <= _ahead(rolling_min(low, strength), strength))
+    return is_high, is_low
+
+
+def _last_confirmed(values, is_pivot, strength):
+    """Most recent pivot value known at each bar (a pivot is confirmed `strength` bars later)."""
+    known = shift(np.where(is_pivot, values, np.nan), strength)
+    return pd.Series(known).ffill().to_numpy()
+
+
+def swing_levels(df, strength=5):
+    """Swing columns for every bar of an OHLC frame (a new DataFrame, same index).
+
+    Swing_High / Swing_Low: the price on pivot bars, NaN elsewhere.
+    Last_Swing_High / Last_Swing_Low: the latest pivot confirmed by that bar (no lookahead).
+    """
+    high, low = df['High'].to_numpy(dtype='float64'), df['Low'].to_numpy(dtype='float64')
+    is_high, is_low = pivots(high, low, strength)
+    return pd.DataFrame({
+        'Swing_High': np.where(is_high, high, np.nan),
+        'Swing_Low': np.where(is_low, low, np.nan),
+        'Last_Swing_High': _last_confirmed(high, is_high, strength),
+        'Last_Swing_Low': _last_confirmed(low, is_low, strength),
+    }, index=df.index)
+
+
+def fibonacci(high, low):
+    """Retracement levels between a swing high and low: {'0.0%': high, ..., '100.0%': low}."""
+    diff = high - low
+    levels = {}
+    for name, ratio in FIB_RATIOS:
+        if ratio == 0.0:
+            levels[name] = high
+        elif ratio == 1.0:
+            levels[name] = low
+        else:
+            levels[name] = high - ratio * diff
+    return levels
+
+
+def fibonacci_grid(df, period=60, strength=5):
+    """Fibonacci levels for every bar (a new DataFrame), between the last swing high and
+    swing low confirmed by that bar (see swing_levels).
+
+    Until both a swing high and a swing low are confirmed, the high and low of the
+    trailing `period` bars stand in (all the bars so far before the first full window).
+    """
+    return _grid(df, swing_levels(df, strength), period)
+
+
+def _grid(df, levels, period):
+    high = df['High'].to_numpy(dtype='float64')
+    low = df['Low'].to_numpy(dtype='float64')
+    top, bottom = rolling_max(high, period), rolling_min(low, period)
+    warmup = min(period - 1, len(df))
+    top[:warmup] = np.fmax.accumulate(high[:warmup])
+    bottom[:warmup] = np.fmin.accumulate(low[:warmup])
+    swing_high = levels['Last_Swing_High'].to_numpy()
+    swing_low = levels['Last_Swing_Low'].to_numpy()
+    anchored = ~np.isnan(swing_high) & ~np.isnan(swing_low)
+    # After a gap the last swing low can sit above the last swing high: 0% stays the upper one
+    top = np.where(anchored, np.fmax(swing_high, swing_low), top)
+    bottom = np.where(anchored, np.fmin(swing_high, swing_low), bottom)
+    return pd.DataFrame(fibonacci(top, bottom), index=df.index)
+
+
+def pivot_points(df):
+    """Classic floor-trader pivots for every bar from the previous bar's high, low and close."""
+    high = shift(df['High'].to_numpy(dtype='float64'))
+    low = shift(df['Low'].to_numpy(dtype='float64'))
+    close = shift(df['Close'].to_numpy(dtype='float64'))
+    pp = (high + low + close) / 3
+    return pd.DataFrame({
+        'PP': pp,
+        'R1': (2 * pp) - low,
+        'S1': (2 * pp) - high,
+        'R2': pp + (high - low),
+        'S2': pp - (high - low),
+    }, index=df.index)
+
+
+def key_levels(df, period=60, strength=5):
+    """The levels for the last bar: {'Fibonacci': {...}, 'Pivots': {...}, 'Swing_High', 'Swing_Low'}.
+
+    Swing_High/Low are the latest confirmed pivots and Fibonacci spans them (see fibonacci_grid).
+    """
+    if df is None or df.empty:
+        return {'Fibonacci': {}, 'Pivots': {}, 'Swing_High': np.nan, 'Swing_Low': np.nan}
+    levels = swing_levels(df, strength)
+    fib = _grid(df, levels, period).iloc[-1].to_dict()
+    pivot = pivot_points(df.tail(2)).iloc[-1]
+    swings = levels.iloc[-1]
+    return {
+        'Fibonacci': fib,
+        'Pivots': {} if len(df) < 2 else {name: pivot[name] for name in PIVOT_COLUMNS},
+        'Swing_High': swings['Last_Swing_High'],
+        'Swing_Low': swings['Last_Swing_Low'],
+    }
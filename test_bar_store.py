@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+import bar_store
+
+
+def daily_bars(n=200, seed=5, scale=1.0):
+    """Weekday bars ending yesterday, at midnight New York time like Yahoo's daily history."""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp.now(tz='America/New_York').normalize() - pd.Timedelta(days=1)
+    index = pd.bdate_range(end=end, periods=n, tz='America/New_York', name='Date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))) * scale
+    return pd.DataFrame({
+        'Open': close * 0.999, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+        'Volume': rng.integers(1_000, 500_000, n), 'Dividends': 0.0, 'Stock Splits': 0.0,
+    }, index=index)
+
+
+class StubFetch:
+    """fetch(period=None, start=None) over a frame, counting calls; raises while `error` is set."""
+
+    def __init__(self, df):
+        self.df = df
+        self.calls = []
+        self.error = None
+
+    def __call__(self, period=None, start=None):
+        self.calls.append((period, start))
+        if self.error:
+            raise self.error
+        if start is None:
+            return self.df.copy()
+        return self.df[self.df.index >= pd.Timestamp(start).tz_convert(self.df.index.tz)].copy()
+
+
+def _age(symbol, interval='1d'):
+    """Pretends the series was last topped up long ago."""
+    conn = bar_store._connect()
+    conn.execute("UPDATE bar_meta SET last_fetch=0 WHERE symbol=? AND interval=?", (symbol, interval))
+    conn.commit()
+    conn.close()
+
+
+def test_fetch_plan():
+    df = daily_bars()
+    assert bar_store.fetch_plan('PLAN', '1d', '6mo') == ('full', bar_store.window_start('6mo', '1d'))
+
+    covered = int(bar_store.window_start('6mo', '1d').timestamp())
+    bar_store.write('PLAN', '1d', df, covered_from=covered)
+    assert bar_store.fetch_plan('PLAN', '1d', '6mo') == ('fresh', None)
+    _age('PLAN')
+    last_ts = int(df.index[-1].timestamp())
+    assert bar_store.fetch_plan('PLAN', '1d', '6mo') == ('tail', last_ts)
+    # A longer period than was ever downloaded needs the whole window
+    assert bar_store.fetch_plan('PLAN', '1d', '2y')[0] == 'full'
+
+
+def test_tail_merge_replaces_from_the_last_bar():
+    full = daily_bars()
+    fetch = StubFetch(full.iloc[:-3])
+    first = bar_store.get_history('TAIL', '6mo', '1d', fetch)
+    assert first.index[-1] == full.index[-4] and len(fetch.calls) == 1
+
+    # The last stored bar was revised and three bars were added
+    later = full.copy()
+    later.iloc[-4, later.columns.get_loc('Close')] += 1.0
+    fetch.df = later
+    _age('TAIL')
+    merged = bar_store.get_history('TAIL', '6mo', '1d', fetch)
+    assert fetch.calls[-1][1] is not None  # a tail download, from the last stored bar
+    assert merged.index.is_unique and merged.index[-1] == full.index[-1]
+    assert merged['Close'].iloc[-4] == later['Close'].iloc[-4]
+    assert np.allclose(merged['Close'], later['Close'].loc[merged.index])
+
+
+def test_corporate_action_in_tail_refetches_the_window():
+    fetch = StubFetch(daily_bars(seed=6).iloc[:-1])
+    bar_store.get_history('DIV', '6mo', '1d', fetch)
+
+    # A dividend in the new bars re-adjusts the whole history
+    adjusted = daily_bars(seed=6, scale=0.98)
+    adjusted.iloc[-1, adjusted.columns.get_loc('Dividends')] = 0.5
+    fetch.df = adjusted
+    _age('DIV')
+    calls = len(fetch.calls)
+    df = bar_store.get_history('DIV', '6mo', '1d', fetch)
+    starts = [start for _, start in fetch.calls[calls:]]
+    assert len(starts) == 2 and starts[1] == bar_store.window_start('6mo', '1d').to_pydatetime()
+    assert np.allclose(df['Close'], adjusted['Close'].loc[df.index])
+
+
+def test_download_error_serves_stored_bars():
+    fetch = StubFetch(daily_bars(seed=7))
+    stored = bar_store.get_history('ERR', '6mo', '1d', fetch)
+    _age('ERR')
+    fetch.error = ConnectionError("Yahoo is down")
+    df = bar_store.get_history('ERR', '6mo', '1d', fetch)
+    assert df.index.equals(stored.index) and np.allclose(df['Close'], stored['Close'])
+    # The failed check is recorded, so the next request doesn't hammer the provider
+    assert bar_store.fetch_plan('ERR', '1d', '6mo') == ('fresh', None)
+    # Nothing stored and the download fails: empty, not an exception
+    assert bar_store.get_history('NONE', '6mo', '1d', fetch).empty
+    frames = bar_store.get_many(['ERR', 'NONE'], '6mo', '1d', lambda symbols, **kw: fetch())
+    assert len(frames['ERR']) == len(stored) and frames['NONE'].empty
+
+
+if __name__ == "__main__":
+    test_fetch_plan()
+    test_tail_merge_replaces_from_the_last_bar()
+    test_corporate_action_in_tail_refetches_the_window()
+    test_download_error_serves_stored_bars()
+    print("bar store tests passed")
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+import candlesticks
+
+
+def reference(df):
+    """The scalar last-candle detector StockEngine used before candlesticks.py."""
+    patterns = []
+    if len(df) < 3:
+        return patterns
+    
+    latest = df.iloc[-1]
+    prev = df.iloc[-2]
+    prev2 = df.iloc[-3]
+    
+    body = abs(latest['Close'] - latest['Open'])
+    upper_shadow = latest['High'] - max(latest['Close'], latest['Open'])
+    lower_shadow = min(latest['Close'], latest['Open']) - latest['Low']
+    total_range = latest['High'] - latest['Low']
+    
+    prev_body = abs(prev['Close'] - prev['Open'])
+    
+    if total_range == 0:
+        return patterns
+    
+    # 1. Hammer (bullish reversal)
+    if (lower_shadow > body * 2 and upper_shadow < body * 0.5 
+        and latest['Close'] > latest['Open'] and prev['Close'] < prev['Open']):
+        patterns.append(("🔨 مطرقة (Hammer)", "صعودي", "نمط انعكاسي صعودي قوي"))
+    
+    # 2. Inverted Hammer
+    if (upper_shadow > body * 2 and lower_shadow < body * 0.5 
+        and prev['Close'] < prev['Open']):
+        patterns.append(("🔨 مطرقة مقلوبة (Inverted Hammer)", "صعودي", "إشارة انعكاس صعودي محتمل"))
+    
+    # 3. Bullish Engulfing
+    if (prev['Close'] < prev['Open'] and latest['Close'] > latest['Open']
+        and latest['Open'] <= prev['Close'] and latest['Close'] >= prev['Open']
+        and body > prev_body):
+        patterns.append(("🟢 ابتلاع صعودي (Bullish Engulfing)", "صعودي", "إشارة انعكاس صعودي قوية جداً"))
+    
+    # 4. Bearish Engulfing
+    if (prev['Close'] > prev['Open'] and latest['Close'] < latest['Open']
+        and latest['Open'] >= prev['Close'] and latest['Close'] <= prev['Open']
+        and body > prev_body):
+        patterns.append(("🔴 ابتلاع هبوطي (Bearish Engulfing)", "هبوطي", "إشارة انعكاس هبوطي قوية جداً"))
+    
+    # 5. Doji
+    if body < total_range * 0.1 and total_range > 0:
+        patterns.append(("✳️ دوجي (Doji)", "محايد", "تردد في السوق — انتظر تأكيد الاتجاه"))
+    
+    # 6. Morning Star (bullish — 3 candle pattern)
+    if (prev2['Close'] < prev2['Open']  # Big red
+        and abs(prev['Close'] - prev['Open']) < abs(prev2['Close'] - prev2['Open']) * 0.3  # Small body
+        and latest['Close'] > latest['Open']  # Big green
+        and latest['Close'] > (prev2['Open'] + prev2['Close']) / 2):
+        patterns.append(("⭐ نجمة الصباح (Morning Star)", "صعودي", "نمط انعكاسي صعودي ثلاثي قوي"))
+    
+    # 7. Evening Star (bearish — 3 candle pattern)
+    if (prev2['Close'] > prev2['Open']  # Big green
+        and abs(prev['Close'] - prev['Open']) < abs(prev2['Close'] - prev2['Open']) * 0.3  # Small body
+        and latest['Close'] < latest['Open']  # Big red
+        and latest['Close'] < (prev2['Open'] + prev2['Close']) / 2):
+        patterns.append(("⭐ نجمة المساء (Evening Star)", "هبوطي", "نمط انعكاسي هبوطي ثلاثي قوي"))
+    
+    # 8. Three White Soldiers
+    if (len(df) >= 3 
+        and all(df['Close'].iloc[-i] > df['Open'].iloc[-i] for i in range(1, 4))
+        and df['Close'].iloc[-1] > df['Close'].iloc[-2] > df['Close'].iloc[-3]):
+        patterns.append(("🟢🟢🟢 ثلاث جنود بيض (Three White Soldiers)", "صعودي", "زخم صعودي قوي جداً"))
+    
+    # 9. Three Black Crows
+    if (len(df) >= 3 
+        and all(df['Close'].iloc[-i] < df['Open'].iloc[-i] for i in range(1, 4))
+        and df['Close'].iloc[-1] < df['Close'].iloc[-2] < df['Close'].iloc[-3]):
+        patterns.append(("🔴🔴🔴 ثلاث غربان سود (Three Black Crows)", "هبوطي", "زخم هبوطي قوي جداً"))
+    
+    return patterns
+
+
+def choppy_history(n=600, seed=3):
+    """Bars with large bodies and shadows relative to the trend, so every pattern shows up."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1.5, n))
+    open_ = close + rng.normal(0, 1.5, n)
+    open_[::17] = close[::17]  # some doji-like bars
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 1.0, n)) * rng.integers(0, 2, n)
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 1.0, n)) * rng.integers(0, 2, n)
+    high[::53] = low[::53] = close[::53] = open_[::53]  # zero-range bars
+    index = pd.date_range('2024-01-02', periods=n, freq='D')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close}, index=index)
+
+
+def test_latest_matches_reference():
+    df = choppy_history()
+    seen = set()
+    for end in range(0, len(df) + 1):
+        expected = reference(df.iloc[:end])
+        assert candlesticks.latest(df.iloc[:end]) == expected, end
+        seen.update(label for label, _, _ in expected)
+    assert len(seen) == len(candlesticks.PATTERNS), seen
+
+
+def test_history_matches_latest():
+    df = choppy_history()
+    flags = candlesticks.calculate(df)
+    assert list(flags.columns) == candlesticks.COLUMNS
+    for end in range(3, len(df) + 1):
+        assert candlesticks.describe(flags.iloc[end - 1]) == candlesticks.latest(df.iloc[:end]), end
+
+
+if __name__ == "__main__":
+    test_latest_matches_reference()
+    test_history_matches_latest()
+    print("Vectorized candlestick patterns match the scalar detector.")
@@ -0,0 +1,173 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import panel
+
+
+def make_history(n=2000, seed=7, freq='15min'):
+    """Synthetic random-walk OHLCV bars."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    open_ = close * (1 + rng.normal(0, 0.001, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.002, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.002, n)))
+    volume = rng.integers(1_000, 500_000, n)
+    index = pd.date_range('2026-01-02 09:30', periods=n, freq=freq, tz='America/New_York')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+
+def assert_same(expected, actual):
+    assert list(actual.columns) == list(expected.columns), (list(actual.columns), list(expected.columns))
+    for col in indicators.COLUMNS:
+        e, a = expected[col].to_numpy(), actual[col].to_numpy()
+        assert np.array_equal(np.isnan(e.astype(float)), np.isnan(a.astype(float))), f"{col}: NaN positions differ"
+        assert np.allclose(e.astype(float), a.astype(float), rtol=1e-9, atol=1e-9, equal_nan=True), \
+            f"{col}: max abs diff {np.nanmax(np.abs(e - a))}"
+        assert expected[col].dtype == actual[col].dtype, f"{col}: {expected[col].dtype} != {actual[col].dtype}"
+
+
+def test_kernel_matches_pandas():
+    for n in (1, 13, 30, 60, 2000):
+        df = make_history(n)
+        assert_same(indicators.calculate_pandas(df.copy()), indicators.calculate(df.copy()))
+
+
+def test_flat_prices():
+    # Unchanged closes: OBV holds, RSI has 0/0 gaps
+    df = make_history(200)
+    df.loc[df.index[50:80], ['Open', 'High', 'Low', 'Close']] = 101.0
+    assert_same(indicators.calculate_pandas(df.copy()), indicators.calculate(df.copy()))
+
+
+def test_two_dimensional():
+    # Columns of a (bars × tickers) array give the same result as one ticker at a time
+    frames = [make_history(500, seed=s) for s in range(4)]
+    stacked = {col: np.column_stack([f[col].to_numpy() for f in frames]) for col in ('High', 'Low', 'Close', 'Volume')}
+    panel = indicators.compute(stacked['High'], stacked['Low'], stacked['Close'], stacked['Volume'])
+    for i, f in enumerate(frames):
+        single = indicators.compute(f['High'], f['Low'], f['Close'], f['Volume'])
+        for col in indicators.COLUMNS:
+            assert np.allclose(panel[col][:, i], single[col], equal_nan=True), col
+
+
+def test_selected_columns():
+    df = make_history(300)
+    full = indicators.calculate(df.copy())
+    for wanted in (['RSI', 'Signal_Line'], ['ADX'], sorted(indicators.RECOMMENDATION_INPUTS)):
+        partial = indicators.calculate(df.copy(), wanted)
+        computed = [c for c in indicators.COLUMNS if c in partial.columns]
+        assert set(wanted) <= set(computed)
+        assert 'OBV' not in computed and 'Williams_R' not in computed
+        pd.testing.assert_frame_equal(partial[computed], full[computed])
+
+
+def test_panel():
+    # Mixed lengths, a float-volume frame and one with a gap all match the single-ticker path
+    frames = {f"T{s}": make_history(n, seed=s) for s, n in enumerate((300, 300, 120, 300))}
+    frames['T3']['Volume'] = frames['T3']['Volume'].astype(float)
+    frames['GAP'] = make_history(300, seed=9)
+    frames['GAP'].loc[frames['GAP'].index[100], 'Close'] = np.nan
+    result = panel.compute(frames)
+    assert sorted(result.tickers) == sorted(frames)
+    for ticker, df in frames.items():
+        expected = indicators.calculate(df.copy()).iloc[-panel.TAIL:]
+        pd.testing.assert_frame_equal(result.frame(ticker), expected)
+        row = result.snapshot.loc[ticker, ['Close'] + indicators.COLUMNS].to_numpy(float)
+        assert np.allclose(row, expected[['Close'] + indicators.COLUMNS].iloc[-1].to_numpy(float), equal_nan=True)
+
+
+def test_missing_values_fall_back():
+    df = make_history(300)
+    df.loc[df.index[100], 'Close'] = np.nan
+    expected = indicators.calculate_pandas(df.copy())
+    actual = indicators.calculate(df.copy())
+    pd.testing.assert_frame_equal(expected, actual)
+
+
+def test_pandas_obv_with_missing_values():
+    # Batched downloads leave NaN volumes and closes; OBV keeps the bar-by-bar definition
+    df = make_history(300, seed=4)
+    df['Volume'] = df['Volume'].astype(float)
+    df.loc[df.index[[50, 51, 120]], 'Close'] = np.nan
+    df.loc[df.index[200], 'Volume'] = np.nan
+    close, volume = df['Close'].to_numpy(), df['Volume'].to_numpy()
+    obv = [0]
+    for i in range(1, len(df)):
+        move = volume[i] if close[i] > close[i - 1] else -volume[i] if close[i] < close[i - 1] else 0
+        obv.append(obv[-1] + move)
+    actual = indicators.calculate(df.copy())['OBV'].to_numpy()
+    assert np.array_equal(actual, np.array(obv), equal_nan=True)
+    assert np.isnan(actual[200:]).all() and not np.isnan(actual[:200]).any()
+    # Integer volumes stay integers
+    assert indicators.calculate_pandas(make_history(50))['OBV'].dtype == 'int64'
+
+
+def test_incremental_state():
+    # Seed on part of the history, then feed bars one at a time (revising each one first)
+    df = make_history(400)
+    expected = indicators.calculate(df.copy())[indicators.COLUMNS].iloc[-indicators.IndicatorState.TAIL:]
+    state = indicators.IndicatorState.from_frame(df.iloc[:300])
+    for ts, bar in df.iloc[300:].iterrows():
+        state.update(ts, bar['Open'], bar['High'] * 1.01, bar['Low'], bar['Close'] * 0.99, int(bar['Volume']) + 1)
+        state.update(ts, bar['Open'], bar['High'], bar['Low'], bar['Close'], int(bar['Volume']))
+    restored = indicators.IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+    for actual in (state.frame(), restored.frame()):
+        assert np.allclose(actual[indicators.COLUMNS].to_numpy(float), expected.to_numpy(float), equal_nan=True)
+    # The restored state keeps going, session VWAP included, and still revises its last bar
+    more = make_history(401).iloc[-1]
+    ts = df.index[-1] + pd.Timedelta(minutes=15)
+    for s in (state, restored):
+        s.update(ts, more['Open'], more['High'], more['Low'], more['Close'] * 1.05, int(more['Volume']) * 2)
+    assert restored.update(ts, more['Open'], more['High'], more['Low'], more['Close'], int(more['Volume'])) == \
+        state.update(ts, more['Open'], more['High'], more['Low'], more['Close'], int(more['Volume']))
+    assert state.latest()['VWAP'] == state.session_vwap.value
+
+
+def test_panel_matches_incremental_state():
+    # The auto-trader (IndicatorState per ticker) and the panel scans must score the same bars alike
+    frames = {f"T{s}": make_history(23, seed=s, freq='D') for s in range(4)}
+    inputs = sorted(indicators.RECOMMENDATION_INPUTS)
+    states = {t: indicators.IndicatorState.from_frame(df) for t, df in frames.items()}
+    for t, df in frames.items():
+        revised = df.copy()
+        revised.iloc[-1, revised.columns.get_loc('Close')] *= 1.02
+        frames[t] = revised
+        states[t] = states[t].advance(revised)
+    computed = panel.compute(frames, indicators.RECOMMENDATION_INPUTS)
+    for t, state in states.items():
+        expected = computed.frame(t)[inputs]
+        actual = state.frame()[inputs]
+        assert list(actual.index) == list(expected.index)
+        assert np.allclose(actual.to_numpy(float), expected.to_numpy(float), equal_nan=True), t
+
+
+if __name__ == "__main__":
+    test_kernel_matches_pandas()
+    test_flat_prices()
+    test_two_dimensional()
+    test_selected_columns()
+    test_panel()
+    test_missing_values_fall_back()
+    test_pandas_obv_with_missing_values()
+    test_incremental_state()
+    test_panel_matches_incremental_state()
+    print("Indicator kernel matches the pandas reference.")
+
+    df = make_history(20000)
+    for name, fn in (("pandas", indicators.calculate_pandas), ("numpy", indicators.calculate)):
+        start = time.perf_counter()
+        fn(df.copy())
+        print(f"{name}: {(time.perf_counter() - start) * 1000:.1f} ms for {len(df)} bars")
+
+    universe = {f"T{s}": make_history(126, seed=s, freq='D') for s in range(500)}
+    start = time.perf_counter()
+    for ticker, df in universe.items():
+        indicators.calculate(df.copy())
+    print(f"per ticker: {(time.perf_counter() - start) * 1000:.1f} ms for {len(universe)} tickers")
+    start = time.perf_counter()
+    panel.compute(universe)
+    print(f"panel: {(time.perf_counter() - start) * 1000:.1f} ms for {len(universe)} tickers")
@@ -0,0 +1,142 @@
+import time
+
+import market_cache
+from market_cache import MemoryCache
+
+
+class FakeClock:
+    """Stands in for the time module inside market_cache; advance() moves it forward."""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def with_clock(test):
+    def run():
+        clock, real = FakeClock(), market_cache.time
+        market_cache.time = clock
+        try:
+            test(clock)
+        finally:
+            market_cache.time = real
+    run.__name__ = test.__name__
+    return run
+
+
+class CountingFetch:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.error = None
+
+    def __call__(self):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.value
+
+
+def _wait_for_refreshes():
+    deadline = time.monotonic() + 5
+    while market_cache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not market_cache._refreshing
+
+
+def test_lru_eviction_by_bytes():
+    blob = b'x' * 1000
+    size = market_cache._sizeof(blob)
+    cache = MemoryCache(max_bytes=size * 2 + size // 2)
+    cache.set('bars', 'a', blob, 60)
+    cache.set('bars', 'b', blob, 60)
+    assert cache.get('bars', 'a') == blob  # 'a' is now the most recently used
+    cache.set('bars', 'c', blob, 60)
+    assert cache.get('bars', 'b') is None and cache.get('bars', 'a') == blob and cache.get('bars', 'c') == blob
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['resident_bytes'] == 2 * size <= stats['max_bytes']
+    assert stats['namespaces']['bars']['evictions'] == 1
+    # Replacing an entry doesn't count its old size twice; oversized values aren't kept
+    cache.set('bars', 'a', blob, 60)
+    assert cache.stats()['resident_bytes'] == 2 * size
+    cache.set('bars', 'huge', b'x' * (size * 3), 60)
+    assert cache.get('bars', 'huge') is None and cache.stats()['entries'] == 2
+
+
+@with_clock
+def test_ttl_expiry_and_namespace_stats(clock):
+    cache = MemoryCache()
+    cache.set('quotes', 'AAPL', 1.0, ttl=10)
+    cache.set('info', 'AAPL', {'name': 'Apple'}, ttl=100)
+    clock.advance(5)
+    assert cache.get('quotes', 'AAPL') == 1.0
+    clock.advance(6)
+    assert cache.get('quotes', 'AAPL') is None
+    # Expired entries are still handed out by lookup(), marked stale
+    assert cache.lookup('quotes', 'AAPL') == (1.0, clock.now - 11, False)
+    assert cache.get('info', 'AAPL') == {'name': 'Apple'}
+    assert cache.get('info', 'MSFT') is None
+
+    stats = cache.stats()['namespaces']
+    assert {k: stats['quotes'][k] for k in ('hits', 'misses', 'expirations', 'entries')} == \
+        {'hits': 1, 'misses': 2, 'expirations': 2, 'entries': 1}
+    assert stats['quotes']['hit_rate'] == round(1 / 3, 3)
+    assert (stats['info']['hits'], stats['info']['misses'], stats['info']['expirations']) == (1, 1, 0)
+    cache.clear('quotes')
+    assert cache.stats()['namespaces']['quotes']['entries'] == 0 and cache.get('info', 'AAPL') is not None
+
+
+@with_clock
+def test_get_or_fetch_tiers(clock):
+    key = f"tiers|{time.time()}"
+    fetch = CountingFetch({'price': 1})
+    assert market_cache.get_or_fetch('test', key, fetch, ttl=60) == {'price': 1}
+    assert market_cache.get_or_fetch('test', key, fetch, ttl=60) == {'price': 1}
+    assert fetch.calls == 1
+    # Another worker: nothing in memory, a hit in the shared tier
+    market_cache.memory_cache.clear('test')
+    assert market_cache.get_or_fetch('test', key, fetch, ttl=60) == {'price': 1} and fetch.calls == 1
+    # Empty results are not cached
+    empty = CountingFetch([])
+    market_cache.get_or_fetch('test', key + 'empty', empty, ttl=60)
+    market_cache.get_or_fetch('test', key + 'empty', empty, ttl=60)
+    assert empty.calls == 2
+
+
+@with_clock
+def test_stale_while_revalidate(clock):
+    key = f"swr|{time.time()}"
+    fetch = CountingFetch('v1')
+    assert market_cache.get_or_fetch('test', key, fetch, ttl=60) == 'v1'
+
+    # Just expired: the old value comes back at once and is refreshed in the background
+    served = market_cache.memory_cache.stats()['namespaces']['test']['stale_served']
+    fetch.value = 'v2'
+    clock.advance(70)
+    assert market_cache.get_or_fetch('test', key, fetch, ttl=60) == 'v1'
+    _wait_for_refreshes()
+    assert fetch.calls == 2 and market_cache.memory_cache.stats()['namespaces']['test']['stale_served'] == served + 1
+    assert market_cache.get_or_fetch('test', key, fetch, ttl=60) == 'v2'
+
+    # Long past the grace period: wait for the download
+    fetch.value = 'v3'
+    clock.advance(60 * market_cache.STALE_GRACE + 1)
+    assert market_cache.get_or_fetch('test', key, fetch, ttl=60) == 'v3' and fetch.calls == 3
+
+    # The download fails: the stale value is better than nothing
+    fetch.error = ConnectionError("down")
+    clock.advance(60 * market_cache.STALE_GRACE + 1)
+    assert market_cache.get_or_fetch('test', key, fetch, ttl=60) == 'v3' and fetch.calls == 4
+
+
+if __name__ == "__main__":
+    test_lru_eviction_by_bytes()
+    test_ttl_expiry_and_namespace_stats()
+    test_get_or_fetch_tiers()
+    test_stale_while_revalidate()
+    print("market cache tests passed")
@@ -0,0 +1,100 @@
+from datetime import date
+
+import pandas as pd
+
+import market_calendar as cal
+
+
+def ny(text):
+    return pd.Timestamp(text, tz=cal.TZ)
+
+
+# Published NYSE closures. Special closures (e.g. the national day of mourning on
+# 2025-01-09) aren't rule-based and are out of scope.
+HOLIDAYS = {
+    2024: ['2024-01-01', '2024-01-15', '2024-02-19', '2024-03-29', '2024-05-27', '2024-06-19',
+           '2024-07-04', '2024-09-02', '2024-11-28', '2024-12-25'],
+    2025: ['2025-01-01', '2025-01-20', '2025-02-17', '2025-04-18', '2025-05-26', '2025-06-19',
+           '2025-07-04', '2025-09-01', '2025-11-27', '2025-12-25'],
+}
+
+EARLY_CLOSES = {
+    2024: ['2024-07-03', '2024-11-29', '2024-12-24'],
+    2025: ['2025-07-03', '2025-11-28', '2025-12-24'],
+}
+
+# (fetched at, next session open)
+NEXT_OPEN = [
+    ('2024-06-18 08:00', '2024-06-18 09:30'),  # before today's open
+    ('2024-06-18 10:00', '2024-06-20 09:30'),  # in session, Juneteenth tomorrow
+    ('2024-03-28 17:00', '2024-04-01 09:30'),  # Good Friday and the weekend
+    ('2024-11-29 13:30', '2024-12-02 09:30'),  # after a 1 p.m. close
+    ('2025-01-17 18:00', '2025-01-21 09:30'),  # Martin Luther King Jr. Day
+    ('2025-07-05 12:00', '2025-07-07 09:30'),  # Saturday
+    ('2024-12-24 20:00', '2024-12-26 09:30'),  # Christmas
+]
+
+# (fetched at, interval, max_ttl, expected ttl in seconds)
+TTLS = [
+    ('2024-06-18 10:07:00', '15m', 3600, 8 * 60 + 5),     # until the 10:15 bar closes, plus grace
+    ('2024-06-18 10:07:00', '15m', 120, 120),             # capped by max_ttl
+    ('2024-06-18 10:07:00', '1h', 3600, 23 * 60 + 5),     # hourly bars close on the half hour (10:30)
+    ('2024-06-18 15:30:00', '1d', 7200, 30 * 60 + 5),     # daily bar closes with the session
+    ('2024-11-29 12:30:00', '1d', 7200, 30 * 60 + 5),     # early close at 1 p.m.
+    ('2024-11-29 12:55:00', '15m', 3600, 5 * 60 + 5),     # the last intraday bar is cut at the close
+    ('2024-03-28 16:05:00', '1d', 300, 300),              # closing prints still settling
+    ('2024-03-28 17:00:00', '1d', 300, (ny('2024-04-01 09:30') - ny('2024-03-28 17:00')).total_seconds()),
+    ('2025-07-05 12:00:00', '15m', 300, (ny('2025-07-07 09:30') - ny('2025-07-05 12:00')).total_seconds()),
+]
+
+
+def test_holidays():
+    for year, days in HOLIDAYS.items():
+        assert cal.holidays(year) == {date.fromisoformat(d) for d in days}, year
+
+
+def test_observed_holidays():
+    # Christmas 2021 fell on a Saturday: observed Friday the 24th
+    assert date(2021, 12, 24) in cal.holidays(2021)
+    # New Year's Day 2022 fell on a Saturday: not observed, Friday 2021-12-31 traded
+    assert cal.is_trading_day(date(2021, 12, 31)) and date(2021, 12, 31) not in cal.holidays(2022)
+    # Juneteenth 2022 fell on a Sunday: observed Monday the 20th; not a holiday before 2022
+    assert date(2022, 6, 20) in cal.holidays(2022) and date(2021, 6, 18) not in cal.holidays(2021)
+    # Independence Day 2026 falls on a Saturday: observed Friday the 3rd, so no early close that day
+    assert date(2026, 7, 3) in cal.holidays(2026) and date(2026, 7, 3) not in cal.early_closes(2026)
+
+
+def test_early_closes_and_sessions():
+    for year, days in EARLY_CLOSES.items():
+        assert cal.early_closes(year) == {date.fromisoformat(d) for d in days}, year
+    assert cal.session(date(2024, 11, 29)) == (ny('2024-11-29 09:30'), ny('2024-11-29 13:00'))
+    assert cal.session(date(2024, 11, 27)) == (ny('2024-11-27 09:30'), ny('2024-11-27 16:00'))
+    assert cal.session(date(2024, 3, 29)) is None and cal.session(date(2024, 3, 30)) is None
+    assert cal.is_open(ny('2024-11-29 12:59')) and not cal.is_open(ny('2024-11-29 13:00'))
+    assert not cal.is_open(ny('2024-06-18 09:29')) and cal.is_open(ny('2024-06-18 09:30'))
+
+
+def test_next_open_and_previous_close():
+    for now, expected in NEXT_OPEN:
+        assert cal.next_open(ny(now)) == ny(expected), now
+    assert cal.previous_close(ny('2024-04-01 08:00')) == ny('2024-03-28 16:00')
+    assert cal.previous_close(ny('2024-12-02 09:00')) == ny('2024-11-29 13:00')
+    # Epoch seconds and naive UTC timestamps mean the same instant
+    now = ny('2025-07-05 12:00')
+    assert cal.next_open(now.timestamp()) == cal.next_open(now.tz_convert('UTC').tz_localize(None)) == ny('2025-07-07 09:30')
+
+
+def test_ttl_at_bar_close_or_next_open():
+    for now, interval, max_ttl, expected in TTLS:
+        assert cal.ttl_for(interval, max_ttl, ny(now)) == int(expected), (now, interval)
+    # Never shorter than MIN_TTL, even a moment before the bar closes
+    assert cal.ttl_for('1m', 3600, ny('2024-06-18 10:00:59.999')) == cal.MIN_TTL
+
+
+if __name__ == "__main__":
+    test_holidays()
+    test_observed_holidays()
+    test_early_closes_and_sessions()
+    test_next_open_and_previous_close()
+    test_ttl_at_bar_close_or_next_open()
+    print("market calendar tests passed")
@@ -0,0 +1,143 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import bar_store
+import market_cache
+import market_data
+import signal_table
+
+
+def daily_bars(end='2026-06-30', n=300, seed=3):
+    """Weekday bars at midnight New York time, like Yahoo's daily history."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=end, periods=n, tz='America/New_York', name='Date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({
+        'Open': close * 0.999, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+        'Volume': rng.integers(1_000, 500_000, n), 'Dividends': 0.0, 'Stock Splits': 0.0,
+    }, index=index)
+
+
+class StubSource(market_data.MarketDataProvider):
+    """A live provider that never leaves the process."""
+
+    name = 'stub'
+
+    def __init__(self):
+        self.frames = {'1d': daily_bars(), '1h': daily_bars(n=50).set_axis(
+            pd.date_range('2026-06-29 09:30', periods=50, freq='h', tz='America/New_York', name='Datetime'))}
+
+    def history(self, symbol, period=None, start=None, interval='1d'):
+        return self.frames[interval]
+
+    def info(self, symbol):
+        return {'symbol': symbol, 'longName': 'Stub Corp', 'marketCap': 123}
+
+    def options(self, symbol):
+        return ('2026-07-17', '2026-07-24')
+
+    def option_chain(self, symbol, expiry):
+        calls = pd.DataFrame({'strike': [95.0, 100.0], 'volume': [10, 20]})
+        return calls, calls.assign(volume=[5, 7])
+
+    def balance_sheet(self, symbol):
+        return pd.DataFrame({pd.Timestamp('2026-03-31'): [1.0, 2.0]}, index=['Total Debt', 'Total Assets'])
+
+    def calendar(self, symbol):
+        return {'Earnings Date': ['2026-07-30']}
+
+
+def test_record_round_trip():
+    root = tempfile.mkdtemp()
+    source = StubSource()
+    market_data.record(['AAPL'], root=root, history=[('1y', '1d'), ('1mo', '1h')], source=source)
+    replay = market_data.FixtureProvider(root, align_to_now=False)
+
+    for interval, expected in source.frames.items():
+        got = replay.history('AAPL', period='max', interval=interval)
+        assert got.index.equals(expected.index) and str(got.index.tz) == 'America/New_York'
+        assert np.allclose(got[bar_store.COLUMNS].to_numpy(float), expected[bar_store.COLUMNS].to_numpy(float))
+    assert replay.info('AAPL') == source.info('AAPL')
+    assert replay.options('AAPL') == ('2026-07-17',)  # only the nearest expiry is recorded
+    calls, puts = replay.option_chain('AAPL', '2026-07-17')
+    assert list(calls['volume']) == [10, 20] and list(puts['volume']) == [5, 7]
+    sheet = replay.balance_sheet('AAPL')
+    assert sheet.loc['Total Assets', pd.Timestamp('2026-03-31')] == 2.0
+    assert replay.calendar('AAPL') == {'Earnings Date': ['2026-07-30']}
+    # Missing fixtures: empty answers, not errors
+    assert replay.history('MSFT', period='1y').empty and replay.options('MSFT') == ()
+
+
+def test_history_period_and_start_slicing():
+    root = tempfile.mkdtemp()
+    df = daily_bars()
+    market_data.save_history(root, 'AAPL', '1d', df)
+    replay = market_data.FixtureProvider(root, align_to_now=False)
+
+    # Periods are measured back from the last recorded bar (2026-06-30)
+    month = replay.history('AAPL', period='1mo')
+    assert month.index[-1] == df.index[-1] and month.index[0] == pd.Timestamp('2026-06-01', tz='America/New_York')
+    assert len(replay.history('AAPL', period='5d')) == 5
+    assert len(replay.history('AAPL', period='max')) == len(df)
+    since = replay.history('AAPL', start='2026-06-15')
+    assert since.index[0] == pd.Timestamp('2026-06-15', tz='America/New_York') and since.index[-1] == df.index[-1]
+    # Slices are copies
+    since.iloc[0, 0] = -1
+    assert replay.history('AAPL', start='2026-06-15').iloc[0, 0] != -1
+
+    # Aligned to now: same prices and weekdays, the last bar in the current week
+    aligned = market_data.FixtureProvider(root).history('AAPL', period='max')
+    assert np.allclose(aligned['Close'], df['Close'])
+    assert (aligned.index.dayofweek == df.index.dayofweek).all()
+    assert 0 <= (pd.Timestamp.now(tz='America/New_York') - aligned.index[-1]).days < 7
+
+
+def test_fixture_provider_has_its_own_storage():
+    live = (bar_store.BAR_STORE_DB, market_cache.SHARED_CACHE_DB, signal_table.SIGNAL_TABLE_DB)
+    previous = market_data.set_provider(market_data.FixtureProvider(tempfile.mkdtemp()))
+    try:
+        market_cache.memory_cache.set('market', 'AAPL', 'replayed', 60)
+        assert bar_store.BAR_STORE_DB == live[0][:-len('.db')] + '.fixture.db'
+        assert market_cache.SHARED_CACHE_DB == live[1][:-len('.db')] + '.fixture.db'
+        assert signal_table.SIGNAL_TABLE_DB == live[2][:-len('.db')] + '.fixture.db'
+        assert os.path.exists(bar_store.BAR_STORE_DB) and os.path.exists(signal_table.SIGNAL_TABLE_DB)
+    finally:
+        market_data.set_provider(StubSource())
+    # Back on live data: the live files, and nothing replayed left in memory
+    assert (bar_store.BAR_STORE_DB, market_cache.SHARED_CACHE_DB, signal_table.SIGNAL_TABLE_DB) == live
+    assert market_cache.memory_cache.get('market', 'AAPL') is None
+    market_data.set_provider(previous)
+
+
+def test_fixture_mode_never_reads_live_storage():
+    # A frame only the live shared cache holds
+    market_cache.put('engine', 'AAPL|6mo|1d', daily_bars(), 600)
+    env = dict(os.environ, MARKET_DATA_PROVIDER='fixture', MARKET_DATA_FIXTURES=tempfile.mkdtemp(),
+               BAR_STORE_DB=bar_store.BAR_STORE_DB, SHARED_CACHE_DB=market_cache.SHARED_CACHE_DB,
+               SIGNAL_TABLE_DB=signal_table.SIGNAL_TABLE_DB)
+    script = (
+        "import bar_store, market_cache, signal_table\n"
+        "from stock_engine import StockEngine\n"
+        "print(bar_store.BAR_STORE_DB, market_cache.SHARED_CACHE_DB, signal_table.SIGNAL_TABLE_DB)\n"
+        "print(len(StockEngine.fetch_many(['AAPL']).get('AAPL', ())))\n"
+    )
+    out = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), timeout=120)
+    assert out.returncode == 0, out.stderr
+    paths, bars = out.stdout.strip().splitlines()[-2:]
+    assert all(path.endswith('.fixture.db') for path in paths.split())
+    # Nothing is recorded for AAPL, and the live frame isn't served in its place
+    assert bars == '0'
+
+
+if __name__ == "__main__":
+    test_record_round_trip()
+    test_history_period_and_start_slicing()
+    test_fixture_provider_has_its_own_storage()
+    test_fixture_mode_never_reads_live_storage()
+    print("market data tests passed")
@@ -0,0 +1,330 @@
+import numpy as np
+import pandas as pd
+
+import indicators
+import recommendation
+from stock_engine import StockEngine
+from test_indicators import make_history
+
+
+def reference(df):
+    """The scalar get_recommendation StockEngine used before recommendation.py."""
+    df = StockEngine("TEST").calculate_atr(df)
+    latest = df.iloc[-1]
+    prev = df.iloc[-2]
+    
+    score = 0
+    reasons_bull = []
+    reasons_bear = []
+    
+    # === 1. Price Trend (Short-term direction) ===
+    if len(df) >= 5:
+        recent_5 = df['Close'].tail(5)
+        pct_change_5 = (recent_5.iloc[-1] - recent_5.iloc[0]) / recent_5.iloc[0] * 100
+        if pct_change_5 > 1.5:
+            score += 1
+            reasons_bull.append(f"اتجاه صاعد {pct_change_5:.1f}%")
+        elif pct_change_5 < -1.5:
+            score -= 1
+            reasons_bear.append(f"اتجاه هابط {pct_change_5:.1f}%")
+    
+    # === 2. EMA Position (Close vs EMA20 and EMA50) ===
+    above_ema20 = latest['Close'] > latest['EMA20']
+    above_ema50 = latest['Close'] > latest['EMA50']
+    
+    if above_ema20 and above_ema50:
+        score += 1
+        reasons_bull.append("السعر فوق EMA20 و EMA50")
+    elif not above_ema20 and not above_ema50:
+        score -= 1
+        reasons_bear.append("السعر تحت EMA20 و EMA50")
+        
+    # === 3. EMA Crossover (Golden/Death Cross) ===
+    ema20_above_ema50 = latest['EMA20'] > latest['EMA50']
+    prev_ema20_above_ema50 = prev['EMA20'] > prev['EMA50']
+    
+    if ema20_above_ema50:
+        score += 1
+        reasons_bull.append("EMA20 فوق EMA50 (اتجاه صاعد)")
+        if not prev_ema20_above_ema50:
+            score += 1  # Fresh golden cross
+            reasons_bull.append("تقاطع ذهبي حديث!")
+    else:
+        score -= 1
+        reasons_bear.append("EMA20 تحت EMA50 (اتجاه هابط)")
+        if prev_ema20_above_ema50:
+            score -= 1  # Fresh death cross
+            reasons_bear.append("تقاطع سلبي حديث!")
+    
+    # === 4. RSI Analysis (more nuanced) ===
+    rsi = latest['RSI']
+    if rsi < 30:
+        score += 2  # Oversold - strong buy signal
+        reasons_bull.append(f"RSI تشبع بيعي قوي ({rsi:.0f})")
+    elif rsi < 45:
+        score += 1
+        reasons_bull.append(f"RSI منخفض ({rsi:.0f})")
+    elif rsi > 80:
+        score -= 2  # Extremely overbought
+        reasons_bear.append(f"RSI تشبع شرائي شديد ({rsi:.0f})")
+    elif rsi > 65:
+        score -= 1
+        reasons_bear.append(f"RSI مرتفع ({rsi:.0f})")
+    elif 50 <= rsi <= 60:
+        score += 0.5  # Neutral-bullish zone
+    
+    # RSI momentum (direction)
+    if not pd.isna(prev['RSI']):
+        if rsi > prev['RSI'] and rsi < 70:
+            score += 0.5
+        elif rsi < prev['RSI'] and rsi > 30:
+            score -= 0.5
+    
+    # === 5. MACD Analysis ===
+    if latest['MACD'] > latest['Signal_Line']:
+        score += 1
+        reasons_bull.append("MACD إيجابي")
+        if prev['MACD'] <= prev['Signal_Line']:
+            score += 1
+            reasons_bull.append("تقاطع MACD صاعد جديد!")
+    elif latest['MACD'] < latest['Signal_Line']:
+        score -= 1
+        reasons_bear.append("MACD سلبي")
+        if prev['MACD'] >= prev['Signal_Line']:
+            score -= 1
+            reasons_bear.append("تقاطع MACD هابط جديد!")
+
+    # MACD Histogram momentum
+    macd_hist_now = latest['MACD'] - latest['Signal_Line']
+    macd_hist_prev = prev['MACD'] - prev['Signal_Line']
+    if macd_hist_now > macd_hist_prev:
+        score += 0.5  # Increasing momentum
+    elif macd_hist_now < macd_hist_prev:
+        score -= 0.5
+        
+    # === 6. Bollinger Bands Position ===
+    if 'BB_Upper' in latest and 'BB_Lower' in latest:
+        if not pd.isna(latest['BB_Lower']) and not pd.isna(latest['BB_Upper']):
+            bb_width = latest['BB_Upper'] - latest['BB_Lower']
+            if bb_width > 0:
+                bb_position = (latest['Close'] - latest['BB_Lower']) / bb_width
+                if bb_position < 0.2:
+                    score += 1
+                    reasons_bull.append("السعر قرب الحد الأدنى لبولنجر")
+                elif bb_position > 0.8:
+                    score -= 1
+                    reasons_bear.append("السعر قرب الحد الأعلى لبولنجر")
+    
+    # === 7. Consecutive Candles ===
+    if len(df) >= 3:
+        last_3 = df.tail(3)
+        green_count = sum(last_3['Close'] > last_3['Open'])
+        red_count = sum(last_3['Close'] < last_3['Open'])
+        if green_count == 3:
+            score += 1
+            reasons_bull.append("3 شموع خضراء متتالية")
+        elif red_count == 3:
+            score -= 1
+            reasons_bear.append("3 شموع حمراء متتالية")
+    
+    # === 8. Volume Analysis ===
+    if 'Volume' in df.columns and len(df) >= 20:
+        avg_vol = df['Volume'].tail(20).mean()
+        if avg_vol > 0 and latest['Volume'] > avg_vol * 1.5:
+            # High volume confirms the direction
+            if latest['Close'] > latest['Open']:
+                score += 1
+                reasons_bull.append("حجم تداول مرتفع مع صعود")
+            elif latest['Close'] < latest['Open']:
+                score -= 1
+                reasons_bear.append("حجم تداول مرتفع مع هبوط")
+    
+    # === 9. Stochastic Oscillator ===
+    if 'Stoch_K' in latest and not pd.isna(latest['Stoch_K']):
+        stoch_k = latest['Stoch_K']
+        stoch_d = latest['Stoch_D'] if not pd.isna(latest.get('Stoch_D', float('nan'))) else stoch_k
+        if stoch_k < 20:
+            score += 1
+            reasons_bull.append(f"Stochastic تشبع بيعي ({stoch_k:.0f})")
+        elif stoch_k > 80:
+            score -= 1
+            reasons_bear.append(f"Stochastic تشبع شرائي ({stoch_k:.0f})")
+        # Stochastic crossover
+        if stoch_k > stoch_d and stoch_k < 50:
+            score += 0.5
+        elif stoch_k < stoch_d and stoch_k > 50:
+            score -= 0.5
+
+    # === 10. ADX (Trend Strength) ===
+    if 'ADX' in latest and not pd.isna(latest['ADX']):
+        adx_val = latest['ADX']
+        plus_di = latest.get('Plus_DI', 0)
+        minus_di = latest.get('Minus_DI', 0)
+        if adx_val > 25:
+            # Strong trend — follow direction
+            if not pd.isna(plus_di) and not pd.isna(minus_di):
+                if plus_di > minus_di:
+                    score += 1
+                    reasons_bull.append(f"اتجاه قوي صاعد (ADX={adx_val:.0f})")
+                elif minus_di > plus_di:
+                    score -= 1
+                    reasons_bear.append(f"اتجاه قوي هابط (ADX={adx_val:.0f})")
+
+    # === 11. VWAP Position (intraday key level) ===
+    if 'VWAP' in latest and not pd.isna(latest.get('VWAP', float('nan'))):
+        if latest['Close'] > latest['VWAP']:
+            score += 0.5
+            reasons_bull.append("السعر فوق VWAP")
+        elif latest['Close'] < latest['VWAP']:
+            score -= 0.5
+            reasons_bear.append("السعر تحت VWAP")
+
+    # === 12. EMA9 Short-term momentum ===
+    if 'EMA9' in latest and not pd.isna(latest['EMA9']):
+        if latest['Close'] > latest['EMA9'] and latest['EMA9'] > latest['EMA20']:
+            score += 0.5
+            reasons_bull.append("زخم قصير المدى إيجابي (EMA9)")
+        elif latest['Close'] < latest['EMA9'] and latest['EMA9'] < latest['EMA20']:
+            score -= 0.5
+            reasons_bear.append("زخم قصير المدى سلبي (EMA9)")
+    
+    # === Determine Final Signal ===
+    close_price = latest['Close']
+    atr = latest['ATR'] if not pd.isna(latest['ATR']) else (close_price * 0.02)
+    
+    support = latest['Support'] if 'Support' in latest and not pd.isna(latest['Support']) else close_price * 0.95
+    resistance = latest['Resistance'] if 'Resistance' in latest and not pd.isna(latest['Resistance']) else close_price * 1.05
+    
+    levels = {}
+    
+    # Trend strength classification
+    adx_val = latest.get('ADX', 0) if not pd.isna(latest.get('ADX', float('nan'))) else 0
+    if adx_val > 40:
+        trend_strength = "قوي جداً 🔥"
+    elif adx_val > 25:
+        trend_strength = "قوي 💪"
+    elif adx_val > 15:
+        trend_strength = "متوسط ⚡"
+    else:
+        trend_strength = "ضعيف 😴"
+    
+    if score >= 4:
+        signal = "Strong Buy (شراء قوي) 🟢🟢"
+        levels = {
+            "Entry": close_price,
+            "SL": close_price - (1.5 * atr),
+            "TP": close_price + (4 * atr)
+        }
+    elif score >= 1.5:
+        signal = "Buy (شراء) 🟢"
+        levels = {
+            "Entry": close_price,
+            "SL": close_price - (2 * atr),
+            "TP": close_price + (3 * atr)
+        }
+    elif score <= -4:
+        signal = "Strong Sell (بيع قوي) 🔴🔴"
+        levels = {
+            "Entry": close_price,
+            "SL": close_price + (1.5 * atr),
+            "TP": close_price - (4 * atr)
+        }
+    elif score <= -1.5:
+        signal = "Sell (بيع) 🔴"
+        levels = {
+            "Entry": close_price,
+            "SL": close_price + (2 * atr),
+            "TP": close_price - (3 * atr)
+        }
+    else:
+        signal = "Hold (انتظار/مراقبة) 🟡"
+        
+    levels["Support"] = support
+    levels["Resistance"] = resistance
+    levels["score"] = score
+    levels["trend_strength"] = trend_strength
+    levels["reasons_bull"] = reasons_bull
+    levels["reasons_bear"] = reasons_bear
+        
+    return signal, levels
+
+
+def histories():
+    """Indicator frames covering warm-up NaNs, missing optional columns and gaps in volume."""
+    trending = make_history(160, seed=1, freq='D')
+    trending['Close'] *= np.linspace(0.8, 1.3, len(trending))
+    choppy = make_history(160, seed=2, freq='D')
+    choppy['Volume'] = choppy['Volume'].astype(float)
+    choppy.loc[choppy.index[60:75], 'Volume'] = np.nan
+    choppy.loc[choppy.index[::9], 'Volume'] *= 4
+    yield indicators.calculate(trending)
+    yield indicators.calculate(choppy)
+    yield indicators.calculate(make_history(160, seed=3, freq='D'), ['RSI', 'Signal_Line', 'EMA20', 'EMA50'])
+
+
+def test_latest_matches_reference():
+    signals = set()
+    for df in histories():
+        for end in range(2, len(df) + 1):
+            window = df.iloc[:end]
+            expected = reference(window.copy())
+            actual = recommendation.latest(StockEngine("TEST").calculate_atr(window.copy()))
+            assert actual == expected, (end, actual, expected)
+            assert type(actual[1]['score']) is type(expected[1]['score']), end
+            signals.add(expected[0])
+    assert len(signals) == 5, signals
+
+
+def test_history_matches_latest():
+    for df in histories():
+        df = StockEngine("TEST").calculate_atr(df.copy())
+        history = recommendation.evaluate(df)
+        for end in range(2, len(df) + 1):
+            signal, levels = recommendation.latest(df.iloc[:end])
+            row = history.iloc[end - 1]
+            assert row['Signal'] == signal and row['Score'] == levels['score'], end
+            assert np.isnan(row['Entry']) if 'Entry' not in levels else \
+                (row['Entry'], row['SL'], row['TP']) == (levels['Entry'], levels['SL'], levels['TP']), end
+
+
+def test_too_short():
+    df = StockEngine("TEST").calculate_atr(indicators.calculate(make_history(1)))
+    try:
+        recommendation.latest(df)
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("one bar should not produce a recommendation")
+
+def test_result_cache_sees_rewritten_history():
+    engine = StockEngine("CACHE")
+    df = make_history(300, seed=11, freq='D')
+    df.attrs.update(symbol="CACHE", interval="1d")
+    first = engine.calculate_technical_indicators(df.copy())
+    assert np.allclose(engine.calculate_technical_indicators(df.copy())['EMA50'], first['EMA50'], equal_nan=True)
+
+    # A split/dividend re-adjustment rewrites older bars; the window and last bar stay the same
+    adjusted = df.copy()
+    adjusted.iloc[:-1, :4] *= 0.5
+    again = engine.calculate_technical_indicators(adjusted)
+    assert not np.allclose(again['EMA50'], first['EMA50'], equal_nan=True)
+    assert np.allclose(again['EMA50'], indicators.calculate(adjusted.copy())['EMA50'], equal_nan=True)
+
+
+if __name__ == "__main__":
+    import time
+
+    test_latest_matches_reference()
+    test_history_matches_latest()
+    test_result_cache_sees_rewritten_history()
+    test_too_short()
+    print("Vectorized recommendation matches the scalar implementation.")
+
+    df = StockEngine("TEST").calculate_atr(indicators.calculate(make_history(2000, freq='D')))
+    start = time.perf_counter()
+    for end in range(1000, 2000):
+        reference(df.iloc[:end].copy())
+    print(f"scalar, bar by bar: {(time.perf_counter() - start) * 1000:.1f} ms for 1000 bars")
+    start = time.perf_counter()
+    recommendation.evaluate(df.iloc[1000:])
+    print(f"vectorized: {(time.perf_counter() - start) * 1000:.1f} ms for 1000 bars")
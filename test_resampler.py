@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+import bar_store
+import resampler
+
+TZ = 'America/New_York'
+
+
+def hourly_bars(days, seed=4, half_days=(), minutes=60):
+    """Yahoo-style bars every `minutes` from 9:30 (1h: 9:30 ... 15:30, 12:30 last on half days)."""
+    rng = np.random.default_rng(seed)
+    index = []
+    for day in days:
+        close = '13:00' if day in half_days else '16:00'
+        index += list(pd.date_range(f"{day} 09:30", f"{day} {close}", freq=f"{minutes}min", inclusive='left', tz=TZ))
+    n = len(index)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+    open_ = close * (1 + rng.normal(0, 0.001, n))
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * 1.002,
+        'Low': np.minimum(open_, close) * 0.998,
+        'Close': close,
+        'Volume': rng.integers(1_000, 50_000, n),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=pd.DatetimeIndex(index, name='Datetime'))
+
+
+def expected_bars(df, key):
+    """Reference aggregation: rows grouped by key(timestamp), first/max/min/last/sum per group."""
+    groups = {}
+    for ts, row in df.iterrows():
+        groups.setdefault(key(ts), []).append(row)
+    rows = {label: {'Open': g[0]['Open'], 'High': max(r['High'] for r in g), 'Low': min(r['Low'] for r in g),
+                    'Close': g[-1]['Close'], 'Volume': sum(int(r['Volume']) for r in g)}
+            for label, g in groups.items()}
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def session_label(length):
+    """Bins of `length` anchored at the 9:30 open on the New York wall clock."""
+    def label(ts):
+        open_ = pd.Timestamp(f"{ts.date()} 09:30", tz=TZ)
+        return open_ + length * int((ts - open_) / length)
+    return label
+
+
+four_hour_label = session_label(pd.Timedelta(hours=4))
+
+
+def assert_bars(actual, expected):
+    assert list(actual.index) == list(expected.index), (list(actual.index), list(expected.index))
+    for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        assert np.allclose(actual[col].to_numpy(float), expected[col].to_numpy(float)), col
+    assert actual['Volume'].dtype.kind == 'i'
+
+
+DAYS = ['2024-11-25', '2024-11-26', '2024-11-27', '2024-11-29', '2024-12-02', '2024-12-03']
+
+
+def test_four_hour_bars_are_session_anchored():
+    df = hourly_bars(DAYS, half_days={'2024-11-29'})
+    bars = resampler.resample(df, '4h', '1h')
+    assert_bars(bars, expected_bars(df, four_hour_label))
+    day = bars.loc['2024-11-26']
+    assert [ts.strftime('%H:%M') for ts in day.index] == ['09:30', '13:30']
+    # The half day has only the morning bar; no bar spans two sessions
+    assert [ts.strftime('%H:%M') for ts in bars.loc['2024-11-29'].index] == ['09:30']
+    assert bars.attrs['interval'] == '4h' and bars.index.name == 'Datetime'
+
+
+def test_bins_stay_on_the_session_across_dst():
+    # Clocks went forward on Sunday 2024-03-10: 9:30 EST is 14:30 UTC, 9:30 EDT is 13:30 UTC
+    days = [d.strftime('%Y-%m-%d') for d in pd.bdate_range('2024-03-04', '2024-03-15')]
+    df = hourly_bars(days)
+    bars = resampler.resample(df, '4h', '1h')
+    assert_bars(bars, expected_bars(df, four_hour_label))
+    assert {ts.strftime('%H:%M') for ts in bars.index} == {'09:30', '13:30'}
+    assert len(bars) == 2 * len(days)
+
+    half_hours = hourly_bars(days, minutes=30)
+    bars = resampler.resample(half_hours, '90m', '30m')
+    assert_bars(bars, expected_bars(half_hours, session_label(pd.Timedelta(minutes=90))))
+    assert {ts.strftime('%H:%M') for ts in bars.index} == {'09:30', '11:00', '12:30', '14:00', '15:30'}
+
+
+def test_daily_and_weekly_bars_from_hourly():
+    df = hourly_bars(DAYS, half_days={'2024-11-29'})
+    daily = resampler.resample(df, '1d', '1h')
+    assert_bars(daily, expected_bars(df, lambda ts: ts.normalize()))
+    assert daily.index[0] == pd.Timestamp('2024-11-25', tz=TZ) and daily.index.name == 'Date'
+    weekly = resampler.resample(df, '1wk', '1h')
+    assert_bars(weekly, expected_bars(df, lambda ts: (ts - pd.Timedelta(days=ts.dayofweek)).normalize()))
+
+
+def test_partial_last_bar_is_kept():
+    # Data up to the 14:30 bar of the last session: the forming 4h and daily bars are partial
+    df = hourly_bars(DAYS).iloc[:-1]
+    bars = resampler.resample(df, '4h', '1h')
+    assert bars.index[-1] == pd.Timestamp('2024-12-03 13:30', tz=TZ)
+    assert bars['Volume'].iloc[-1] == df['Volume'].iloc[-2:].sum()
+    assert bars['Close'].iloc[-1] == df['Close'].iloc[-1]
+    daily = resampler.resample(df, '1d', '1h')
+    assert daily['Volume'].iloc[-1] == df.loc['2024-12-03', 'Volume'].sum()
+    assert daily['High'].iloc[-1] == df.loc['2024-12-03', 'High'].max()
+
+
+def test_build_timeframes_and_validation():
+    days = [d.strftime('%Y-%m-%d') for d in pd.bdate_range(end=pd.Timestamp.now(tz=TZ).normalize(), periods=40)]
+    df = hourly_bars(days)
+    frames = resampler.build_timeframes(df, '1h', [('4h', '5d'), ('1d', '1mo'), ('1wk', 'max')])
+    four = frames[('4h', '5d')]
+    assert four.index[0] >= bar_store.window_start('5d', '4h') and four.index[-1].strftime('%H:%M') == '13:30'
+    assert_bars(frames[('1d', '1mo')], expected_bars(df, lambda ts: ts.normalize()).loc[frames[('1d', '1mo')].index])
+    assert len(frames[('1wk', 'max')]) == len({(ts - pd.Timedelta(days=ts.dayofweek)).normalize() for ts in df.index})
+    assert resampler.can_build('1h', '4h') and not resampler.can_build('4h', '1h') and not resampler.can_build('90m', '4h')
+    try:
+        resampler.resample(df, '1h', '4h')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("finer bars can't be built from coarser ones")
+
+
+if __name__ == "__main__":
+    test_four_hour_bars_are_session_anchored()
+    test_bins_stay_on_the_session_across_dst()
+    test_daily_and_weekly_bars_from_hourly()
+    test_partial_last_bar_is_kept()
+    test_build_timeframes_and_validation()
+    print("resampler tests passed")
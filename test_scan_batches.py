@@ -0,0 +1,129 @@
+import time
+
+import pandas as pd
+
+import scanner
+from test_indicators import make_history
+
+
+def test_scan_runs_batches_in_parallel():
+    tickers = [f"T{i}" for i in range(40)]
+
+    def fetch(batch):
+        time.sleep(0.2)
+        return {t: int(t[1:]) for t in batch}
+
+    def score(frames):
+        return {t: {'ticker': t} if n % 3 == 0 else None for t, n in frames.items()}
+
+    start = time.perf_counter()
+    result = scanner.run(tickers, fetch, score, batch_size=5, max_workers=8, timeout=2, deadline=5)
+    # Eight batches on eight workers: about one batch's latency, not eight
+    assert time.perf_counter() - start < 1.0
+    assert not result.partial and result.pending == []
+    assert [hit['ticker'] for hit in result] == [t for t in tickers if int(t[1:]) % 3 == 0]
+
+
+def test_deadline_and_timeout_return_partial_results():
+    tickers = [f"T{i}" for i in range(12)]
+
+    def fetch(batch):
+        if 'T4' in batch:
+            time.sleep(3)  # hangs past the per-batch timeout
+        if 'T8' in batch:
+            raise ConnectionError("download failed")
+        return {t: t for t in batch}
+
+    start = time.perf_counter()
+    result = scanner.run(tickers, fetch, lambda frames: {t: t for t in frames}, batch_size=4, max_workers=4,
+                         timeout=0.3, deadline=2)
+    assert time.perf_counter() - start < 1.0
+    assert list(result) == ['T0', 'T1', 'T2', 'T3']
+    assert result.partial and result.pending == ['T4', 'T5', 'T6', 'T7']
+
+    # Batches still queued at the deadline are reported as pending too
+    slow = scanner.run(tickers, lambda batch: time.sleep(0.4) or {t: t for t in batch},
+                       lambda frames: dict(frames), batch_size=2, max_workers=1, timeout=5, deadline=0.6)
+    assert slow.partial and list(slow) + slow.pending == tickers and len(slow) < len(tickers)
+
+
+def test_stream_yields_each_batch_as_it_is_scored():
+    tickers = [f"T{i}" for i in range(6)]
+
+    def fetch(batch):
+        time.sleep(0.05 if 'T0' in batch else 0.5)
+        return {t: t for t in batch}
+
+    start = time.perf_counter()
+    scan = scanner.stream(tickers, fetch, lambda frames: {t: t for t in frames if t != 'T1'},
+                          batch_size=2, max_workers=3, timeout=2, deadline=5)
+    first = next(scan)
+    # The quick batch arrives well before the slow ones have been downloaded
+    assert first == ['T0'] and time.perf_counter() - start < 0.3
+    rest = [hit for found in scan for hit in found]
+    assert sorted(rest) == ['T2', 'T3', 'T4', 'T5']
+
+    result = scanner.drain(scanner.stream(tickers, fetch, lambda frames: dict(frames), batch_size=2,
+                                          max_workers=3, timeout=2, deadline=5))
+    assert list(result) == tickers and not result.partial
+
+
+def test_diff_events():
+    before = {'A': "Buy (شراء) 🟢", 'B': "Hold (انتظار/مراقبة) 🟡", 'C': "Sell (بيع) 🔴", 'D': "Buy (شراء) 🟢"}
+    after = {'A': "Strong Buy (شراء قوي) 🟢🟢", 'B': "Buy (شراء) 🟢", 'C': "Hold (انتظار/مراقبة) 🟡",
+             'D': "Buy (شراء) 🟢", 'E': "Sell (بيع) 🔴", 'F': "Hold (انتظار/مراقبة) 🟡"}
+    assert [(e['ticker'], e['kind']) for e in scanner.diff(before, after)] == \
+        [('A', 'changed'), ('B', 'new_buy'), ('C', 'dropped'), ('E', 'new_sell')]
+
+
+def test_tracker_rescores_only_new_bars():
+    name = f"test|{time.time()}"
+    frames = {f"T{s}": make_history(60, seed=s, freq='D') for s in range(3)}
+    first = scanner.Tracker(name)
+    assert first.changed(frames).keys() == frames.keys()
+    first.update(frames, {t: {'signal': "Hold (انتظار/مراقبة) 🟡"} for t in frames})
+    assert first.save() == []  # nothing to compare against yet
+
+    # T1 gets a new bar, T2's forming bar is revised, T0 is unchanged
+    later = dict(frames)
+    extra = make_history(61, seed=1, freq='D')
+    later['T1'] = pd.concat([frames['T1'], extra.iloc[-1:].set_axis([frames['T1'].index[-1] + pd.Timedelta(days=1)])])
+    later['T2'] = frames['T2'].copy()
+    later['T2'].iloc[-1, later['T2'].columns.get_loc('Close')] += 0.5
+    second = scanner.Tracker(name)
+    assert sorted(second.changed(later)) == ['T1', 'T2']
+    second.update(later, {'T1': {'signal': "Buy (شراء) 🟢"}, 'T2': {'signal': "Hold (انتظار/مراقبة) 🟡"}})
+    assert second.records(later)['T0'] == {'signal': "Hold (انتظار/مراقبة) 🟡"}
+    assert second.save() == [{'ticker': 'T1', 'kind': 'new_buy', 'old': "Hold (انتظار/مراقبة) 🟡", 'new': "Buy (شراء) 🟢"}]
+    assert scanner.Tracker(name).changed(later) == {}
+
+def test_tracker_drops_records_it_could_not_rescore():
+    name = f"test|{time.time()}"
+    frames = {f"T{s}": make_history(60, seed=s, freq='D') for s in range(2)}
+    first = scanner.Tracker(name)
+    first.update(frames, {t: {'signal': "Buy (شراء) 🟢"} for t in frames})
+    first.save()
+
+    # Both bars are revised; T1 fails to score, so its Buy from the old bar must not carry over
+    later = {t: df.copy() for t, df in frames.items()}
+    for df in later.values():
+        df.iloc[-1, df.columns.get_loc('Close')] += 0.5
+    second = scanner.Tracker(name)
+    assert sorted(second.changed(later)) == ['T0', 'T1']
+    second.update(later, {'T0': {'signal': "Buy (شراء) 🟢"}})
+    assert list(second.records(later)) == ['T0']
+    # Records are copies: editing one doesn't touch the tracker's state
+    second.records(later)['T0']['signal'] = "edited"
+    assert second.records(later)['T0'] == {'signal': "Buy (شراء) 🟢"}
+    second.save()
+    assert sorted(scanner.Tracker(name).changed(later)) == ['T1']
+
+
+if __name__ == "__main__":
+    test_scan_runs_batches_in_parallel()
+    test_deadline_and_timeout_return_partial_results()
+    test_stream_yields_each_batch_as_it_is_scored()
+    test_diff_events()
+    test_tracker_rescores_only_new_bars()
+    test_tracker_drops_records_it_could_not_rescore()
+    print("Scanner honours its concurrency cap, timeouts and deadline.")
@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import auto_trader
+import indicators
+import scoring
+from test_indicators import make_history
+
+
+def reference_smart_score(latest):
+    """The hand-written smart score auto_trader._analyze_stock used before scoring.py."""
+    score = 50
+    reasons = []
+    rsi = latest.get('RSI', 50)
+    if rsi < 30:
+        score += 15
+        reasons.append(f"RSI منخفض ({rsi:.0f})")
+    elif rsi < 45:
+        score += 8
+        reasons.append(f"RSI جيد ({rsi:.0f})")
+    elif rsi > 70:
+        score -= 15
+        reasons.append(f"RSI مرتفع ({rsi:.0f})")
+    if latest.get('MACD', 0) > latest.get('Signal_Line', 0):
+        score += 12
+        reasons.append("MACD صعودي")
+    else:
+        score -= 8
+    if latest['Close'] > latest.get('EMA20', latest['Close']):
+        score += 8
+        reasons.append("فوق EMA20")
+    else:
+        score -= 5
+    adx = latest.get('ADX', 0)
+    if adx > 25:
+        score += 5
+        reasons.append(f"ADX قوي ({adx:.0f})")
+    if latest['Close'] > latest.get('VWAP', latest['Close']):
+        score += 5
+        reasons.append("فوق VWAP")
+    stoch = latest.get('Stoch_K', 50)
+    if stoch < 20:
+        score += 5
+        reasons.append("Stochastic منخفض")
+    elif stoch > 80:
+        score -= 5
+    return max(0, min(100, score)), reasons
+
+
+def test_smart_score_matches_reference():
+    for df in (indicators.calculate(make_history(300, seed=4, freq='D')),
+               indicators.calculate(make_history(300, seed=5, freq='D'), ['RSI', 'EMA20'])):
+        result = auto_trader.SMART_SCORE.evaluate(df)
+        for i in range(len(df)):
+            score, reasons = reference_smart_score(df.iloc[i])
+            assert result.score(i) == score and type(result.score(i)) is int, i
+            assert result.reasons(i) == reasons, i
+        assert auto_trader.SMART_SCORE.latest(df).reasons() == reference_smart_score(df.iloc[-1])[1]
+
+
+def test_expressions():
+    df = pd.DataFrame({'Close': [1.0, 2.0, np.nan, 4.0, 5.0], 'Open': [1.0, 1.5, 3.0, 5.0, 4.0]})
+    env = scoring.Env(df, defaults={'EMA20': 'Close', 'RSI': 50})
+    assert list(scoring.Expression('Close > Open').evaluate(env)) == [False, True, False, False, True]
+    assert list(scoring.Expression('not Close > Open').evaluate(env)) == [True, False, True, True, False]
+    assert list(scoring.Expression('1 < Close <= 4').evaluate(env)) == [False, True, False, True, False]
+    assert np.isnan(scoring.Expression('prev2_Close').evaluate(env)[:2]).all()
+    assert scoring.Expression('prev2_Close').evaluate(env)[3] == 2.0
+    assert scoring.Expression('fill(Close, Open)').evaluate(env)[2] == 3.0
+    assert scoring.Expression('EMA20 == Close or RSI == 50').evaluate(env).all()
+    assert scoring.Expression('mean(Close, 2)').evaluate(env)[3] == 4.0
+    for bad in ('__import__("os")', 'Close.values', 'open("x")', 'Close[0]', 'lambda: 1', 'mean(Close, n)'):
+        try:
+            scoring.Expression(bad)
+        except scoring.ExpressionError:
+            continue
+        raise AssertionError(f"{bad!r} should not compile")
+
+
+def test_groups_and_missing_columns():
+    table = scoring.RuleTable({
+        'rules': [
+            {'group': 'g', 'when': 'Close > 2', 'points': 1, 'reason': "above {Close:.0f}"},
+            {'group': 'g', 'when': 'Close > 1', 'points': 10},
+            {'group': 'g', 'when': 'True', 'points': 100},
+            {'when': 'Missing > 0', 'points': 1000},
+            {'when': 'prev3_Close > 0', 'points': 0.5},
+        ],
+    })
+    df = pd.DataFrame({'Close': [1.0, 2.0, 3.0, 4.0]})
+    result = table.evaluate(df)
+    assert list(result.scores) == [100, 10, 1, 1.5]
+    assert result.score(0) == 100 and type(result.score(0)) is int
+    assert result.reasons(2) == ["above 3"]
+    assert table.lookback == 4
+    assert table.latest(df).score() == 1.5
+
+
+def test_json_override():
+    spec = {'rules': [{'when': 'Close > 0', 'points': 7}]}
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, 'custom.json'), 'w', encoding='utf-8') as f:
+            json.dump(spec, f)
+        previous, scoring.RULES_DIR = scoring.RULES_DIR, root
+        try:
+            table = scoring.table('custom', {'rules': []})
+        finally:
+            scoring.RULES_DIR = previous
+    assert table.latest(pd.DataFrame({'Close': [1.0]})).score() == 7
+
+
+if __name__ == "__main__":
+    test_smart_score_matches_reference()
+    test_expressions()
+    test_groups_and_missing_columns()
+    test_json_override()
+    print("Scoring rule tables match the hand-written scores.")
@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+import screener
+import signal_table
+from stock_engine import StockEngine
+from test_indicators import make_history
+
+
+def _snapshot():
+    return pd.DataFrame({
+        'Close': [10.0, 20.0, 30.0, 40.0],
+        'RSI': [25.0, 35.0, np.nan, 20.0],
+        'EMA50': [9.0, 25.0, 20.0, 45.0],
+        'score': [3.0, 1.0, 2.0, 3.0],
+        'shariah': [1.0, 0.0, 1.0, np.nan],
+        'signal': ['Buy', 'Sell', 'Strong Buy', 'Neutral'],
+    }, index=pd.Index(['A', 'B', 'C', 'D'], name='Ticker'))
+
+
+def test_filter_order_limit():
+    df = _snapshot()
+    assert list(screener.Screen("RSI < 30 and Close > EMA50").run(df).index) == ['A']
+    # Case-insensitive names; NaN comparisons are False, as in the rule tables
+    assert list(screener.Screen("rsi < 40 order by close desc").run(df).index) == ['D', 'B', 'A']
+    assert list(screener.Screen("shariah == true").run(df).index) == ['A', 'C']
+    assert list(screener.Screen("order by score desc, Close asc limit 3").run(df).index) == ['A', 'D', 'C']
+    assert list(screener.Screen("where abs(Close - EMA50) > 4 limit 1").run(df).index) == ['B']
+    assert len(screener.Screen("").run(df)) == 4
+
+
+def test_errors():
+    # Nesting that would blow the parser's or the compiler's stack is rejected, not raised
+    nested = ['not ' * 3000 + '1', '+'.join(['Close'] * 5000), '+'.join(['Close'] * 150)]
+    # The signal label is text: screens filter on buy/sell instead
+    text = ["signal == 1", "RSI < 30 order by signal", "SIGNAL > 0"]
+    for query in ["RSI <", "Foo > 1", "prev_RSI > RSI", "RSI > mean(RSI, 5)"] + nested + text:
+        try:
+            screener.Screen(query).run(_snapshot())
+        except screener.ScreenError:
+            continue
+        raise AssertionError(f"{query!r} was accepted")
+
+
+def test_screen_signal_table():
+    frames = {f"SCR{s}": make_history(120, seed=s, freq='D') for s in range(20)}
+    now = time.time()
+    signal_table.write(signal_table._rows(StockEngine("SPY"), frames, '1d', now))
+    snap = screener.snapshot('1d', now)
+    assert set(frames) <= set(snap.index)
+
+    records, took = screener.screen("RSI > 50 and buy == true order by score desc limit 5", now=now)
+    expected = snap[(snap['RSI'] > 50) & (snap['buy'] == 1)].sort_values('score', ascending=False)
+    assert [r['score'] for r in records] == list(expected['score'][:5])
+    assert all(r['RSI'] > 50 and r['signal'] for r in records) and took >= 0
+    try:
+        screener.screen("signal == 1 order by signal", now=now)
+    except screener.ScreenError as e:
+        assert 'signal' in str(e) and 'buy' in str(e)
+    else:
+        raise AssertionError("a query on the signal label was accepted")
+
+    # A later write is picked up; expired rows drop out
+    signal_table.write(signal_table._rows(StockEngine("SPY"), {'SCRNEW': make_history(120, seed=99, freq='D')}, '1d', now))
+    assert 'SCRNEW' in screener.snapshot('1d', now).index
+    assert screener.snapshot('1d', snap['expires'].max() + 1).empty
+
+
+if __name__ == "__main__":
+    test_filter_order_limit()
+    test_errors()
+    test_screen_signal_table()
+    print("screener tests passed")
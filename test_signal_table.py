@@ -0,0 +1,75 @@
+import time
+
+import signal_table
+from stock_engine import StockEngine
+from test_indicators import make_history
+
+
+def test_rows_round_trip_and_rank():
+    frames = {f"T{s}": make_history(120, seed=s, freq='D') for s in range(30)}
+    frames['SHORT'] = make_history(20, seed=99, freq='D')
+    now = time.time()
+    rows = signal_table._rows(StockEngine("SPY"), frames, '1d', now)
+    assert {r['ticker'] for r in rows} == set(frames) - {'SHORT'}
+    expected = {}
+    for ticker, df in frames.items():
+        if ticker != 'SHORT':
+            signal, levels = StockEngine(ticker).get_recommendation(StockEngine(ticker).calculate_technical_indicators(df.copy()))
+            expected[ticker] = (signal, levels['score'])
+    assert all((r['signal'], r['score']) == expected[r['ticker']] for r in rows)
+
+    screened = {r['ticker']: (i % 2, "test") for i, r in enumerate(rows)}
+    signal_table.write(rows, screened)
+    # A later pass without the Shariah screen keeps the stored status
+    assert signal_table.write(rows) == len(rows)
+
+    buys = signal_table.top('buy', '1d', limit=100, now=now)
+    assert {r['ticker'] for r in buys} == {r['ticker'] for r in rows if r['side'] == 'buy'}
+    assert [r['score'] for r in buys] == sorted((r['score'] for r in buys), reverse=True)
+    sells = signal_table.top('sell', '1d', limit=100, now=now)
+    assert all(r['side'] == 'sell' for r in sells) and [r['score'] for r in sells] == sorted(r['score'] for r in sells)
+    compliant = signal_table.top('buy', '1d', limit=100, shariah=True, now=now)
+    assert all(screened[r['ticker']][0] == 1 for r in compliant)
+    assert signal_table.get('t0', '1d', now=now)['shariah'] == screened['T0'][0]
+
+    # Rows expire with the trading calendar
+    later = rows[0]['expires'] + 1
+    assert signal_table.top('buy', '1d', now=later) == [] and not signal_table.is_current('1d', now=later)
+    assert signal_table.is_current('1d', now=now) and not signal_table.is_current('1h', now=now)
+
+
+def test_update_rescores_changed_bars_and_logs_events():
+    engine = StockEngine("SPY")
+    frames = {f"U{s}": make_history(120, seed=s, freq='D') for s in range(5)}
+    now = time.time()
+    assert signal_table.update(engine, frames, '1h', now)[0] == 5
+    assert signal_table.update(engine, frames, '1h', now + 1) == (0, [])
+    assert signal_table.get('U0', '1h', now=now)['updated'] == now + 1
+
+    # U3 gets a new bar that turns it into a Sell; its stored signal was Hold
+    conn = signal_table._connect()
+    conn.execute("UPDATE signals SET signal='Hold (انتظار/مراقبة) 🟡' WHERE ticker='U3' AND interval='1h'")
+    conn.commit()
+    conn.close()
+    frames['U3'] = make_history(121, seed=3, freq='D')
+    written, events = signal_table.update(engine, frames, '1h', now + 2)
+    assert written == 1
+    assert events == [{'ticker': 'U3', 'kind': 'new_sell', 'old': "Hold (انتظار/مراقبة) 🟡", 'new': "Sell (بيع) 🔴"}]
+    logged = signal_table.events(interval='1h')
+    assert [(e['ticker'], e['kind'], e['new_signal']) for e in logged] == [('U3', 'new_sell', "Sell (بيع) 🔴")]
+    assert signal_table.events(after=logged[-1]['id']) == []
+
+
+def test_ranking_query_uses_index():
+    conn = signal_table._connect()
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM signals WHERE interval=? AND side=? AND expires>? "
+                        "ORDER BY score DESC LIMIT 10", ('1d', 'buy', 0)).fetchall()
+    conn.close()
+    assert any('idx_signals_side' in row[-1] for row in plan), plan
+
+
+if __name__ == "__main__":
+    test_rows_round_trip_and_rank()
+    test_update_rescores_changed_bars_and_logs_events()
+    test_ranking_query_uses_index()
+    print("Signal table writes, ranks and expires rows.")
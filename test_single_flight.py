@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import time
+
+os.environ['SINGLE_FLIGHT_LOCK_DIR'] = tempfile.mkdtemp()
+
+import single_flight
+
+
+class SlowFetch:
+    """Counts calls; each takes `delay` seconds and returns a fresh list (or raises `error`)."""
+
+    def __init__(self, delay=0.3, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [1, 2, 3]
+
+
+def run_concurrently(n, target):
+    """Starts n threads at once on target(); returns [(result, error)] per thread."""
+    barrier = threading.Barrier(n)
+    outcomes = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        try:
+            outcomes[i] = (target(), None)
+        except Exception as e:
+            outcomes[i] = (None, e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    return outcomes
+
+
+def test_concurrent_callers_share_one_fetch():
+    flight = single_flight.SingleFlight()
+    fetch = SlowFetch()
+    start = time.perf_counter()
+    outcomes = run_concurrently(10, lambda: flight.do('AAPL', fetch))
+    assert fetch.calls == 1 and time.perf_counter() - start < 1.0
+    assert all(error is None and result == [1, 2, 3] for result, error in outcomes)
+    # Followers get copies: one caller editing its result doesn't change the others'
+    outcomes[0][0].append(4)
+    assert sum(result == [1, 2, 3] for result, _ in outcomes) == 9
+    # Once the flight has landed, the next call fetches again
+    flight.do('AAPL', fetch)
+    assert fetch.calls == 2
+
+
+def test_error_reaches_every_waiter():
+    flight = single_flight.SingleFlight()
+    fetch = SlowFetch(error=ConnectionError("download failed"))
+    outcomes = run_concurrently(8, lambda: flight.do('MSFT', fetch))
+    assert fetch.calls == 1
+    assert all(result is None and isinstance(error, ConnectionError) for result, error in outcomes)
+
+
+def test_coalesce_rechecks_after_another_worker():
+    key = f"test|{time.time()}"
+    fetch = SlowFetch(delay=0)
+    shared = {}
+    # Another worker holds the lock and stores the value before releasing it
+    other = single_flight.worker_lock(key).__enter__()
+    caller = threading.Thread(target=lambda: shared.update(got=single_flight.coalesce(key, fetch, lambda: shared.get('value'))))
+    caller.start()
+    time.sleep(0.2)
+    shared['value'] = ['from the other worker']
+    other.__exit__(None, None, None)
+    caller.join(5)
+    assert shared['got'] == ['from the other worker'] and fetch.calls == 0
+
+
+if __name__ == "__main__":
+    test_concurrent_callers_share_one_fetch()
+    test_error_reaches_every_waiter()
+    test_coalesce_rechecks_after_another_worker()
+    print("single-flight tests passed")
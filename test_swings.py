@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+import indicators
+import swings
+from test_indicators import make_history
+
+
+def test_rolling_extremes_match_pandas():
+    rng = np.random.default_rng(0)
+    for n in (1, 5, 19, 20, 21, 100, 1001):
+        for window in (1, 3, 14, 20, 60):
+            x = rng.normal(size=n)
+            x[rng.random(n) < 0.05] = np.nan
+            s = pd.Series(x).rolling(window)
+            assert np.array_equal(indicators.rolling_max(x, window), s.max().to_numpy(), equal_nan=True), (n, window)
+            assert np.array_equal(indicators.rolling_min(x, window), s.min().to_numpy(), equal_nan=True), (n, window)
+
+
+def test_pivots_match_brute_force():
+    df = make_history(400, seed=11, freq='D')
+    high, low = df['High'].to_numpy(), df['Low'].to_numpy()
+    for strength in (1, 3, 5):
+        is_high, is_low = swings.pivots(high, low, strength)
+        for i in range(len(df)):
+            left, right = slice(i - strength, i), slice(i + 1, i + strength + 1)
+            confirmable = strength <= i < len(df) - strength
+            assert is_high[i] == (confirmable and high[i] > high[left].max() and high[i] >= high[right].max()), (strength, i)
+            assert is_low[i] == (confirmable and low[i] < low[left].min() and low[i] <= low[right].min()), (strength, i)
+
+    # No lookahead: the last swing known at a bar doesn't change when later bars arrive
+    full = swings.swing_levels(df)
+    for end in (50, 200, 399):
+        partial = swings.swing_levels(df.iloc[:end])
+        pd.testing.assert_frame_equal(partial[['Last_Swing_High', 'Last_Swing_Low']],
+                                      full[['Last_Swing_High', 'Last_Swing_Low']].iloc[:end])
+
+
+def test_fibonacci_grid_and_pivots():
+    df = make_history(200, seed=12, freq='D')
+    grid = swings.fibonacci_grid(df, period=60)
+    levels = swings.swing_levels(df)
+    anchored = 0
+    for end in range(1, len(df) + 1):
+        # Bar end - 1 sees only the bars up to it
+        high, low = levels[['Last_Swing_High', 'Last_Swing_Low']].iloc[end - 1]
+        if np.isnan(high) or np.isnan(low):
+            recent = df.iloc[:end].tail(60)
+            high, low = recent['High'].max(), recent['Low'].min()
+        else:
+            high, low = max(high, low), min(high, low)
+            anchored += 1
+        assert grid.iloc[end - 1].to_dict() == swings.fibonacci(high, low), end
+    assert anchored > 150
+
+    pivots = swings.pivot_points(df)
+    prev = df.iloc[-2]
+    pp = (prev['High'] + prev['Low'] + prev['Close']) / 3
+    assert pivots.iloc[-1].to_dict() == {'PP': pp, 'R1': (2 * pp) - prev['Low'], 'S1': (2 * pp) - prev['High'],
+                                         'R2': pp + (prev['High'] - prev['Low']), 'S2': pp - (prev['High'] - prev['Low'])}
+    key = swings.key_levels(df)
+    assert key['Fibonacci'] == grid.iloc[-1].to_dict()
+    assert key['Fibonacci']['0.0%'] == max(key['Swing_High'], key['Swing_Low'])
+    assert key['Fibonacci']['100.0%'] == min(key['Swing_High'], key['Swing_Low'])
+    assert key['Pivots'] == pivots.iloc[-1].to_dict()
+
+
+if __name__ == "__main__":
+    test_rolling_extremes_match_pandas()
+    test_pivots_match_brute_force()
+    test_fibonacci_grid_and_pivots()
+    print("Swing levels match the brute-force definitions.")
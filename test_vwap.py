@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+import indicators
+import panel
+import vwap
+from test_indicators import make_history
+
+
+def session_history(days=5, seed=3):
+    """15-minute regular-session bars (09:30-16:00 New York) over several trading days."""
+    frames = []
+    for day in pd.bdate_range('2026-03-02', periods=days):
+        index = pd.date_range(day + pd.Timedelta(hours=9, minutes=30), periods=26, freq='15min', tz='America/New_York')
+        frames.append(make_history(26, seed=seed + len(frames)).set_axis(index))
+    return pd.concat(frames)
+
+
+def test_session_vwap_restarts_each_day():
+    df = session_history()
+    result = vwap.session(df)
+    price = vwap.typical_price(df)
+    for _, day in df.groupby(df.index.date):
+        p, v = price[df.index.isin(day.index)], day['Volume'].to_numpy(float)
+        assert np.allclose(result[day.index].to_numpy(), np.cumsum(p * v) / np.cumsum(v))
+
+    # Daily bars stay one running session
+    daily = make_history(100, freq='D')
+    expected = np.cumsum(vwap.typical_price(daily) * daily['Volume']) / np.cumsum(daily['Volume'])
+    assert np.allclose(vwap.session(daily).to_numpy(), expected.to_numpy())
+
+    # The kernel, the panel and the pandas reference agree on the session reset
+    frames = {'A': df, 'B': session_history(seed=20), 'D': daily}
+    computed = panel.compute(frames, tail=len(df))
+    for ticker, frame in frames.items():
+        expected = indicators.calculate_pandas(frame.copy())['VWAP']
+        assert np.allclose(indicators.calculate(frame.copy())['VWAP'], expected)
+        assert np.allclose(computed.frame(ticker)['VWAP'], expected.iloc[-len(df):])
+
+
+def test_anchored_and_incremental():
+    df = session_history()
+    anchor = df.index[40]
+    result = vwap.anchored(df, anchor)
+    assert result.iloc[:40].isna().all()
+    tail = df.iloc[40:]
+    assert np.allclose(result.iloc[40:], np.cumsum(vwap.typical_price(tail) * tail['Volume']) / np.cumsum(tail['Volume']))
+    pd.testing.assert_series_equal(vwap.anchored(df, 40), result)
+
+    price = vwap.typical_price(df)
+    session, anchored = vwap.VWAPState(), vwap.VWAPState(anchor=anchor)
+    for i, (ts, volume) in enumerate(df['Volume'].items()):
+        # Every bar is revised once while forming
+        session.update(ts, price[i] * 1.01, volume + 5)
+        anchored.update(ts, price[i] * 1.01, volume + 5)
+        assert np.isclose(session.update(ts, price[i], volume), vwap.session(df).iloc[i])
+        assert np.isclose(anchored.update(ts, price[i], volume), result.iloc[i], equal_nan=True)
+
+
+if __name__ == "__main__":
+    test_session_vwap_restarts_each_day()
+    test_anchored_and_incremental()
+    print("Session and anchored VWAP match the definitions.")
@@ -0,0 +1,161 @@
+"""
+Session VWAP
+Volume-weighted average price that restarts at every session open on intraday bars (one
+session per New York trading date), VWAP anchored at any bar, and VWAPState for keeping
+either one current a bar at a time. Daily and longer bars run as a single session, as
+they always have. The indicator kernel's VWAP column, IndicatorState and
+StockEngine.calculate_vwap / anchored_vwap are all built on this.
+"""
+import numpy as np
+import pandas as pd
+
+import market_calendar
+
+_DAY_NS = 86_400 * 10**9
+# Bars closer together than this are intraday (daily bars can be 23h apart across DST)
+INTRADAY_STEP = pd.Timedelta(hours=12)
+
+
+def is_intraday(index, interval=None):
+    """True for bars shorter than a day: from the interval ('15m', '1h', ...) when known,
+    else from the spacing of a DatetimeIndex."""
+    if interval is not None:
+        return str(interval)[-1] in 'mh'
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return False
+    steps = np.diff(index.asi8)
+    steps = steps[steps > 0]
+    return bool(steps.size) and bool(steps.min() < INTRADAY_STEP.value)
+
+
+def session_key(ts):
+    """The trading date a bar belongs to, as days since the epoch (New York time for
+    tz-aware timestamps, the clock as given for naive ones)."""
+    ts = pd.Timestamp(ts)
+    if ts.tz is not None:
+        ts = ts.tz_convert(market_calendar.TZ).tz_localize(None)
+    return ts.value // _DAY_NS
+
+
+def session_starts(index, interval=None):
+    """Bool array, True on the first bar of every session (only the first bar unless intraday)."""
+    starts = np.zeros(len(index), dtype=bool)
+    if len(index) == 0:
+        return starts
+    starts[0] = True
+    if isinstance(index, pd.DatetimeIndex) and is_intraday(index, interval):
+        local = index.tz_convert(market_calendar.TZ).tz_localize(None) if index.tz is not None else index
+        days = local.asi8 // _DAY_NS
+        starts[1:] = days[1:] != days[:-1]
+    return starts
+
+
+def vwap(price, volume, starts=None):
+    """VWAP along axis 0 (1-D, or 2-D bars × tickers), restarting where `starts` is True.
+
+    starts: bool array shaped like price, or 1-D per bar shared by every column; None
+    accumulates over the whole array.
+    """
+    price = np.asarray(price, dtype='float64')
+    volume = np.asarray(volume, dtype='float64')
+    pv = price * volume
+    cum_pv = np.cumsum(pv, axis=0)
+    cum_v = np.cumsum(volume, axis=0)
+    if starts is not None and len(price) > 1:
+        starts = np.asarray(starts, dtype=bool)
+        if starts.ndim < price.ndim:
+            starts = np.broadcast_to(starts.reshape((-1,) + (1,) * (price.ndim - 1)), price.shape)
+        if starts[1:].any():
+            rows = np.arange(len(price)).reshape((-1,) + (1,) * (price.ndim - 1))
+            first = np.maximum.accumulate(np.where(starts, rows, 0), axis=0)
+            # Subtract what had accumulated before each session's first bar
+            cum_pv = cum_pv - np.take_along_axis(cum_pv - pv, first, axis=0)
+            cum_v = cum_v - np.take_along_axis(cum_v - volume, first, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cum_pv / cum_v
+
+
+def typical_price(df):
+    return ((df['High'] + df['Low'] + df['Close']) / 3).to_numpy(dtype='float64')
+
+
+def session(df, interval=None):
+    """Session VWAP of the typical price for every bar of an OHLCV frame (a Series)."""
+    interval = interval or df.attrs.get('interval')
+    values = vwap(typical_price(df), df['Volume'].to_numpy(dtype='float64'), session_starts(df.index, interval))
+    return pd.Series(values, index=df.index, name='VWAP')
+
+
+def anchored(df, anchor):
+    """VWAP of the typical price accumulated from `anchor` on (a Series, NaN before it).
+
+    anchor: a timestamp (the first bar at or after it) or an integer bar position.
+    """
+    if isinstance(anchor, (int, np.integer)):
+        start = int(anchor) if anchor >= 0 else len(df) + int(anchor)
+    else:
+        start = int(df.index.searchsorted(pd.Timestamp(anchor)))
+    values = np.full(len(df), np.nan)
+    if 0 <= start < len(df):
+        values[start:] = vwap(typical_price(df.iloc[start:]), df['Volume'].to_numpy(dtype='float64')[start:])
+    return pd.Series(values, index=df.index, name='AVWAP')
+
+
+class VWAPState:
+    """Running VWAP for one series, advanced one bar at a time.
+
+    Without an anchor it restarts at each session open once the bars turn out to be
+    intraday; with one it accumulates every bar from the anchor on (NaN before).
+    update() with the last bar's timestamp revises that bar instead of adding one.
+    """
+
+    def __init__(self, anchor=None, intraday=None):
+        self.anchor = pd.Timestamp(anchor) if anchor is not None else None
+        self.intraday = intraday
+        self.session = None
+        self.cum_pv = self.cum_v = 0.0
+        self.last_ts = None
+        self._before = None
+
+    def update(self, ts, price, volume):
+        ts = pd.Timestamp(ts)
+        if self.last_ts is not None and ts < self.last_ts:
+            raise ValueError(f"Bar {ts} is older than the last applied bar {self.last_ts}")
+        if ts == self.last_ts:
+            self.session, self.cum_pv, self.cum_v = self._before
+        else:
+            if self.intraday is None and self.last_ts is not None:
+                self.intraday = ts - self.last_ts < INTRADAY_STEP
+            self._before = (self.session, self.cum_pv, self.cum_v)
+        self.last_ts = ts
+        if self.anchor is not None:
+            if ts < self.anchor:
+                return np.nan
+        else:
+            key = session_key(ts)
+            if self.intraday and key != self.session:
+                self.cum_pv = self.cum_v = 0.0
+            self.session = key
+        self.cum_pv += float(price) * float(volume)
+        self.cum_v += float(volume)
+        return self.value
+
+    @property
+    def value(self):
+        return self.cum_pv / self.cum_v if self.cum_v else np.nan
+
+    def to_dict(self):
+        def ts(value):
+            return value.isoformat() if value is not None else None
+
+        return {'anchor': ts(self.anchor), 'intraday': self.intraday, 'session': self.session,
+                'cum_pv': self.cum_pv, 'cum_v': self.cum_v, 'last_ts': ts(self.last_ts),
+                'before': list(self._before) if self._before is not None else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['anchor'], data['intraday'])
+        state.session, state.cum_pv, state.cum_v = data['session'], data['cum_pv'], data['cum_v']
+        state.last_ts = pd.Timestamp(data['last_ts']) if data['last_ts'] else None
+        state._before = tuple(data['before']) if data['before'] is not None else None
+        return state